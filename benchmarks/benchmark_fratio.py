@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: benchmarks.benchmark_fratio
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Benchmark of the time and memory of :py:meth:`~xrayphasemap.analysis.PhaseAnalysis.compute_fratio`.
+
+Usage::
+
+    python benchmarks/benchmark_fratio.py --size 2048 --number-channels 12
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import os.path
+import time
+import shutil
+import tempfile
+import argparse
+import tracemalloc
+
+# Third party modules.
+import h5py
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.analysis import PhaseAnalysis, DATA_TYPE_FRATIO
+
+# Globals and constants variables.
+DATA_TYPE = "counts"
+
+
+def compute_fratio_reference(file_path, input_data_type):
+    """
+    Implementation of the f-ratio before the stacked version, used as the reference.
+    """
+    with h5py.File(file_path, 'a') as h5file:
+        data_type_group = h5file.require_group(DATA_TYPE_FRATIO)
+
+        element_data = {}
+        for label in h5file[input_data_type]:
+            element_data[label] = h5file[input_data_type][label][...]
+
+        total_intensity = np.zeros_like(list(element_data.values())[0])
+        for label in element_data:
+            total_intensity += element_data[label]
+
+        for label in element_data:
+            dataset = data_type_group.require_dataset(label, total_intensity.shape, dtype=np.float32)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                data = 1.0*element_data[label] / total_intensity
+            data[np.isnan(data)] = 0
+            dataset[:, :] = data
+
+
+def create_project(file_path, size, number_channels, seed=2017):
+    random_state = np.random.RandomState(seed)
+    with h5py.File(file_path, 'w') as h5file:
+        for channel in range(number_channels):
+            data = random_state.poisson(random_state.uniform(0.5, 20.0), (size, size)).astype(np.float32)
+            h5file.create_dataset("%s/E%02i" % (DATA_TYPE, channel), data=data)
+        h5file.attrs["width"] = size
+        h5file.attrs["height"] = size
+
+
+def measure(function):
+    tracemalloc.start()
+    start_time = time.time()
+    function()
+    elapsed_time = time.time() - start_time
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed_time, peak
+
+
+def run(size, number_channels, block_rows):
+    temporary_path = tempfile.mkdtemp()
+    try:
+        input_file_path = os.path.join(temporary_path, "input.hdf5")
+        create_project(input_file_path, size, number_channels)
+
+        results = []
+
+        file_path = os.path.join(temporary_path, "reference.hdf5")
+        shutil.copy(input_file_path, file_path)
+        results.append(("reference",) + measure(lambda: compute_fratio_reference(file_path, DATA_TYPE)))
+        reference_file_path = file_path
+
+        for rows in [None, block_rows]:
+            file_path = os.path.join(temporary_path, "stacked_%s.hdf5" % rows)
+            shutil.copy(input_file_path, file_path)
+            phase_analysis = PhaseAnalysis(file_path)
+            results.append(("stacked, block rows %s" % rows,) +
+                            measure(lambda: phase_analysis.compute_fratio(DATA_TYPE, block_rows=rows)))
+
+            with h5py.File(reference_file_path, 'r') as reference_file, h5py.File(file_path, 'r') as h5file:
+                for label in reference_file[DATA_TYPE_FRATIO]:
+                    if not np.array_equal(reference_file[DATA_TYPE_FRATIO][label][...],
+                                          h5file[DATA_TYPE_FRATIO][label][...]):
+                        raise AssertionError("Different f-ratio for %s" % label)
+
+        print("%-28s %10s %16s" % ("Implementation", "Time (s)", "Peak memory (MB)"))
+        for name, elapsed_time, peak in results:
+            print("%-28s %10.3f %16.1f" % (name, elapsed_time, peak/1.0e6))
+    finally:
+        shutil.rmtree(temporary_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the f-ratio computation.")
+    parser.add_argument("--size", type=int, default=2048, help="number of pixels of the side of the maps")
+    parser.add_argument("--number-channels", type=int, default=12)
+    parser.add_argument("--block-rows", type=int, default=256)
+    arguments = parser.parse_args()
+
+    run(arguments.size, arguments.number_channels, arguments.block_rows)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
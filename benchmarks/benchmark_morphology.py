@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: benchmarks.benchmark_morphology
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Benchmark of the dilation and erosion of the compound indexes, :py:class:`~xrayphasemap.morphology.MorphologyPipeline`
+against the closings and openings of :py:mod:`scipy.ndimage`.
+
+Usage::
+
+    python benchmarks/benchmark_morphology.py --size 2048 --fraction 0.3
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import time
+import argparse
+
+# Third party modules.
+import numpy as np
+from scipy import ndimage
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.morphology import MorphologyPipeline, OPERATION_CLOSING, OPERATION_OPENING
+
+# Globals and constants variables.
+
+
+def create_compound_index(size, fraction, seed=2017):
+    """
+    Noisy compound index with grains, like the classification of a phase.
+    """
+    random_state = np.random.RandomState(seed)
+    data = ndimage.gaussian_filter(random_state.uniform(size=(size, size)), 4.0)
+    threshold = np.percentile(data, 100.0*(1.0 - fraction))
+    compound_index = data > threshold
+    compound_index ^= random_state.uniform(size=(size, size)) < 0.05
+
+    return compound_index
+
+
+def measure(function, number_repetitions):
+    elapsed_times = []
+    for _repetition in range(number_repetitions):
+        start_time = time.time()
+        result = function()
+        elapsed_times.append(time.time() - start_time)
+
+    return min(elapsed_times), result
+
+
+def run(size, fraction, number_repetitions):
+    compound_index = create_compound_index(size, fraction)
+
+    pipelines = [("default 3x3", MorphologyPipeline()),
+                 ("closing 4, opening 4", MorphologyPipeline([(OPERATION_CLOSING, 4), (OPERATION_OPENING, 4)])),
+                 ("default 5x5", MorphologyPipeline(structure=np.ones((5, 5), dtype=bool)))]
+
+    print("%-24s %16s %16s %8s" % ("Pipeline", "Reference (s)", "Pipeline (s)", "Speedup"))
+    for name, pipeline in pipelines:
+        reference_time, reference = measure(lambda: pipeline.apply_reference(compound_index), number_repetitions)
+        pipeline_time, result = measure(lambda: pipeline.apply(compound_index), number_repetitions)
+
+        if not np.array_equal(reference, result):
+            raise AssertionError("Different compound index for %s" % name)
+
+        print("%-24s %16.3f %16.3f %8.1f" % (name, reference_time, pipeline_time, reference_time/pipeline_time))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dilation and erosion of the compound indexes.")
+    parser.add_argument("--size", type=int, default=2048, help="number of pixels of the side of the map")
+    parser.add_argument("--fraction", type=float, default=0.3, help="fraction of the pixels in the phase")
+    parser.add_argument("--number-repetitions", type=int, default=3)
+    arguments = parser.parse_args()
+
+    run(arguments.size, arguments.fraction, arguments.number_repetitions)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: benchmarks.benchmark_storage
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Benchmark of the project file size versus the read throughput for each storage policy.
+
+Usage::
+
+    python benchmarks/benchmark_storage.py --size 2048 --number-channels 8
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import os.path
+import time
+import shutil
+import tempfile
+import argparse
+
+# Third party modules.
+import h5py
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.storage import StoragePolicy, create_dataset, read_dataset, COMPRESSION_GZIP, COMPRESSION_LZF
+
+# Globals and constants variables.
+STORAGE_POLICIES = [("contiguous float32", StoragePolicy()),
+                    ("chunked float32", StoragePolicy(chunks=True)),
+                    ("gzip shuffle float32", StoragePolicy(chunks=True, compression=COMPRESSION_GZIP, shuffle=True)),
+                    ("lzf shuffle float32", StoragePolicy(chunks=True, compression=COMPRESSION_LZF, shuffle=True)),
+                    ("gzip shuffle uint16", StoragePolicy(chunks=True, compression=COMPRESSION_GZIP, shuffle=True,
+                                                          is_integer_counts=True)),
+                    ("lzf shuffle uint16", StoragePolicy(chunks=True, compression=COMPRESSION_LZF, shuffle=True,
+                                                         is_integer_counts=True))]
+
+
+def create_count_maps(size, number_channels, seed=2017):
+    random_state = np.random.RandomState(seed)
+    count_maps = []
+    for _channel in range(number_channels):
+        mean = random_state.uniform(1.0, 50.0, (size // 64 + 1, size // 64 + 1))
+        mean = np.kron(mean, np.ones((64, 64)))[:size, :size]
+        count_maps.append(random_state.poisson(mean).astype(np.float32))
+
+    return count_maps
+
+
+def benchmark_policy(file_path, storage_policy, count_maps, tile_size, number_tiles):
+    start_time = time.time()
+    with h5py.File(file_path, 'w') as h5file:
+        for index, data in enumerate(count_maps):
+            dtype = storage_policy.get_storage_dtype(data)
+            dataset = create_dataset(h5file, "channel%i" % index, data.shape, dtype, storage_policy)
+            dataset[...] = data
+    write_time = time.time() - start_time
+
+    file_size = os.path.getsize(file_path)
+
+    start_time = time.time()
+    with h5py.File(file_path, 'r') as h5file:
+        for index in range(len(count_maps)):
+            read_dataset(h5file["channel%i" % index])
+    read_time = time.time() - start_time
+
+    size = count_maps[0].shape[0]
+    random_state = np.random.RandomState(2017)
+    starts = random_state.randint(0, max(1, size - tile_size), (number_tiles, 2))
+    start_time = time.time()
+    with h5py.File(file_path, 'r') as h5file:
+        for index in range(len(count_maps)):
+            dataset = h5file["channel%i" % index]
+            for row, column in starts:
+                read_dataset(dataset, (slice(row, row + tile_size), slice(column, column + tile_size)))
+    tile_time = time.time() - start_time
+
+    data_size = sum(data.nbytes for data in count_maps)
+    return file_size, data_size/write_time, data_size/read_time, number_tiles*len(count_maps)/tile_time
+
+
+def run(size, number_channels, tile_size, number_tiles):
+    count_maps = create_count_maps(size, number_channels)
+
+    temporary_path = tempfile.mkdtemp()
+    try:
+        print("%-24s %12s %14s %14s %12s" % ("Policy", "Size (MB)", "Write (MB/s)", "Read (MB/s)", "Tiles/s"))
+        for name, storage_policy in STORAGE_POLICIES:
+            file_path = os.path.join(temporary_path, "benchmark.hdf5")
+            file_size, write_throughput, read_throughput, tile_throughput = \
+                benchmark_policy(file_path, storage_policy, count_maps, tile_size, number_tiles)
+            print("%-24s %12.1f %14.1f %14.1f %12.1f" % (name, file_size/1.0e6, write_throughput/1.0e6,
+                                                         read_throughput/1.0e6, tile_throughput))
+    finally:
+        shutil.rmtree(temporary_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the storage policies of the project file.")
+    parser.add_argument("--size", type=int, default=2048, help="number of pixels of the side of the maps")
+    parser.add_argument("--number-channels", type=int, default=8)
+    parser.add_argument("--tile-size", type=int, default=256)
+    parser.add_argument("--number-tiles", type=int, default=50)
+    arguments = parser.parse_args()
+
+    run(arguments.size, arguments.number_channels, arguments.tile_size, arguments.number_tiles)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
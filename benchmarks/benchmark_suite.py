@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: benchmarks.benchmark_suite
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Benchmark suite of the processing steps on synthetic maps from :py:mod:`xrayphasemap.synthetic`.
+
+Each benchmark has a setup, not timed, is run once to warm up and is run a number of times, the times are saved in a JSON file with the
+parameters, the versions and the machine, to compare the results of different commits::
+
+    python benchmarks/benchmark_suite.py --size 1024 --number-channels 8 --output results_new.json
+    python benchmarks/benchmark_suite.py --size 1024 --number-channels 8 --compare results_old.json
+
+The comparison prints the ratio of the minimum times and returns an exit code of 1 if a benchmark is slower than
+the threshold.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import datetime
+import tempfile
+import argparse
+import subprocess
+import collections
+
+# Third party modules.
+import h5py
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap import __version__
+from xrayphasemap.analysis import PhaseAnalysis, DATA_TYPE_FRATIO, DATA_TYPE_ELEMENT_RATIO
+from xrayphasemap.map import PhaseMap
+from xrayphasemap.export import FigureExporter, KIND_MAP, KIND_PHASE_MAP
+from xrayphasemap.synthetic import create_synthetic_maps, EXTENSION_TEXT, EXTENSION_TIFF, DEFAULT_DATA_TYPE
+
+# Globals and constants variables.
+RESULTS_FORMAT_VERSION = 1
+DEFAULT_THRESHOLD = 1.2
+
+COLORS = ["red", "green", "blue", "yellow", "cyan", "magenta", "orange", "purple"]
+
+Benchmark = collections.namedtuple("Benchmark", ["name", "setup", "run"])
+
+
+class BenchmarkData(object):
+    def __init__(self, temporary_path, synthetic_maps, max_workers=1):
+        """
+        Files shared by the benchmarks: the exported maps and the project files with and without f-ratio.
+        """
+        self.temporary_path = temporary_path
+        self.synthetic_maps = synthetic_maps
+        self.max_workers = max_workers
+
+        self.text_path = os.path.join(temporary_path, "text")
+        self.tiff_path = os.path.join(temporary_path, "tiff")
+        for directory_path, extension in ((self.text_path, EXTENSION_TEXT), (self.tiff_path, EXTENSION_TIFF)):
+            os.makedirs(directory_path)
+            synthetic_maps.save_files(directory_path, extension)
+
+        self.counts_file_path = synthetic_maps.save_project(os.path.join(temporary_path, "counts.hdf5"))
+        self.fratio_file_path = os.path.join(temporary_path, "fratio.hdf5")
+        shutil.copy(self.counts_file_path, self.fratio_file_path)
+        PhaseAnalysis(self.fratio_file_path).compute_fratio(DEFAULT_DATA_TYPE)
+
+        self.phases = synthetic_maps.get_phases(DATA_TYPE_FRATIO)
+
+        self.file_path = os.path.join(temporary_path, "benchmark.hdf5")
+        self.figures_path = os.path.join(temporary_path, "figures")
+
+    def new_project(self, source_file_path=None):
+        """
+        Path of a new project file, a copy of the source project file, or no file if None.
+        """
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        if source_file_path is not None:
+            shutil.copy(source_file_path, self.file_path)
+
+        return self.file_path
+
+    def new_figures_path(self):
+        if os.path.isdir(self.figures_path):
+            shutil.rmtree(self.figures_path)
+        os.makedirs(self.figures_path)
+
+        return self.figures_path
+
+    def create_phase_map(self, phase_analysis):
+        phase_map = PhaseMap("synthetic", phase_analysis, max_workers=self.max_workers)
+        for phase_index, phase in enumerate(self.phases):
+            phase_map.add_phase(phase, COLORS[phase_index % len(COLORS)])
+
+        return phase_map
+
+
+def _setup_empty(data):
+    return data.new_project()
+
+
+def _setup_counts(data):
+    return data.new_project(data.counts_file_path)
+
+
+def _setup_fratio(data):
+    return data.new_project(data.fratio_file_path)
+
+
+def _setup_phase_map(data):
+    phase_analysis = PhaseAnalysis(_setup_fratio(data), max_workers=data.max_workers)
+    phase_map = data.create_phase_map(phase_analysis)
+    # The f-ratio maps are read before the timing, only the classification is timed.
+    for phase in data.phases:
+        for data_type, label in phase.conditions:
+            phase_analysis.get_data(data_type, label)
+
+    return phase_map
+
+
+def _setup_export(data):
+    _setup_fratio(data)
+    return data.new_figures_path()
+
+
+def _run_ingest_text(data, file_path):
+    PhaseAnalysis(file_path).import_directory(data.text_path, DEFAULT_DATA_TYPE, "*" + EXTENSION_TEXT,
+                                              max_workers=data.max_workers)
+
+
+def _run_ingest_tiff(data, file_path):
+    PhaseAnalysis(file_path).import_directory(data.tiff_path, DEFAULT_DATA_TYPE, "*" + EXTENSION_TIFF,
+                                              max_workers=data.max_workers)
+
+
+def _run_fratio(data, file_path):
+    PhaseAnalysis(file_path).compute_fratio(DEFAULT_DATA_TYPE)
+
+
+def _run_element_ratio(data, file_path):
+    """
+    Register the element ratios and read the ratios of the first channel, the ratios are computed when read.
+    """
+    with PhaseAnalysis(file_path) as phase_analysis:
+        phase_analysis.compute_element_ratio(DEFAULT_DATA_TYPE)
+        prefix = data.synthetic_maps.labels[0] + "_"
+        for label in phase_analysis.get_labels(DATA_TYPE_ELEMENT_RATIO):
+            if label.startswith(prefix):
+                phase_analysis.get_data(DATA_TYPE_ELEMENT_RATIO, label)
+
+
+def _run_compound_index(data, file_path):
+    with PhaseAnalysis(file_path, max_workers=data.max_workers) as phase_analysis:
+        phase_analysis.compute_compound_index(data.phases, False, True)
+
+
+def _run_compound_index_morphology(data, file_path):
+    with PhaseAnalysis(file_path, max_workers=data.max_workers) as phase_analysis:
+        phase_analysis.compute_compound_index(data.phases, True, True)
+
+
+def _run_get_image(data, phase_map):
+    phase_map.get_image()
+
+
+def _run_export(data, figures_path):
+    exporter = FigureExporter(data.fratio_file_path, figures_path, max_workers=data.max_workers)
+    exporter.add_data_jobs(PhaseAnalysis(data.fratio_file_path), kinds=(KIND_MAP,), data_type=DEFAULT_DATA_TYPE)
+    exporter.add_phase_map(data.create_phase_map(None), kinds=(KIND_PHASE_MAP,))
+
+    for report in exporter.run():
+        if report["error"] is not None:
+            raise RuntimeError("Export of %s failed: %s" % (report["job"], report["error"]))
+
+
+BENCHMARKS = [Benchmark("ingest text", _setup_empty, _run_ingest_text),
+              Benchmark("ingest tiff", _setup_empty, _run_ingest_tiff),
+              Benchmark("compute_fratio", _setup_counts, _run_fratio),
+              Benchmark("compute_element_ratio", _setup_counts, _run_element_ratio),
+              Benchmark("compute_compound_index", _setup_fratio, _run_compound_index),
+              Benchmark("compute_compound_index morphology", _setup_fratio, _run_compound_index_morphology),
+              Benchmark("PhaseMap.get_image", _setup_phase_map, _run_get_image),
+              Benchmark("figure export", _setup_export, _run_export)]
+
+
+def run_benchmark(benchmark, data, number_repeats, number_warmups=1):
+    """
+    Time a benchmark, the warm-up runs, like the first import of a module, are not recorded.
+    """
+    for _warmup in range(number_warmups):
+        benchmark.run(data, benchmark.setup(data))
+
+    times = []
+    for _repeat in range(number_repeats):
+        argument = benchmark.setup(data)
+        start_time = time.perf_counter()
+        benchmark.run(data, argument)
+        times.append(time.perf_counter() - start_time)
+
+    return {"name": benchmark.name, "times": times, "minimum": min(times), "median": float(np.median(times))}
+
+
+def run(parameters, number_repeats, max_workers=1, names=None, number_warmups=1):
+    """
+    Run the benchmarks and return the results as a dict saved in the JSON file.
+
+    :param parameters: parameters of :py:func:`~xrayphasemap.synthetic.create_synthetic_maps`
+    :param number_repeats: number of times each benchmark is run
+    :param max_workers: number of processes or threads of the steps with a ``max_workers`` option
+    :param names: run the benchmarks with a name containing one of these texts, all of them if None
+    :param number_warmups: number of runs of each benchmark before the timed runs
+
+    """
+    benchmarks = [benchmark for benchmark in BENCHMARKS
+                  if names is None or any(name in benchmark.name for name in names)]
+
+    results = {"format": RESULTS_FORMAT_VERSION,
+               "date": datetime.datetime.now().isoformat(timespec="seconds"),
+               "commit": get_commit(),
+               "machine": get_machine(),
+               "parameters": dict(parameters, number_repeats=number_repeats, number_warmups=number_warmups,
+                                  max_workers=max_workers),
+               "benchmarks": []}
+
+    temporary_path = tempfile.mkdtemp()
+    try:
+        synthetic_maps = create_synthetic_maps(**parameters)
+        data = BenchmarkData(temporary_path, synthetic_maps, max_workers)
+
+        for benchmark in benchmarks:
+            result = run_benchmark(benchmark, data, number_repeats, number_warmups)
+            print("%-36s %10.3f %10.3f" % (result["name"], result["minimum"], result["median"]))
+            results["benchmarks"].append(result)
+    finally:
+        shutil.rmtree(temporary_path)
+
+    return results
+
+
+def get_commit():
+    """
+    Commit of the git repository of this script, None if git is not available.
+    """
+    try:
+        output = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                         stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return output.decode("ascii").strip()
+
+
+def get_machine():
+    return {"platform": platform.platform(),
+            "processor": platform.processor(),
+            "number_processors": os.cpu_count(),
+            "python": platform.python_version(),
+            "xrayphasemap": __version__,
+            "numpy": np.__version__,
+            "h5py": h5py.__version__}
+
+
+def compare(results, reference_results, threshold=DEFAULT_THRESHOLD):
+    """
+    Print the ratio of the minimum time of each benchmark to the reference and return the names of the regressions.
+    """
+    reference_times = dict((result["name"], result["minimum"]) for result in reference_results["benchmarks"])
+    if results["parameters"] != reference_results["parameters"]:
+        print("Warning: the parameters are different from the reference %s" % reference_results["parameters"])
+
+    regressions = []
+    print("%-36s %10s %10s %8s" % ("Benchmark", "Reference", "Time (s)", "Ratio"))
+    for result in results["benchmarks"]:
+        reference_time = reference_times.get(result["name"])
+        if reference_time is None:
+            print("%-36s %10s %10.3f %8s" % (result["name"], "-", result["minimum"], "-"))
+            continue
+
+        ratio = result["minimum"]/reference_time
+        is_regression = ratio > threshold
+        if is_regression:
+            regressions.append(result["name"])
+        print("%-36s %10.3f %10.3f %8.2f%s" % (result["name"], reference_time, result["minimum"], ratio,
+                                               " slower" if is_regression else ""))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the processing steps on synthetic maps.")
+    parser.add_argument("--size", type=int, default=1024, help="number of pixels of the side of the maps")
+    parser.add_argument("--number-channels", type=int, default=8)
+    parser.add_argument("--number-phases", type=int, default=4)
+    parser.add_argument("--noise", type=float, default=1.0, help="scale of the Poisson noise")
+    parser.add_argument("--seed", type=int, default=2017)
+    parser.add_argument("--repeat", type=int, default=3, help="number of times each benchmark is run")
+    parser.add_argument("--warmup", type=int, default=1, help="number of runs not timed before the timed runs")
+    parser.add_argument("--jobs", type=int, default=1, help="number of processes or threads of the steps")
+    parser.add_argument("--filter", nargs="+", default=None, help="run the benchmarks containing one of these texts")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file of the results")
+    parser.add_argument("--compare", default=None, help="JSON file of reference results")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="ratio of the times above which a benchmark is a regression")
+    arguments = parser.parse_args()
+
+    parameters = {"shape": [arguments.size, arguments.size], "number_channels": arguments.number_channels,
+                  "number_phases": arguments.number_phases, "noise": arguments.noise, "seed": arguments.seed}
+
+    print("%-36s %10s %10s" % ("Benchmark", "Min (s)", "Median (s)"))
+    results = run(parameters, arguments.repeat, arguments.jobs, arguments.filter, arguments.warmup)
+
+    with open(arguments.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print("Results saved in %s" % arguments.output)
+
+    if arguments.compare is not None:
+        with open(arguments.compare, 'r') as reference_file:
+            reference_results = json.load(reference_file)
+        if len(compare(results, reference_results, arguments.threshold)) > 0:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
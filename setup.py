@@ -66,6 +66,7 @@ setup(name="xrayphasemap",
                  'xrayphasemap'},
     include_package_data=True,
     install_requires=requirements,
+    entry_points={'console_scripts': ['xrayphasemap=xrayphasemap.cli:main']},
     license="Apache Software License 2.0",
     zip_safe=False,
     keywords='xrayphasemap',
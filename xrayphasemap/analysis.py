@@ -28,17 +28,37 @@ Create phase map from x-ray map data.
 # Standard library modules.
 import os.path
 import logging
+import contextlib
+import collections
+import glob
+import time
+import concurrent.futures
 
 # Third party modules.
 import h5py
 import numpy as np
 from PIL import Image
-import matplotlib.pyplot as plt
 import scipy.ndimage as ndimage
 
 # Local modules.
 
 # Project modules
+from xrayphasemap.cache import DatasetCache, DEFAULT_MAXIMUM_SIZE
+from xrayphasemap.classifier import PhaseClassifier, DEFAULT_BLOCK_SIZE, _get_threshold
+from xrayphasemap.storage import create_dataset, read_dataset, DEFAULT_STORAGE_POLICY
+from xrayphasemap.morphology import get_morphology_pipeline
+from xrayphasemap.histogram import compute_histogram, read_histogram, write_histogram, remove_histogram
+from xrayphasemap.render import save_map_image
+from xrayphasemap.scatter import compute_scatter_histograms, get_range
+from xrayphasemap.provenance import new_revision, create_provenance, is_up_to_date, write_provenance, remove_provenance
+from xrayphasemap.provenance import get_revision, ATTRIBUTE_REVISION
+from xrayphasemap.pyramid import GROUP_PYRAMID, GROUP_PHASE_MAP, ATTRIBUTE_SOURCE, ATTRIBUTE_FACTOR, \
+    ATTRIBUTE_INPUTS, DEFAULT_PREVIEW_SIZE, get_level_factors, get_level_shape, select_factor, compute_levels, \
+    compute_preview, compute_level, get_pyramid_group, is_pyramid_up_to_date, get_factors, read_level, \
+    remove_pyramid, remove_dependent_pyramids
+from xrayphasemap.plotting import plt, get_color_map, create_color_maps
+from xrayphasemap.histogram import DEFAULT_NUMBER_BINS, DEFAULT_BLOCK_SIZE as DEFAULT_HISTOGRAM_BLOCK_SIZE
+from xrayphasemap.pyramid import DEFAULT_BLOCK_SIZE as DEFAULT_PYRAMID_BLOCK_SIZE
 
 # Globals and constants variables.
 DATA_TYPE_ATOMIC_NORMALIZED = "atom norm"
@@ -56,89 +76,394 @@ DATA_TYPE_TOTAL_PEAK_INTENSITY = "Total peak intensity"
 
 GROUP_MICROGRAPH = "micrograph"
 
+DATA_TYPE_COMPOUND_INDEX = "compound index"
+
+ATTRIBUTE_INPUT_DATA_TYPE = "input data type"
+ATTRIBUTE_PERSIST = "persist"
+
 IMAGE_WIDTH = "width"
 IMAGE_HEIGHT = "height"
+IMAGE_PIXEL_SIZE = "pixel size"
+
+MODE_READ_ONLY = "r"
+MODE_READ_WRITE = "a"
+
+DEFAULT_TILE_SIZE = 1024
+
 
 class PhaseAnalysis(object):
-    def __init__(self, project_filepath):
+    def __init__(self, project_filepath, mode=MODE_READ_WRITE, cache_size=DEFAULT_MAXIMUM_SIZE,
+                 storage_policy=DEFAULT_STORAGE_POLICY, max_workers=1):
+        """
+        Phase analysis of the x-ray maps saved in a HDF5 project file.
+
+        Without an opened session, each method opens and closes the project file.
+        Use the object as a context manager, or call :py:meth:`open` and :py:meth:`close`, to keep one handle
+        opened for all the calls and read the metadata only once::
+
+            with PhaseAnalysis(project_filepath, mode=MODE_READ_ONLY) as phase_analysis:
+                phase_map = PhaseMap("map", phase_analysis)
+
+        :param project_filepath: path of the HDF5 project file
+        :param mode: :py:const:`MODE_READ_ONLY` or :py:const:`MODE_READ_WRITE` used when the session is opened
+        :param cache_size: maximum number of bytes of the datasets kept in memory by :py:meth:`get_data`
+        :param storage_policy: :py:class:`~xrayphasemap.storage.StoragePolicy` of the datasets written in the project file
+        :param max_workers: number of threads used to classify the phases and apply the dilation and erosion
+
+        """
         self.h5file_path = project_filepath
+        self.mode = mode
+        self.storage_policy = storage_policy
+        self.max_workers = max_workers
+
+        self.cache = DatasetCache(cache_size)
+        self.modification_count = 0
 
         self.overwrite = False
 
-        create_color_maps()
-        self.cm = plt.cm.get_cmap('YlOrRd')
+        self._h5file = None
+        self._width = None
+        self._height = None
+        self._index = {}
+        self._virtual_inputs = {}
+        self._ratio_inputs = {}
+
+    @property
+    def cm(self):
+        return get_color_map('YlOrRd')
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def is_open(self):
+        return self._h5file is not None
+
+    def open(self, mode=None):
+        """
+        Open the project file and read its metadata, the handle is reused until :py:meth:`close` is called.
+
+        :param mode: :py:const:`MODE_READ_ONLY` or :py:const:`MODE_READ_WRITE`, use the mode of the object if None
+
+        """
+        if mode is None:
+            mode = self.mode
+        if mode not in (MODE_READ_ONLY, MODE_READ_WRITE):
+            raise ValueError("Unknown mode %s for project file %s" % (mode, self.h5file_path))
+
+        self.close()
+        self.cache.clear()
+        if mode != MODE_READ_ONLY:
+            self.modification_count += 1
+
+        self._h5file = h5py.File(self.h5file_path, mode)
+        self.mode = mode
+
+        self._read_metadata(self._h5file)
+
+    def close(self):
+        if self._h5file is not None:
+            self._h5file.close()
+
+        self._h5file = None
+        self._width = None
+        self._height = None
+        self._index = {}
+        self._virtual_inputs = {}
+
+    def _read_metadata(self, h5file):
+        self._width = h5file.attrs.get(IMAGE_WIDTH)
+        self._height = h5file.attrs.get(IMAGE_HEIGHT)
+
+        self._index = {}
+        self._virtual_inputs = {}
+        for data_type in _get_data_type_names(h5file):
+            self._index[data_type] = list(h5file[data_type])
+
+            input_data_type = h5file[data_type].attrs.get(ATTRIBUTE_INPUT_DATA_TYPE)
+            if input_data_type is not None:
+                self._virtual_inputs[data_type] = input_data_type
+
+    def _register_dataset(self, data_type, label):
+        if self.is_open:
+            labels = self._index.setdefault(data_type, [])
+            if label not in labels:
+                labels.append(label)
+
+    def _dataset_modified(self, data_type, label, h5file=None):
+        """
+        Invalidate the cached data and, if the project file is given, the histogram, provenance and pyramid saved
+        with the dataset, the dataset has a new revision.
+        """
+        self.cache.invalidate(data_type, label)
+        self.modification_count += 1
+
+        for key in [key for key, inputs in self._ratio_inputs.items() if (data_type, label) in inputs]:
+            self.cache.invalidate(*key)
+            del self._ratio_inputs[key]
+
+        if h5file is not None:
+            dataset = h5file[data_type][label]
+            remove_histogram(dataset)
+            remove_provenance(dataset)
+            remove_pyramid(h5file, data_type, label)
+            remove_dependent_pyramids(h5file, dataset.name)
+            new_revision(h5file, dataset)
+
+            self._remove_dependent_ratios(h5file, data_type, label)
+
+    def _remove_dependent_ratios(self, h5file, data_type, label):
+        """
+        Remove the element ratios saved in the project file computed from a modified dataset.
+        """
+        for ratio_data_type in _get_data_type_names(h5file):
+            ratio_group = h5file[ratio_data_type]
+            if ratio_group.attrs.get(ATTRIBUTE_INPUT_DATA_TYPE) != data_type:
+                continue
+
+            for ratio_label in list(ratio_group):
+                if label in _get_ratio_inputs(h5file, ratio_data_type, ratio_label):
+                    remove_dependent_pyramids(h5file, ratio_group[ratio_label].name)
+                    del ratio_group[ratio_label]
+                    remove_pyramid(h5file, ratio_data_type, ratio_label)
+                    self.cache.invalidate(ratio_data_type, ratio_label)
+                    if ratio_label in self._index.get(ratio_data_type, []):
+                        self._index[ratio_data_type].remove(ratio_label)
+
+    def _set_width_height(self, h5file, width, height):
+        h5file.attrs[IMAGE_WIDTH] = width
+        h5file.attrs[IMAGE_HEIGHT] = height
+
+        if self.is_open:
+            self._width = width
+            self._height = height
+
+    @contextlib.contextmanager
+    def _project_file(self, writable=False, overwrite=False):
+        """
+        Give the handle of the opened session or open the project file only for the duration of the block.
+
+        The project file is truncated if :py:attr:`overwrite` is set only when the block imports maps, with overwrite
+        True, and not in a session.
+        """
+        if writable and self.mode == MODE_READ_ONLY:
+            raise IOError("Project file %s is opened read-only" % self.h5file_path)
+
+        if self._h5file is not None:
+            yield self._h5file
+
+            if writable:
+                self._h5file.flush()
+        else:
+            if overwrite:
+                h5file = self._open_hdf5_file()
+            elif writable:
+                h5file = h5py.File(self.h5file_path, 'a')
+            else:
+                h5file = h5py.File(self.h5file_path, 'r')
+
+            try:
+                yield h5file
+            finally:
+                h5file.close()
 
     def get_width_height(self):
-        h5file = self._open_hdf5_file()
-        return h5file.attrs.get(IMAGE_WIDTH), h5file.attrs.get(IMAGE_HEIGHT)
+        if self.is_open:
+            return self._width, self._height
+
+        with self._project_file() as h5file:
+            return h5file.attrs.get(IMAGE_WIDTH), h5file.attrs.get(IMAGE_HEIGHT)
+
+    def get_pixel_size(self):
+        """
+        Size of a pixel of the maps in micrometer, None if unknown.
+        """
+        with self._project_file() as h5file:
+            pixel_size = h5file.attrs.get(IMAGE_PIXEL_SIZE)
+
+        if pixel_size is None:
+            return None
+        return float(pixel_size)
+
+    def set_pixel_size(self, pixel_size):
+        """
+        Save the size of a pixel of the maps in micrometer.
+        """
+        with self._project_file(writable=True) as h5file:
+            h5file.attrs[IMAGE_PIXEL_SIZE] = float(pixel_size)
+
+    def get_data_types(self):
+        if self.is_open:
+            return list(self._index)
+
+        with self._project_file() as h5file:
+            return _get_data_type_names(h5file)
+
+    def get_labels(self, data_type):
+        """
+        Labels of a data type, including the element ratios not computed yet.
+        """
+        if self.is_open:
+            labels = list(self._index.get(data_type, []))
+            if data_type in self._virtual_inputs:
+                input_labels = self.get_labels(self._virtual_inputs[data_type])
+                labels.extend(label for label in _get_ratio_labels(input_labels) if label not in labels)
+            return labels
+
+        with self._project_file() as h5file:
+            return _get_group_labels(h5file, data_type)
+
+    def is_virtual(self, data_type):
+        """
+        True if the labels of the data type are computed from another data type when read, like the element ratios.
+        """
+        if self.is_open:
+            return data_type in self._virtual_inputs
+
+        with self._project_file() as h5file:
+            return data_type in h5file and h5file[data_type].attrs.get(ATTRIBUTE_INPUT_DATA_TYPE) is not None
 
     def read_element_data(self, data_type, label, file_path):
         self._read_project_file(data_type, label, file_path)
 
+    def import_directory(self, directory_path, data_type, pattern="*.txt", max_workers=None):
+        """
+        Import all the map files of a directory matching the pattern.
 
-    def read_micrograph_data(self, micrograph_type, file_path):
-        data = _read_data(file_path)
-        logging.debug(np.min(data))
-        logging.debug(np.max(data))
+        The files are parsed in parallel in a process pool and the data is written by this process with the
+        project file opened once. The label of each file is the text after the last underscore of the file name,
+        like ``Fe`` for ``1-LFS4-2_countsDeconvolution_Fe.txt``. As :py:meth:`read_element_data`, the labels
+        already in the project file are not imported again.
 
-        h5file = self._open_hdf5_file()
+        :param directory_path: directory of the exported map files
+        :param data_type: data type of the imported maps
+        :param pattern: glob pattern of the file names
+        :param max_workers: number of processes used to parse the files, parse in this process if 1
+        :return: list of report dict for each file with the keys ``file_path``, ``label``, ``shape``,
+                 ``parse_time``, ``write_time`` and ``error``
 
-        if GROUP_MICROGRAPH not in h5file:
-            group_name = "/{}".format(GROUP_MICROGRAPH)
-            data_type_group = h5file.create_group(group_name)
-        else:
-            data_type_group = h5file[GROUP_MICROGRAPH]
+        """
+        file_paths = sorted(glob.glob(os.path.join(directory_path, pattern)))
 
-        logging.debug(data_type_group.name)
-        logging.debug(data_type_group.parent)
-        if micrograph_type not in data_type_group:
-            dataset = data_type_group.create_dataset(micrograph_type, data.shape, dtype=np.float32)
-            dataset[:,:] = data
-            logging.debug(dataset)
-            h5file.flush()
-        else:
-            dataset = data_type_group[micrograph_type]
-            dataset[:, :] = data
-            logging.debug(dataset)
-            h5file.flush()
+        reports = []
+        with self._project_file(writable=True, overwrite=True) as h5file:
+            if data_type not in h5file:
+                data_type_group = h5file.create_group("/{}".format(data_type))
+            else:
+                data_type_group = h5file[data_type]
 
-        h5file.close()
+            file_paths_to_read = []
+            for file_path in file_paths:
+                label = _get_label_from_file_path(file_path)
+                report = {"file_path": file_path, "label": label, "shape": None,
+                          "parse_time": 0.0, "write_time": 0.0, "error": None}
+                reports.append(report)
 
-    def _read_project_file(self, data_type, label, file_path):
-        h5file = self._open_hdf5_file()
+                if label in data_type_group:
+                    report["shape"] = data_type_group[label].shape
+                    report["error"] = "Label %s already in %s" % (label, data_type)
+                else:
+                    file_paths_to_read.append(file_path)
 
-        if data_type not in h5file:
-            group_name = "/{}".format(data_type)
-            data_type_group = h5file.create_group(group_name)
-        else:
-            data_type_group = h5file[data_type]
+            shape = None
+            if h5file.attrs.get(IMAGE_WIDTH) is not None:
+                shape = (int(h5file.attrs.get(IMAGE_WIDTH)), int(h5file.attrs.get(IMAGE_HEIGHT)))
 
-        logging.debug(data_type_group.name)
-        logging.debug(data_type_group.parent)
+            reports_by_file_path = dict((report["file_path"], report) for report in reports)
+            for file_path, data, parse_time, error in _read_data_files(file_paths_to_read, max_workers):
+                report = reports_by_file_path[file_path]
+                report["parse_time"] = parse_time
 
-        if label not in data_type_group:
-            try:
-                element_data = _read_data(file_path)
-                w, h = element_data.shape
-                dataset = data_type_group.create_dataset(label, element_data.shape, dtype=np.float32)
-                dataset[:, :] = element_data
+                if error is None and shape is not None and data.shape != shape:
+                    error = "Shape %s different from the project shape %s" % (data.shape, shape)
+
+                if error is not None:
+                    report["error"] = error
+                    logging.error("%s for file_path %s", error, file_path)
+                    continue
+
+                start_time = time.time()
+                label = report["label"]
+                dtype = self.storage_policy.get_storage_dtype(data)
+                dataset = create_dataset(data_type_group, label, data.shape, dtype, self.storage_policy)
+                dataset[...] = data
+                self._register_dataset(data_type, label)
+                self._dataset_modified(data_type, label, h5file)
+
+                if shape is None:
+                    shape = data.shape
+                    self._set_width_height(h5file, shape[0], shape[1])
+
+                report["shape"] = data.shape
+                report["write_time"] = time.time() - start_time
+
+        return reports
+
+    def read_micrograph_data(self, micrograph_type, file_path):
+        data = _read_data(file_path)
+        logging.debug(np.min(data))
+        logging.debug(np.max(data))
+
+        with self._project_file(writable=True, overwrite=True) as h5file:
+            if GROUP_MICROGRAPH not in h5file:
+                group_name = "/{}".format(GROUP_MICROGRAPH)
+                data_type_group = h5file.create_group(group_name)
+            else:
+                data_type_group = h5file[GROUP_MICROGRAPH]
+
+            logging.debug(data_type_group.name)
+            logging.debug(data_type_group.parent)
+            if micrograph_type not in data_type_group:
+                dtype = self.storage_policy.get_storage_dtype(data)
+                dataset = create_dataset(data_type_group, micrograph_type, data.shape, dtype, self.storage_policy)
+                dataset[:,:] = data
+                logging.debug(dataset)
+                h5file.flush()
+            else:
+                dataset = data_type_group[micrograph_type]
+                dataset[:, :] = data
                 logging.debug(dataset)
                 h5file.flush()
-            except ValueError as message:
-                logging.error("%s for file_path %s", message, file_path)
-            except IOError:
-                logging.warning("File path does not exist %s", file_path)
 
-        else:
-            dataset = data_type_group[label]
-            element_data = np.array(dataset)
-            w, h = element_data.shape
+            self._register_dataset(GROUP_MICROGRAPH, micrograph_type)
+            self._dataset_modified(GROUP_MICROGRAPH, micrograph_type, h5file)
+
+    def _read_project_file(self, data_type, label, file_path):
+        with self._project_file(writable=True, overwrite=True) as h5file:
+            if data_type not in h5file:
+                group_name = "/{}".format(data_type)
+                data_type_group = h5file.create_group(group_name)
+            else:
+                data_type_group = h5file[data_type]
 
-        h5file.attrs[IMAGE_WIDTH] = w
-        h5file.attrs[IMAGE_HEIGHT] = h
+            logging.debug(data_type_group.name)
+            logging.debug(data_type_group.parent)
+
+            if label not in data_type_group:
+                try:
+                    element_data = _read_data(file_path)
+                    w, h = element_data.shape
+                    dtype = self.storage_policy.get_storage_dtype(element_data)
+                    dataset = create_dataset(data_type_group, label, element_data.shape, dtype, self.storage_policy)
+                    dataset[:, :] = element_data
+                    logging.debug(dataset)
+                    h5file.flush()
+                    self._register_dataset(data_type, label)
+                    self._dataset_modified(data_type, label, h5file)
+                except ValueError as message:
+                    logging.error("%s for file_path %s", message, file_path)
+                except IOError:
+                    logging.warning("File path does not exist %s", file_path)
 
-        h5file.close()
+            else:
+                dataset = data_type_group[label]
+                w, h = dataset.shape
 
+            self._set_width_height(h5file, w, h)
 
     def _open_hdf5_file(self):
         if self.overwrite:
@@ -148,81 +473,125 @@ class PhaseAnalysis(object):
 
         return h5file
 
-    def display_histogram_one(self, data_type, label, num_bins=50, display_now=True):
-        with h5py.File(self.h5file_path, 'r') as h5file:
-            element_data = _get_data(h5file, data_type)
+    def display_histogram_one(self, data_type, label, num_bins=50, display_now=True, show_map=True,
+                              preview_size=DEFAULT_PREVIEW_SIZE):
+        _figure = self._create_histogram_figure(data_type, label, num_bins=num_bins, show_map=show_map,
+                                                preview_size=preview_size)
+
+        if display_now:
+            show()
+
+    def save_histogram_one(self, data_type, label, figure_path, num_bins=50, display_now=True, show_map=True,
+                           preview_size=DEFAULT_PREVIEW_SIZE):
+        figure = self._create_histogram_figure(data_type, label, num_bins=num_bins, show_map=show_map,
+                                               preview_size=preview_size)
 
-            data = element_data[label]
-            _figure = self._create_histogram_figure(data_type, label, data, num_bins=num_bins)
+        file_name = "Histogram_%s_%s.png" % (data_type, label)
+        file_path = os.path.join(figure_path, file_name)
+        figure.savefig(file_path)
+        plt.close()
 
-            if display_now:
-                show()
+        return file_path
 
-    def save_histogram_one(self, data_type, label, figure_path, num_bins=50, display_now=True):
-        with h5py.File(self.h5file_path, 'r') as h5file:
-            element_data = _get_data(h5file, data_type)
+    def display_histogram_all(self, data_type=None, num_bins=50, display_now=True, show_map=True):
+        histograms = self.compute_histograms(data_type, num_bins)
+        for (data_type, label), histogram in histograms.items():
+            _figure = self._create_histogram_figure(data_type, label, num_bins=num_bins, histogram=histogram,
+                                                    show_map=show_map)
 
-            data = element_data[label]
-            figure = self._create_histogram_figure(data_type, label, data, num_bins=num_bins)
+        if display_now:
+            show()
+
+    def save_histogram_all(self, figure_path, data_type=None, num_bins=50, display_now=True, color_map_name='YlOrRd',
+                           show_map=True):
+        histograms = self.compute_histograms(data_type, num_bins)
+        for (data_type, label), histogram in histograms.items():
+            figure = self._create_histogram_figure(data_type, label, num_bins=num_bins, color_map_name=color_map_name,
+                                                   histogram=histogram, show_map=show_map)
 
             file_name = "Histogram_%s_%s.png" % (data_type, label)
             file_path = os.path.join(figure_path, file_name)
             figure.savefig(file_path)
             plt.close()
 
-    def display_histogram_all(self, data_type=None, num_bins=50, display_now=True):
-        with h5py.File(self.h5file_path, 'r') as h5file:
-            if data_type is None:
-                for dataTypeGroup in h5file:
-                    for label in h5file[dataTypeGroup]:
-                        data = h5file[dataTypeGroup][label][...]
-                        _figure = self._create_histogram_figure(dataTypeGroup, label, data, num_bins=num_bins)
-            else:
-                dataTypeGroup = h5file[data_type]
-                for label in dataTypeGroup:
-                    data = dataTypeGroup[label][...]
-                    _figure = self._create_histogram_figure(data_type, label, data, num_bins=num_bins)
+    def compute_histograms(self, data_type=None, num_bins=DEFAULT_NUMBER_BINS, bin_edges=None, force=False,
+                           block_size=DEFAULT_HISTOGRAM_BLOCK_SIZE):
+        """
+        Histogram of all the datasets of all the data types or of one data type, with their minimum, maximum and
+        percentiles.
 
-        if display_now:
-            show()
+        The histograms are saved as attributes of their dataset and are reused without reading the data, until
+        the dataset is modified. Each dataset is read by blocks of rows, the histograms of the element ratios
+        not saved in the project file are computed each time.
+
+        :param data_type: data type of the datasets, all the data types if None
+        :param num_bins: number of bins between the minimum and maximum of each dataset
+        :param bin_edges: fixed bin edges used for all the datasets instead of the number of bins
+        :param force: compute the histograms even if a saved one is compatible
+        :param block_size: maximum number of pixels read at once
+        :return: dict of :py:class:`~xrayphasemap.histogram.Histogram` for each ``(data_type, label)``
+
+        """
+        if data_type is None:
+            data_types = self.get_data_types()
+        else:
+            data_types = [data_type]
+
+        histograms = collections.OrderedDict()
+        with self._project_file(writable=self.mode != MODE_READ_ONLY) as h5file:
+            for data_type in data_types:
+                for label in _get_group_labels(h5file, data_type):
+                    histograms[(data_type, label)] = _get_histogram(h5file, data_type, label, num_bins, bin_edges,
+                                                                    force, block_size,
+                                                                    self.mode != MODE_READ_ONLY)
 
-    def save_histogram_all(self, figure_path, data_type=None, num_bins=50, display_now=True, color_map_name='YlOrRd'):
-        with h5py.File(self.h5file_path, 'r') as h5file:
+        return histograms
+
+    def get_histogram(self, data_type, label, num_bins=DEFAULT_NUMBER_BINS, bin_edges=None, force=False):
+        """
+        Histogram of one dataset, see :py:meth:`compute_histograms`.
+        """
+        with self._project_file(writable=self.mode != MODE_READ_ONLY) as h5file:
+            return _get_histogram(h5file, data_type, label, num_bins, bin_edges, force, DEFAULT_HISTOGRAM_BLOCK_SIZE,
+                                  self.mode != MODE_READ_ONLY)
+
+    def _iterate_data(self, data_type=None):
+        """
+        Iterate over ``(data_type, label, data)`` of all the data types or of one data type without using the cache.
+        """
+        with self._project_file() as h5file:
             if data_type is None:
-                for data_type in h5file:
-                    for label in h5file[data_type]:
-                        data = h5file[data_type][label][...]
-                        figure = self._create_histogram_figure(data_type, label, data, num_bins=num_bins, color_map_name=color_map_name)
-
-                        file_name = "Histogram_%s_%s.png" % (data_type, label)
-                        file_path = os.path.join(figure_path, file_name)
-                        figure.savefig(file_path)
-                        plt.close()
+                data_types = _get_data_type_names(h5file)
             else:
-                data_type_group = h5file[data_type]
-                for label in data_type_group:
-                    data = data_type_group[label][...]
-                    figure = self._create_histogram_figure(data_type, label, data, num_bins=num_bins, color_map_name=color_map_name)
+                data_types = [data_type]
+
+            for data_type in data_types:
+                for label in _get_group_labels(h5file, data_type):
+                    yield data_type, label, _read_channel(h5file, data_type, label)
 
-                    file_name = "Histogram_%s_%s.png" % (data_type, label)
-                    file_path = os.path.join(figure_path, file_name)
-                    figure.savefig(file_path)
-                    plt.close()
+    def _create_histogram_figure(self, data_type, label, num_bins=50, color_map_name='YlOrRd', histogram=None,
+                                 show_map=True, preview_size=DEFAULT_PREVIEW_SIZE):
+        if histogram is None:
+            histogram = self.get_histogram(data_type, label, num_bins)
 
-    def _create_histogram_figure(self, data_type, label, data, num_bins=50, color_map_name='YlOrRd'):
-        fig, (ax0, ax1) = plt.subplots(ncols=2, figsize=(8, 4))
+        if show_map:
+            fig, (ax0, ax1) = plt.subplots(ncols=2, figsize=(8, 4))
+        else:
+            fig, ax0 = plt.subplots(figsize=(4, 4))
 
         title = "%s %s" % (data_type, label)
         fig.suptitle(title)
 
         # This is  the colormap I'd like to use.
-        color_map = plt.cm.get_cmap(color_map_name)
-        image = ax1.imshow(data, aspect='equal', cmap=color_map)
-        ax1.axis('off')
-        fig.colorbar(image)
+        color_map = get_color_map(color_map_name)
+        if show_map:
+            data, _factor = self.get_preview(data_type, label, preview_size)
+            image = ax1.imshow(data, aspect='equal', cmap=color_map)
+            ax1.axis('off')
+            fig.colorbar(image)
 
         # Get the histogram
-        Y, X = np.histogram(data, num_bins, normed=True)
+        Y, X = histogram.get_density(), histogram.bin_edges
         x_span = X.max() - X.min()
         C = [color_map(((x-X.min())/x_span)) for x in X]
 
@@ -235,73 +604,218 @@ class PhaseAnalysis(object):
 
         return fig
 
-    def display_scatter_diagram(self, data_type, label_a, label_b, num_bins=50, display_now=True):
-        with h5py.File(self.h5file_path, 'r') as h5file:
-            element_data = _get_data(h5file, data_type)
+    def display_scatter_diagram(self, data_type, label_a, label_b, num_bins=50, display_now=True, log_density=False,
+                                ranges=None, color_map_name='YlOrRd'):
+        scatter_histogram = self.compute_scatter_histogram(data_type, label_a, label_b, num_bins, ranges)
+        _figure = self._create_scatter_diagram(data_type, label_a, label_b, scatter_histogram, color_map_name,
+                                               log_density)
+
+        if display_now:
+            show()
+
+    def save_scatter_diagram(self, data_type, label_a, label_b, figures_path, num_bins=50, log_density=False,
+                             ranges=None, color_map_name='YlOrRd', scatter_histogram=None):
+        if scatter_histogram is None:
+            scatter_histogram = self.compute_scatter_histogram(data_type, label_a, label_b, num_bins, ranges)
+        figure = self._create_scatter_diagram(data_type, label_a, label_b, scatter_histogram, color_map_name,
+                                              log_density)
 
-            data_a = element_data[label_a]
-            data_b = element_data[label_b]
-            _figure = self._create_scatter_diagram(data_type, label_a, label_b, data_a, data_b, num_bins=num_bins)
+        file_name = "Scatter_%s_%s-%s.png" % (data_type, label_a, label_b)
+        file_path = os.path.join(figures_path, file_name)
+        figure.savefig(file_path)
+        plt.close(figure)
 
-            if display_now:
-                show()
+        return file_path
 
-    def _create_scatter_diagram(self, data_type, label_a, label_b, data_a, data_b, num_bins=50, color_map_name='YlOrRd'):
-        fig, (ax0, ax1) = plt.subplots(ncols=2, figsize=(8, 4))
+    def save_scatter_matrix(self, figures_path, data_type, labels=None, num_bins=50, log_density=True, ranges=None,
+                            color_map_name='YlOrRd', save_pairs=False):
+        """
+        Save the scatter diagrams of all the pairs of datasets of a data type in one figure, the histogram of each
+        dataset is on the diagonal.
 
-        label = "{}-{}".format(label_a, label_b)
-        title = "%s %s" % (data_type, label)
-        fig.suptitle(title)
+        All the scatter histograms are computed in one pass over the datasets, see :py:meth:`compute_scatter_matrix`.
 
-        # This is  the colormap I'd like to use.
-        x = data_a.flatten()
-        y = data_b.flatten()
-        minimum = 0.04
-        range = [[minimum, 1.0], [minimum, 1.0]]
+        :param save_pairs: also save the figure of each pair, see :py:meth:`save_scatter_diagram`
+        :return: file path of the figure of the matrix
+        """
+        if labels is None:
+            labels = self.get_labels(data_type)
+        scatter_histograms = self.compute_scatter_matrix(data_type, labels, num_bins, ranges)
 
-        color_map = plt.cm.get_cmap(color_map_name)
-        counts, xedges, yedges, image = ax1.hist2d(x, y, range=range, bins=num_bins, cmap=color_map)
-        fig.colorbar(image)
-        ax1.set_xlabel(label_a)
-        ax1.set_ylabel(label_b)
+        figure = self._create_scatter_matrix(data_type, labels, scatter_histograms, color_map_name, log_density)
+        file_name = "ScatterMatrix_%s.png" % (data_type)
+        file_path = os.path.join(figures_path, file_name)
+        figure.savefig(file_path)
+        plt.close(figure)
 
-        # Get the histogram
-        # Y, X = np.histogram(data, num_bins, normed=True)
-        # x_span = X.max() - X.min()
-        # C = [color_map(((x-X.min())/x_span)) for x in X]
+        if save_pairs:
+            for (label_a, label_b), scatter_histogram in scatter_histograms.items():
+                self.save_scatter_diagram(data_type, label_a, label_b, figures_path, log_density=log_density,
+                                          color_map_name=color_map_name, scatter_histogram=scatter_histogram)
 
-        ax0.plot(data_a.flatten(), data_b.flatten(), '.')
-        # ax0.hist(data.flatten(), num_bins, normed=1, facecolor='green', alpha=0.5)
+        return file_path
+
+    def compute_scatter_histogram(self, data_type, label_a, label_b, num_bins=50, ranges=None,
+                                  block_size=DEFAULT_HISTOGRAM_BLOCK_SIZE):
+        """
+        Scatter histogram of two datasets, see :py:meth:`compute_scatter_matrix`.
+        """
+        scatter_histograms = self.compute_scatter_matrix(data_type, [label_a, label_b], num_bins, ranges, block_size)
+        return scatter_histograms[(label_a, label_b)]
+
+    def compute_scatter_matrix(self, data_type, labels=None, num_bins=50, ranges=None,
+                               block_size=DEFAULT_HISTOGRAM_BLOCK_SIZE):
+        """
+        Scatter histogram of each pair of datasets of a data type, computed in one pass by blocks of rows.
+
+        :param data_type: data type of the datasets
+        :param labels: labels of the datasets, all the labels of the data type if None
+        :param num_bins: number of bins of each dataset
+        :param ranges: range ``(minimum, maximum)`` of all the datasets or dict of the range of each label, the
+            minimum and maximum of the histogram of each dataset by default, see :py:meth:`get_histogram`
+        :param block_size: maximum number of pixels read at once, for all the datasets
+        :return: dict of :py:class:`~xrayphasemap.scatter.ScatterHistogram` for each pair ``(label_a, label_b)``,
+            in the order of the labels with label_a before label_b
+
+        """
+        if labels is None:
+            labels = self.get_labels(data_type)
+        labels = list(labels)
+
+        channel_ranges = []
+        for label in labels:
+            if ranges is None:
+                histogram = self.get_histogram(data_type, label)
+                channel_range = (histogram.minimum, histogram.maximum)
+            elif isinstance(ranges, dict):
+                channel_range = ranges[label]
+            else:
+                channel_range = ranges
+            channel_ranges.append(get_range(*channel_range))
+
+        pairs = [(index_a, index_b) for index_a in range(len(labels)) for index_b in range(index_a + 1, len(labels))]
+
+        with self._project_file() as h5file:
+            number_rows, number_columns = _get_channel_shape(h5file, data_type, labels[0])
+
+            def read_rows(start, stop):
+                return [_read_channel(h5file, data_type, label, np.s_[start:stop]) for label in labels]
+
+            block_rows = max(1, block_size // max(1, number_columns*len(labels)))
+            scatter_histograms = compute_scatter_histograms(read_rows, number_rows, pairs, channel_ranges, num_bins,
+                                                            block_rows)
+
+        results = collections.OrderedDict()
+        for (index_a, index_b), scatter_histogram in zip(pairs, scatter_histograms):
+            results[(labels[index_a], labels[index_b])] = scatter_histogram
+
+        return results
+
+    def _create_scatter_diagram(self, data_type, label_a, label_b, scatter_histogram, color_map_name='YlOrRd',
+                                log_density=False):
+        fig, ax0 = plt.subplots(figsize=(5, 4))
+
+        label = "{}-{}".format(label_a, label_b)
+        title = "%s %s" % (data_type, label)
+        fig.suptitle(title)
+
+        color_map = get_color_map(color_map_name)
+        image = ax0.imshow(scatter_histogram.get_image(log_density), origin='lower', aspect='auto',
+                           extent=scatter_histogram.extent, cmap=color_map, interpolation='nearest')
+        color_bar = fig.colorbar(image)
+        color_bar.set_label("log10(Counts)" if log_density else "Counts")
         ax0.set_xlabel(label_a)
         ax0.set_ylabel(label_b)
 
-        plt.subplots_adjust(wspace=0.2, top=0.85, bottom=0.15)
+        return fig
+
+    def _create_scatter_matrix(self, data_type, labels, scatter_histograms, color_map_name='YlOrRd',
+                               log_density=True):
+        number_labels = len(labels)
+        fig, axes = plt.subplots(number_labels, number_labels, figsize=(2*number_labels, 2*number_labels),
+                                 squeeze=False)
+        fig.suptitle(data_type)
+
+        color_map = get_color_map(color_map_name)
+        for row, label_y in enumerate(labels):
+            for column, label_x in enumerate(labels):
+                axis = axes[row, column]
+
+                if row == column:
+                    pair = _get_any_pair(scatter_histograms, label_x)
+                    if pair is not None:
+                        (label_a, _label_b), scatter_histogram = pair
+                        if label_a == label_x:
+                            counts, bin_edges = scatter_histogram.counts.sum(axis=1), scatter_histogram.x_edges
+                        else:
+                            counts, bin_edges = scatter_histogram.counts.sum(axis=0), scatter_histogram.y_edges
+                        axis.bar(bin_edges[:-1], counts, width=np.diff(bin_edges), align='edge')
+                    axis.set_yticks([])
+                else:
+                    if (label_x, label_y) in scatter_histograms:
+                        scatter_histogram = scatter_histograms[(label_x, label_y)]
+                    else:
+                        scatter_histogram = scatter_histograms[(label_y, label_x)].transpose()
+                    axis.imshow(scatter_histogram.get_image(log_density), origin='lower', aspect='auto',
+                                extent=scatter_histogram.extent, cmap=color_map, interpolation='nearest')
+
+                if row == number_labels - 1:
+                    axis.set_xlabel(label_x)
+                else:
+                    axis.set_xticklabels([])
+                if column == 0:
+                    axis.set_ylabel(label_y)
+                elif row != column:
+                    axis.set_yticklabels([])
 
         return fig
 
-    def save_map_all(self, figures_path, data_type=None, display_now=True, color_map_name='YlOrRd'):
-        with h5py.File(self.h5file_path, 'r') as h5file:
-            if data_type is None:
-                for data_type in h5file:
-                    for label in h5file[data_type]:
-                        data_type_group = h5file[data_type]
-                        data = data_type_group[label][...]
-                        figure = self._create_map_figure(data_type, label, data, color_map_name)
-
-                        file_name = "map_%s_%s.png" % (data_type, label)
-                        file_path = os.path.join(figures_path, file_name)
-                        figure.savefig(file_path)
-                        plt.close()
-            else:
-                data_type_group = h5file[data_type]
-                for label in data_type_group:
-                    data = data_type_group[label][...]
-                    figure = self._create_map_figure(data_type, label, data, color_map_name)
+    def save_map_all(self, figures_path, data_type=None, display_now=True, color_map_name='YlOrRd', raw=False,
+                     preview_size=DEFAULT_PREVIEW_SIZE):
+        """
+        Save the map of all the datasets of all the data types or of one data type.
+
+        :param raw: save only the colored pixels of the map, without the figure, title and color bar
+        :param preview_size: size of the level of the pyramid drawn in the figure, see :py:meth:`get_preview`
+        """
+        if raw:
+            for data_type, label, data in self._iterate_data(data_type):
+                file_name = "map_%s_%s.png" % (data_type, label)
+                save_map_image(os.path.join(figures_path, file_name), data, color_map_name)
+        else:
+            data_types = self.get_data_types() if data_type is None else [data_type]
+            for data_type in data_types:
+                for label in self.get_labels(data_type):
+                    self.save_map_one(data_type, label, figures_path, color_map_name, preview_size=preview_size)
+
+    def save_map_one(self, data_type, label, figures_path, color_map_name='YlOrRd', raw=False,
+                     preview_size=DEFAULT_PREVIEW_SIZE):
+        """
+        Save the map of one dataset, see :py:meth:`save_map_all`.
+        """
+        file_name = "map_%s_%s.png" % (data_type, label)
+        file_path = os.path.join(figures_path, file_name)
+
+        if raw:
+            save_map_image(file_path, self.get_data(data_type, label), color_map_name)
+        else:
+            data, _factor = self.get_preview(data_type, label, preview_size)
+            figure = self._create_map_figure(data_type, label, data, color_map_name)
+            figure.savefig(file_path)
+            plt.close()
 
-                    file_name = "map_%s_%s.png" % (data_type_group, label)
-                    file_path = os.path.join(figures_path, file_name)
-                    figure.savefig(file_path)
-                    plt.close()
+        return file_path
+
+    def display_map_one(self, data_type, label, color_map_name='YlOrRd', display_now=True,
+                        preview_size=DEFAULT_PREVIEW_SIZE):
+        """
+        Display the map of one dataset from the level of the pyramid matching the preview size.
+        """
+        data, _factor = self.get_preview(data_type, label, preview_size)
+        _figure = self._create_map_figure(data_type, label, data, color_map_name)
+
+        if display_now:
+            show()
 
     def _create_map_figure(self, data_type_group, label, data, color_map_name='YlOrRd'):
         fig, ax0 = plt.subplots()
@@ -309,7 +823,7 @@ class PhaseAnalysis(object):
         title = "%s %s" % (data_type_group, label)
         fig.suptitle(title)
 
-        color_map = plt.cm.get_cmap(color_map_name)
+        color_map = get_color_map(color_map_name)
         # This is  the colormap I'd like to use.
         image = ax0.imshow(data, aspect='equal', cmap=color_map)
         ax0.axis('off')
@@ -318,35 +832,51 @@ class PhaseAnalysis(object):
         return fig
 
     def save_map_tiff(self, data_type, label, figures_path, color):
-        cm = plt.get_cmap(color)
-        with h5py.File(self.h5file_path, 'r') as h5file:
-            data_type_group = h5file[data_type]
-
-            data = data_type_group[label][...]
+        data = self.get_data(data_type, label)
 
-            filename = "map_%s_%s.tif" % (data_type, label)
-            file_path = os.path.join(figures_path, filename)
-            plt.imsave(file_path, data, cmap=cm)
+        filename = "map_%s_%s.tif" % (data_type, label)
+        file_path = os.path.join(figures_path, filename)
+        save_map_image(file_path, data, color)
 
-    def save_micrographs_tif(self, graphic_path, basename):
-        with h5py.File(self.h5file_path, 'r') as h5file:
+    def save_micrographs_tif(self, graphic_path, basename, color_map_name=None):
+        """
+        Save the micrographs as gray images scaled by their maximum, or as color images with a color map.
+        """
+        with self._project_file() as h5file:
             data_type_group = h5file[GROUP_MICROGRAPH]
 
             for micrographType in data_type_group:
-                data = data_type_group[micrographType][...]
+                data = read_dataset(data_type_group[micrographType])
 
-                image = Image.fromarray(np.uint8(data*255.0/np.max(data)))
                 filename = "%s_%s.png" % (basename, micrographType)
                 file_path = os.path.join(graphic_path, filename)
-                image.save(file_path)
+                if color_map_name is None:
+                    image = Image.fromarray(np.uint8(data*255.0/np.max(data)))
+                    image.save(file_path)
+                else:
+                    save_map_image(file_path, data, color_map_name)
 
-    def compute_fratio(self, input_data_type, weight_type=None, filter_size=0):
+    def compute_fratio(self, input_data_type, weight_type=None, filter_size=0, block_rows=None, force=False):
+        """
+        Compute the f-ratio of each element, the intensity of the element divided by the total intensity.
+
+        The maps of all the elements are stacked in one array read by blocks of rows and the ratios are computed in
+        place, the memory used is bounded by the number of rows of a block. The pixels without intensity are zero.
+
+        :param input_data_type: data type of the intensity maps
+        :param weight_type: micrograph type used to weight the f-ratio, the micrograph is normalized by its maximum
+        :param filter_size: size of the median filter applied on each f-ratio map, no filter if 0
+        :param block_rows: number of rows computed at once, all the rows if None
+        :param force: compute the f-ratios even if they are up to date with their inputs and parameters
+        :return: labels of the f-ratios computed, empty if they were up to date
+
+        """
         if weight_type is not None:
             output_data_type = DATA_TYPE_FRATIO + weight_type
         else:
             output_data_type = DATA_TYPE_FRATIO
 
-        with h5py.File(self.h5file_path, 'a') as h5file:
+        with self._project_file(writable=True) as h5file:
             if output_data_type not in h5file:
                 group_name = "/{}".format(output_data_type)
                 data_type_group = h5file.create_group(group_name)
@@ -355,55 +885,119 @@ class PhaseAnalysis(object):
 
             logging.info(output_data_type)
 
-            element_data = _get_data(h5file, input_data_type)
-
-            first_element = list(element_data.values())[0]
-            total_intensity = np.zeros_like(first_element)
+            input_group = h5file[input_data_type]
+            labels = list(input_group)
+            width, height = input_group[labels[0]].shape
 
-            for label in element_data:
-                total_intensity += element_data[label]
+            input_datasets = [input_group[label] for label in labels]
+            if weight_type is not None:
+                input_datasets.append(h5file[GROUP_MICROGRAPH][weight_type])
+            parameters = {"input data type": input_data_type, "weight type": weight_type,
+                          "filter size": int(filter_size)}
+            provenance = create_provenance(h5file, input_datasets, parameters)
 
-            logging.debug(np.min(total_intensity))
-            logging.debug(np.max(total_intensity))
+            if not force and _is_group_up_to_date(data_type_group, labels, provenance):
+                logging.info("%s is up to date", output_data_type)
+                return []
 
             if weight_type is not None:
-                weight = h5file[GROUP_MICROGRAPH][weight_type][...]
-                weight /= np.max(weight)
+                weight_dataset = h5file[GROUP_MICROGRAPH][weight_type]
+                weight_scale = np.float32(np.max(read_dataset(weight_dataset)))
             else:
-                weight = 1.0
+                weight_dataset = None
 
-            for label in element_data:
+            datasets = []
+            for label in labels:
                 if label not in data_type_group:
-                    dataset = data_type_group.create_dataset(label, total_intensity.shape, dtype=np.float32)
+                    dataset = create_dataset(data_type_group, label, (width, height), np.float32, self.storage_policy)
+                    self._register_dataset(output_data_type, label)
                 else:
                     dataset = data_type_group[label]
+                datasets.append(dataset)
+
+            if block_rows is None:
+                block_rows = width
+            # The median filter needs the neighbor rows of the block.
+            halo = filter_size // 2 + 1 if filter_size > 0 else 0
+
+            cube = np.empty((len(labels), min(width, block_rows + 2*halo), height), dtype=np.float32)
+            total_intensity = np.empty(cube.shape[1:], dtype=np.float32)
+            weight = np.empty(cube.shape[1:], dtype=np.float32)
+
+            for start in range(0, width, block_rows):
+                stop = min(start + block_rows, width)
+                read_start = max(0, start - halo)
+                read_stop = min(width, stop + halo)
+                number_rows = read_stop - read_start
+                rows = np.s_[read_start:read_stop]
+
+                block = cube[:, :number_rows]
+                for index, label in enumerate(labels):
+                    input_group[label].read_direct(block[index], source_sel=rows)
+
+                block_total_intensity = total_intensity[:number_rows]
+                block_total_intensity[...] = block[0]
+                for index in range(1, len(labels)):
+                    np.add(block_total_intensity, block[index], out=block_total_intensity)
+
+                if weight_dataset is not None:
+                    block_weight = weight[:number_rows]
+                    weight_dataset.read_direct(block_weight, source_sel=rows)
+                    np.divide(block_weight, weight_scale, out=block_weight)
+
+                is_intensity = block_total_intensity != 0
+                for index, dataset in enumerate(datasets):
+                    data = block[index]
+                    if weight_dataset is not None:
+                        np.multiply(block_weight, data, out=data)
+                    np.divide(data, block_total_intensity, out=data, where=is_intensity)
+                    data[~is_intensity] = 0
+
+                    if filter_size > 0:
+                        data = ndimage.median_filter(data, size=filter_size)
+
+                    data = np.ascontiguousarray(data[start - read_start:stop - read_start])
+                    dataset.write_direct(data, dest_sel=np.s_[start:stop])
+
+            for label in labels:
+                self._dataset_modified(output_data_type, label, h5file)
+                write_provenance(data_type_group[label], provenance)
+
+        return labels
+
+    def compute_total_peak_intensity(self, input_data_type, force=False):
+        """
+        Compute the sum of the intensity of all the elements, normalized between 0 and 1, as a micrograph.
 
-                data = weight*element_data[label] / total_intensity
-                data[np.isnan(data)] = 0
-                logging.debug(np.max(data))
-
-                if filter_size > 0:
-                    data = ndimage.median_filter(data, size=filter_size)
-
-                dataset[:, :] = data
+        :param input_data_type: data type of the intensity maps
+        :param force: compute the total intensity even if it is up to date with its inputs
+        :return: True if the total intensity was computed, False if it was up to date
 
-    def compute_total_peak_intensity(self, input_data_type):
+        """
         output_data_type = GROUP_MICROGRAPH
 
-        with h5py.File(self.h5file_path, 'a') as h5file:
+        with self._project_file(writable=True) as h5file:
             if output_data_type not in h5file:
                 group_name = "/{}".format(output_data_type)
                 data_type_group = h5file.create_group(group_name)
             else:
                 data_type_group = h5file[output_data_type]
 
+            input_group = h5file[input_data_type]
+            provenance = create_provenance(h5file, [input_group[label] for label in input_group],
+                                           {"input data type": input_data_type})
+
+            if not force and _is_group_up_to_date(data_type_group, [DATA_TYPE_TOTAL_PEAK_INTENSITY], provenance):
+                logging.info("%s is up to date", DATA_TYPE_TOTAL_PEAK_INTENSITY)
+                return False
+
             element_data = _get_data(h5file, input_data_type)
+            labels = list(element_data)
 
-            total_intensity = np.zeros_like(element_data[self.elements[0]])
+            total_intensity = np.zeros_like(element_data[labels[0]], dtype=np.float64)
 
-            for symbol in self.elements:
-                if symbol in element_data:
-                    total_intensity += element_data[symbol]
+            for symbol in labels:
+                total_intensity += element_data[symbol]
 
             logging.debug(np.min(total_intensity))
             logging.debug(np.max(total_intensity))
@@ -411,15 +1005,32 @@ class PhaseAnalysis(object):
             total_intensity = (total_intensity - np.min(total_intensity))  / (np.max(total_intensity) - np.min(total_intensity))
 
             if DATA_TYPE_TOTAL_PEAK_INTENSITY not in data_type_group:
-                dataset = data_type_group.create_dataset(DATA_TYPE_TOTAL_PEAK_INTENSITY, total_intensity.shape, dtype=np.float32)
+                dataset = create_dataset(data_type_group, DATA_TYPE_TOTAL_PEAK_INTENSITY, total_intensity.shape, np.float32,
+                                         self.storage_policy)
+                self._register_dataset(output_data_type, DATA_TYPE_TOTAL_PEAK_INTENSITY)
             else:
                 dataset = data_type_group[DATA_TYPE_TOTAL_PEAK_INTENSITY]
             dataset[:, :] = total_intensity
+            self._dataset_modified(output_data_type, DATA_TYPE_TOTAL_PEAK_INTENSITY, h5file)
+            write_provenance(dataset, provenance)
+
+        return True
 
-    def compute_element_ratio(self, input_data_type):
+    def compute_element_ratio(self, input_data_type, persist=False, force=False):
+        """
+        Register the ratio of each pair of different labels of the data type as the element ratio data type.
+
+        No data is computed here, each ratio, like ``Fe_O``, is computed when it is read by :py:meth:`get_data`, for
+        example by a phase condition or a figure, and kept in the cache.
+
+        :param input_data_type: data type of the elements
+        :param persist: save each ratio in the project file when it is computed
+        :param force: remove all the saved ratios, otherwise only the ones not up to date with their inputs
+
+        """
         output_data_type = DATA_TYPE_ELEMENT_RATIO
 
-        with h5py.File(self.h5file_path, 'a') as h5file:
+        with self._project_file(writable=True) as h5file:
             if output_data_type not in h5file:
                 group_name = "/{}".format(output_data_type)
                 data_type_group = h5file.create_group(group_name)
@@ -428,34 +1039,149 @@ class PhaseAnalysis(object):
 
             logging.info(output_data_type)
 
-            element_data = _get_data(h5file, input_data_type)
+            is_same_input = data_type_group.attrs.get(ATTRIBUTE_INPUT_DATA_TYPE) == input_data_type
+            for label in list(data_type_group):
+                if force or not is_same_input or not _is_ratio_up_to_date(h5file, output_data_type, label):
+                    del data_type_group[label]
 
-            for label_A in element_data:
-                for label_B in element_data:
-                    if label_A is not label_B:
-                        label_A_B = "%s_%s" % (label_A, label_B)
-                        if label_A_B not in data_type_group:
-                            dataset = data_type_group.create_dataset(label_A_B, element_data[label_A].shape, dtype=np.float32)
-                        else:
-                            dataset = data_type_group[label_A_B]
+            data_type_group.attrs[ATTRIBUTE_INPUT_DATA_TYPE] = input_data_type
+            data_type_group.attrs[ATTRIBUTE_PERSIST] = persist
 
-                        data = element_data[label_A] / element_data[label_B]
-                        data[np.isnan(data)] = 0
-                        logging.info(np.max(data))
-                        logging.info(np.min(data))
-                        dataset[:, :] = data
+            if self.is_open:
+                self._index[output_data_type] = list(data_type_group)
+                self._virtual_inputs[output_data_type] = input_data_type
+
+        self.cache.invalidate(output_data_type)
+        self.modification_count += 1
 
     def get_data(self, data_type, label):
-        with h5py.File(self.h5file_path, 'r') as h5file:
+        """
+        Read a dataset, the data is kept in :py:attr:`cache` and the returned array is read-only.
+
+        The element ratios not saved in the project file, or saved but not up to date with their inputs, are
+        computed from their input data type.
+        """
+        key = (data_type, label)
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+
+        with self._project_file() as h5file:
             data_type_group = h5file[data_type]
+            is_ratio = data_type_group.attrs.get(ATTRIBUTE_INPUT_DATA_TYPE) is not None
+            is_virtual = label not in data_type_group or (is_ratio and not _is_ratio_up_to_date(h5file, data_type,
+                                                                                                 label))
+            is_persist = bool(data_type_group.attrs.get(ATTRIBUTE_PERSIST, False))
+
+            data = _read_channel(h5file, data_type, label)
+            if is_ratio:
+                input_data_type = data_type_group.attrs[ATTRIBUTE_INPUT_DATA_TYPE]
+                self._ratio_inputs[key] = [(input_data_type, input_label)
+                                           for input_label in _get_ratio_inputs(h5file, data_type, label)]
+
+        if is_virtual and is_persist and self.mode != MODE_READ_ONLY:
+            with self._project_file(writable=True) as h5file:
+                if label in h5file[data_type]:
+                    del h5file[data_type][label]
+                    remove_pyramid(h5file, data_type, label)
+                dataset = create_dataset(h5file[data_type], label, data.shape, np.float32, self.storage_policy)
+                dataset[...] = data
+                new_revision(h5file, dataset)
+                write_provenance(dataset, _get_ratio_provenance(h5file, data_type, label))
+                self._register_dataset(data_type, label)
+
+        self.cache.put(key, data)
+        return data
 
-            data = data_type_group[label][...]
+    def get_preview(self, data_type, label, size=DEFAULT_PREVIEW_SIZE):
+        """
+        Data of a dataset at the level of its pyramid with at least ``size`` pixels along the largest side.
 
-            return data
+        The full resolution data is returned for small datasets or if the size is None. The pyramid missing or
+        not up to date is built, or the level is computed in memory if the project file is read-only.
+
+        :return: ``(data, factor)``, where factor is the size of the block of pixels of the full resolution data
+                 averaged in each pixel of the preview
+
+        """
+        with self._project_file() as h5file:
+            shape = _get_channel_shape(h5file, data_type, label)
+            factor = select_factor(shape, get_level_factors(shape), size) if size is not None else 1
+
+            if factor > 1:
+                pyramid_group = get_pyramid_group(h5file, data_type, label)
+                source = _get_pyramid_source(h5file, data_type, label, is_writable=False)
+                if is_pyramid_up_to_date(pyramid_group, source) and factor in get_factors(pyramid_group):
+                    return read_level(pyramid_group, factor), factor
+
+        if factor == 1:
+            return self.get_data(data_type, label), factor
+
+        if self.mode == MODE_READ_ONLY:
+            return compute_preview(self.get_data(data_type, label), size)
+
+        with self._project_file(writable=True) as h5file:
+            _build_pyramid(h5file, data_type, label, False, DEFAULT_PYRAMID_BLOCK_SIZE, self.storage_policy)
+            return read_level(get_pyramid_group(h5file, data_type, label), factor), factor
+
+    def build_pyramids(self, data_type=None, force=False, block_size=DEFAULT_PYRAMID_BLOCK_SIZE):
+        """
+        Build the pyramid of all the datasets of all the data types or of one data type, each dataset is read once.
+
+        The pyramid of a dataset is the levels 2x, 4x, 8x... down to the first level not larger than
+        :py:const:`~xrayphasemap.pyramid.MINIMUM_LEVEL_SIZE` pixels. It is saved in the project file with the
+        revision of the dataset and removed when the dataset is modified.
+
+        :param data_type: data type of the datasets, all the data types if None
+        :param force: build the pyramids even if they are up to date
+        :param block_size: maximum number of pixels read at once
+        :return: list of ``(data_type, label)`` of the pyramids built
+
+        """
+        built_pyramids = []
+        with self._project_file(writable=True) as h5file:
+            data_types = _get_data_type_names(h5file) if data_type is None else [data_type]
+            for data_type in data_types:
+                for label in _get_group_labels(h5file, data_type):
+                    if _build_pyramid(h5file, data_type, label, force, block_size, self.storage_policy):
+                        built_pyramids.append((data_type, label))
+
+        return built_pyramids
+
+    def get_classification_level(self, name, classification, key, channels, factor):
+        """
+        Fraction of the pixels of each phase of a classification at the level of its pyramid for the factor.
+
+        The pyramid is saved in the project file under the name of the phase map with the key of the classification
+        and the revision of the datasets of the conditions, it is removed when one of these datasets is modified.
+        The level is computed in memory if the project file is read-only.
+
+        :param name: name of the phase map
+        :param classification: :py:class:`~xrayphasemap.map.PhaseClassification` of the phases
+        :param key: text of the phases, conditions and morphology of the classification
+        :param channels: ``(data_type, label)`` of the conditions of the phases
+        :param factor: factor of the level, 2, 4, 8...
+        :return: array ``(rows, columns, phases)``
+
+        """
+        with self._project_file() as h5file:
+            pyramid_group = get_pyramid_group(h5file, GROUP_PHASE_MAP, name)
+            source = _get_classification_source(h5file, key, channels, is_writable=False)
+            if is_pyramid_up_to_date(pyramid_group, source) and factor in get_factors(pyramid_group):
+                return read_level(pyramid_group, factor)
+
+        if self.mode == MODE_READ_ONLY:
+            return compute_level(classification.get_phase_data(), factor)
+
+        with self._project_file(writable=True) as h5file:
+            _build_classification_pyramid(h5file, name, classification, key, channels, DEFAULT_PYRAMID_BLOCK_SIZE,
+                                          self.storage_policy)
+            return read_level(get_pyramid_group(h5file, GROUP_PHASE_MAP, name), factor)
 
     def get_element_data(self, data_type):
-        with h5py.File(self.h5file_path, 'r') as h5file:
-            element_data = _get_data(h5file, data_type)
+        element_data = {}
+        for label in self.get_labels(data_type):
+            element_data[label] = np.array(self.get_data(data_type, label))
 
         return element_data
 
@@ -489,32 +1215,134 @@ class PhaseAnalysis(object):
         return phase_fraction
 
     def compute_compound_index(self, phases, is_dilation_erosion, union):
-        width, height = self.get_width_height()
-        compound_index = np.zeros((width, height), dtype='bool')
+        compound_indexes = self.compute_compound_indexes([(phases, union)], is_dilation_erosion)
+        return compound_indexes[0]
+
+    def compute_compound_indexes(self, phase_groups, is_dilation_erosion, max_workers=None):
+        """
+        Compute the compound index of each group of phases, all the phases are classified in one call.
+
+        The blocks of rows of the classification and the groups of the dilation and erosion are independent, they are
+        evaluated in a thread pool, numpy and scipy release the GIL. The result does not depend on the number of
+        threads.
+
+        :param phase_groups: list of ``(phases, union)``, where phases is a phase or a list of phases
+        :param is_dilation_erosion: apply the default dilation and erosion on each compound index if True, or a :py:class:`~xrayphasemap.morphology.MorphologyPipeline`
+        :param max_workers: number of threads, :py:attr:`max_workers` if None
+        :return: list of boolean compound indexes
+
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+
+        all_phases, groups = _group_phases(phase_groups)
+
+        phase_compound_indexes = self.compute_phase_compound_indexes(all_phases, max_workers=max_workers)
+
+        return _combine_phase_compound_indexes(phase_compound_indexes, groups, is_dilation_erosion, max_workers)
+
+    def compute_compound_indexes_tiled(self, phase_groups, is_dilation_erosion, output_labels,
+                                       output_data_type=DATA_TYPE_COMPOUND_INDEX, tile_size=DEFAULT_TILE_SIZE,
+                                       max_workers=None):
+        """
+        Compute the compound index of each group of phases tile by tile and save them in the project file.
+
+        Each tile is read from the datasets with a halo large enough for the dilation and erosion, so the result
+        is the same as :py:meth:`compute_compound_indexes`, but the memory used depends only on the tile size.
 
-        try:
-            phases[0]
-        except TypeError:
-            phases = [phases]
+        :param phase_groups: list of ``(phases, union)``, where phases is a phase or a list of phases
+        :param is_dilation_erosion: apply the default dilation and erosion on each compound index if True, or a :py:class:`~xrayphasemap.morphology.MorphologyPipeline`
+        :param output_labels: label of the output dataset of each group
+        :param output_data_type: data type of the output datasets
+        :param tile_size: number of pixels of the side of a tile
+        :param max_workers: number of threads used for each tile, :py:attr:`max_workers` if None
+        :return: number of pixels of each compound index
+
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+
+        if len(output_labels) != len(phase_groups):
+            raise ValueError("Expected %i output labels, got %i" % (len(phase_groups), len(output_labels)))
+
+        all_phases, groups = _group_phases(phase_groups)
+        classifier = PhaseClassifier(all_phases)
+
+        morphology_pipeline = get_morphology_pipeline(is_dilation_erosion)
+        if morphology_pipeline is not None:
+            halo = morphology_pipeline.halo
+        else:
+            halo = 0
 
-        for phase in phases:
-            phase_compound_index = self.compute_phase_compound_index(phase)
+        number_pixels = np.zeros(len(phase_groups), dtype=np.int64)
 
-            if union:
-                compound_index |= phase_compound_index
+        with self._project_file(writable=True) as h5file:
+            width = int(h5file.attrs.get(IMAGE_WIDTH))
+            height = int(h5file.attrs.get(IMAGE_HEIGHT))
+
+            if output_data_type not in h5file:
+                data_type_group = h5file.create_group("/{}".format(output_data_type))
             else:
-                compound_index &= phase_compound_index
+                data_type_group = h5file[output_data_type]
 
-        if is_dilation_erosion:
-            structure = ndimage.generate_binary_structure(2, 2)
+            datasets = []
+            for label in output_labels:
+                if label in data_type_group:
+                    del data_type_group[label]
+                dataset = create_dataset(data_type_group, label, (width, height), bool, self.storage_policy,
+                                         chunks=(tile_size, tile_size))
+                self._register_dataset(output_data_type, label)
+                datasets.append(dataset)
+
+            for row_start in range(0, width, tile_size):
+                row_stop = min(row_start + tile_size, width)
+                for column_start in range(0, height, tile_size):
+                    column_stop = min(column_start + tile_size, height)
+
+                    rows = slice(max(0, row_start - halo), min(width, row_stop + halo))
+                    columns = slice(max(0, column_start - halo), min(height, column_stop + halo))
+                    tile_rows = slice(row_start - rows.start, row_stop - rows.start)
+                    tile_columns = slice(column_start - columns.start, column_stop - columns.start)
+
+                    shape = (rows.stop - rows.start, columns.stop - columns.start)
+                    if len(classifier.channels) > 0:
+                        cube = [_read_channel(h5file, data_type, label, (rows, columns))
+                                for data_type, label in classifier.channels]
+                        phase_compound_indexes = classifier.classify(cube, max_workers=max_workers)
+                    else:
+                        phase_compound_indexes = np.ones((len(all_phases),) + shape, dtype='bool')
+
+                    compound_indexes = _combine_phase_compound_indexes(phase_compound_indexes, groups,
+                                                                       is_dilation_erosion, max_workers)
+
+                    for group_index, compound_index in enumerate(compound_indexes):
+                        tile = compound_index[tile_rows, tile_columns]
+                        datasets[group_index][row_start:row_stop, column_start:column_stop] = tile
+                        number_pixels[group_index] += np.count_nonzero(tile)
+
+            for label in output_labels:
+                self._dataset_modified(output_data_type, label, h5file)
+
+        return number_pixels
+
+    def compute_phase_compound_indexes(self, phases, block_size=DEFAULT_BLOCK_SIZE, max_workers=None):
+        """
+        Compute the compound index of each phase with a :py:class:`~xrayphasemap.classifier.PhaseClassifier`.
 
-            compound_index = ndimage.binary_closing(compound_index, structure, iterations=1)
-            compound_index = ndimage.binary_opening(compound_index, structure, iterations=1)
-            compound_index = ndimage.binary_closing(compound_index, structure, iterations=2)
-            compound_index = ndimage.binary_opening(compound_index, structure, iterations=2)
-            compound_index = ndimage.binary_closing(compound_index, structure, iterations=1)
+        :return: boolean array ``(phases, width, height)``, same result as :py:meth:`compute_phase_compound_index`
 
-        return compound_index
+        """
+        if max_workers is None:
+            max_workers = self.max_workers
+
+        classifier = PhaseClassifier(phases)
+
+        if len(classifier.channels) == 0:
+            width, height = self.get_width_height()
+            return np.ones((len(classifier.phases), width, height), dtype='bool')
+
+        cube = [self.get_data(data_type, label) for data_type, label in classifier.channels]
+        return classifier.classify(cube, block_size, max_workers)
 
     def compute_phase_compound_index(self, phase):
         width, height = self.get_width_height()
@@ -523,18 +1351,348 @@ class PhaseAnalysis(object):
         for data_type, label in phase.conditions:
             data = self.get_data(data_type, label)
             threshold_min, threshold_max = phase.conditions[(data_type, label)]
-            compound_index &= data >= threshold_min
-            compound_index &= data <= threshold_max
+            if threshold_min is not None:
+                compound_index &= data >= _get_threshold(threshold_min, data.dtype)
+            if threshold_max is not None:
+                compound_index &= data <= _get_threshold(threshold_max, data.dtype)
 
         return compound_index
 
 
+def _get_phase_list(phases):
+    try:
+        phases[0]
+    except TypeError:
+        phases = [phases]
+
+    return phases
+
+
+def _group_phases(phase_groups):
+    """
+    List each phase once and give the indexes of the phases of each group, the phases with the same conditions are
+    the same phase.
+    """
+    all_phases = []
+    phase_indexes_by_conditions = {}
+    groups = []
+    for phases, union in phase_groups:
+        phase_indexes = []
+        for phase in _get_phase_list(phases):
+            key = _get_conditions_key(phase)
+            if key not in phase_indexes_by_conditions:
+                phase_indexes_by_conditions[key] = len(all_phases)
+                all_phases.append(phase)
+            phase_indexes.append(phase_indexes_by_conditions[key])
+        groups.append((phase_indexes, union))
+
+    return all_phases, groups
+
+
+def _get_conditions_key(phase):
+    return frozenset(phase.conditions.items())
+
+
+def _combine_phase_compound_indexes(phase_compound_indexes, groups, is_dilation_erosion, max_workers=1):
+    """
+    Combine the phases of each group, the groups with the same phases and operator are combined once.
+    """
+    morphology_pipeline = get_morphology_pipeline(is_dilation_erosion)
+
+    group_indexes = []
+    unique_groups = {}
+    for phase_indexes, union in groups:
+        key = (tuple(sorted(set(phase_indexes))), bool(union))
+        group_indexes.append(unique_groups.setdefault(key, len(unique_groups)))
+
+    def combine(key):
+        return _combine_group(phase_compound_indexes, key, morphology_pipeline)
+
+    if max_workers == 1 or len(unique_groups) <= 1:
+        compound_indexes = [combine(key) for key in unique_groups]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            compound_indexes = list(executor.map(combine, unique_groups))
+
+    returned_indexes = set()
+    results = []
+    for group_index in group_indexes:
+        if group_index in returned_indexes:
+            results.append(compound_indexes[group_index].copy())
+        else:
+            returned_indexes.add(group_index)
+            results.append(compound_indexes[group_index])
+
+    return results
+
+
+def _combine_group(phase_compound_indexes, group, morphology_pipeline):
+    phase_indexes, union = group
+    if union:
+        compound_index = np.zeros(phase_compound_indexes.shape[1:], dtype='bool')
+    else:
+        compound_index = np.ones(phase_compound_indexes.shape[1:], dtype='bool')
+
+    for phase_index in phase_indexes:
+        phase_compound_index = phase_compound_indexes[phase_index]
+
+        if union:
+            compound_index |= phase_compound_index
+        else:
+            compound_index &= phase_compound_index
+
+    if morphology_pipeline is not None:
+        compound_index = morphology_pipeline.apply(compound_index)
+
+    return compound_index
+
+
+def _get_histogram(h5file, data_type, label, num_bins, bin_edges, force, block_size, is_writable):
+    data_type_group = h5file[data_type]
+    dataset = data_type_group[label] if label in data_type_group else None
+
+    if dataset is not None and not force:
+        histogram = read_histogram(dataset)
+        if histogram is not None and histogram.is_compatible(num_bins, bin_edges):
+            return histogram
+
+    number_rows, number_columns = _get_channel_shape(h5file, data_type, label)
+
+    def read_rows(start, stop):
+        return _read_channel(h5file, data_type, label, np.s_[start:stop])
+
+    block_rows = max(1, block_size // max(1, number_columns))
+    histogram = compute_histogram(read_rows, number_rows, num_bins, bin_edges, block_rows)
+
+    if dataset is not None and is_writable:
+        write_histogram(dataset, histogram)
+
+    return histogram
+
+
+def _get_data_type_names(h5file):
+    return [name for name in h5file if name != GROUP_PYRAMID and isinstance(h5file[name], h5py.Group)]
+
+
+def _get_pyramid_source(h5file, data_type, label, is_writable):
+    """
+    Key of the data of a dataset, the revision of the dataset or of the inputs of an element ratio not saved.
+
+    The datasets written before the revisions were saved have no key if the project file is not writable.
+    """
+    datasets = _get_source_datasets(h5file, data_type, label)
+
+    if not is_writable and any(ATTRIBUTE_REVISION not in dataset.attrs for dataset in datasets):
+        return None
+
+    return " ".join("%s:%i" % (dataset.name, get_revision(h5file, dataset)) for dataset in datasets)
+
+
+def _build_pyramid(h5file, data_type, label, force, block_size, storage_policy):
+    source = _get_pyramid_source(h5file, data_type, label, is_writable=True)
+    if not force and is_pyramid_up_to_date(get_pyramid_group(h5file, data_type, label), source):
+        return False
+
+    remove_pyramid(h5file, data_type, label)
+
+    shape = _get_channel_shape(h5file, data_type, label)
+    factors = get_level_factors(shape)
+    if len(factors) == 0:
+        return False
+
+    pyramid_group = h5file.require_group("/%s/%s/%s" % (GROUP_PYRAMID, data_type, label))
+    datasets = []
+    for factor in factors:
+        dataset = create_dataset(pyramid_group, str(factor), get_level_shape(shape, factor), np.float32,
+                                 storage_policy)
+        dataset.attrs[ATTRIBUTE_FACTOR] = factor
+        datasets.append(dataset)
+
+    def read_rows(start, stop):
+        return _read_channel(h5file, data_type, label, np.s_[start:stop])
+
+    def write_rows(level_index, start, data):
+        datasets[level_index][start:start + len(data)] = data
+
+    compute_levels(read_rows, shape, factors, write_rows, block_size)
+    pyramid_group.attrs[ATTRIBUTE_SOURCE] = source
+
+    return True
+
+
+def _get_source_datasets(h5file, data_type, label):
+    """
+    Datasets of the data of a channel, the dataset or the inputs of an element ratio not saved.
+    """
+    data_type_group = h5file[data_type]
+    if label in data_type_group:
+        return [data_type_group[label]]
+
+    input_group = h5file[data_type_group.attrs.get(ATTRIBUTE_INPUT_DATA_TYPE)]
+    return [input_group[input_label] for input_label in _split_ratio_label(input_group, label, data_type)]
+
+
+def _get_classification_source(h5file, key, channels, is_writable):
+    sources = [key]
+    for data_type, label in channels:
+        sources.append(_get_pyramid_source(h5file, data_type, label, is_writable))
+
+    if None in sources:
+        return None
+
+    return "\n".join(sources)
+
+
+def _build_classification_pyramid(h5file, name, classification, key, channels, block_size, storage_policy):
+    """
+    Save the levels of the fraction of the pixels of each phase, the rows of the classification are read by blocks.
+    """
+    remove_pyramid(h5file, GROUP_PHASE_MAP, name)
+
+    shape = classification.labels.shape
+    factors = get_level_factors(shape)
+    number_phases = len(classification.phase_labels)
+
+    pyramid_group = h5file.require_group("/%s/%s/%s" % (GROUP_PYRAMID, GROUP_PHASE_MAP, name))
+    datasets = []
+    for factor in factors:
+        dataset = create_dataset(pyramid_group, str(factor), get_level_shape(shape, factor) + (number_phases,),
+                                 np.float32, storage_policy)
+        dataset.attrs[ATTRIBUTE_FACTOR] = factor
+        datasets.append(dataset)
+
+    def write_rows(level_index, start, data):
+        datasets[level_index][start:start + len(data)] = data
+
+    compute_levels(classification.get_phase_data, shape, factors, write_rows, max(1, block_size // number_phases))
+
+    inputs = [dataset.name for data_type, label in channels
+              for dataset in _get_source_datasets(h5file, data_type, label)]
+    pyramid_group.attrs[ATTRIBUTE_INPUTS] = inputs
+    pyramid_group.attrs[ATTRIBUTE_SOURCE] = _get_classification_source(h5file, key, channels, is_writable=True)
+
+
+def _get_channel_shape(h5file, data_type, label):
+    data_type_group = h5file[data_type]
+    if label in data_type_group:
+        return data_type_group[label].shape
+
+    return h5file.attrs.get(IMAGE_WIDTH), h5file.attrs.get(IMAGE_HEIGHT)
+
+
+def _get_any_pair(scatter_histograms, label):
+    """
+    Return the first ``((label_a, label_b), scatter_histogram)`` with the label or None.
+    """
+    for pair, scatter_histogram in scatter_histograms.items():
+        if label in pair:
+            return pair, scatter_histogram
+
+    return None
+
+
+def _get_group_labels(h5file, data_type):
+    data_type_group = h5file[data_type]
+    labels = list(data_type_group)
+
+    input_data_type = data_type_group.attrs.get(ATTRIBUTE_INPUT_DATA_TYPE)
+    if input_data_type is not None:
+        input_labels = list(h5file[input_data_type])
+        labels.extend(label for label in _get_ratio_labels(input_labels) if label not in labels)
+
+    return labels
+
+
+def _get_ratio_labels(input_labels):
+    ratio_labels = []
+    for label_a in input_labels:
+        for label_b in input_labels:
+            if label_a != label_b:
+                ratio_labels.append("%s_%s" % (label_a, label_b))
+
+    return ratio_labels
+
+
+def _read_channel(h5file, data_type, label, selection=Ellipsis):
+    """
+    Read the data, or a selection like a tile, of a dataset or compute it if it is an element ratio not saved or
+    not up to date with its inputs.
+    """
+    data_type_group = h5file[data_type]
+    input_data_type = data_type_group.attrs.get(ATTRIBUTE_INPUT_DATA_TYPE)
+    if label in data_type_group and (input_data_type is None or _is_ratio_up_to_date(h5file, data_type, label)):
+        return read_dataset(data_type_group[label], selection)
+
+    if input_data_type is None:
+        raise KeyError("No label %s in data type %s" % (label, data_type))
+
+    input_group = h5file[input_data_type]
+    label_a, label_b = _split_ratio_label(input_group, label, data_type)
+    data_a = read_dataset(input_group[label_a], selection)
+    data_b = read_dataset(input_group[label_b], selection)
+
+    return _compute_ratio(data_a, data_b)
+
+
+def _split_ratio_label(input_group, label, data_type):
+    """
+    Return the labels ``(label_a, label_b)`` of the inputs of an element ratio ``label_a_label_b``.
+    """
+    for index in range(len(label)):
+        label_a, label_b = label[:index], label[index + 1:]
+        if label[index] == "_" and label_a in input_group and label_b in input_group and label_a != label_b:
+            return label_a, label_b
+
+    raise KeyError("No label %s in data type %s" % (label, data_type))
+
+
+def _get_ratio_inputs(h5file, data_type, label):
+    """
+    Labels of the inputs of an element ratio, no label if the inputs are not in the project file.
+    """
+    input_group = h5file[h5file[data_type].attrs.get(ATTRIBUTE_INPUT_DATA_TYPE)]
+    try:
+        return _split_ratio_label(input_group, label, data_type)
+    except KeyError:
+        return ()
+
+
+def _get_ratio_provenance(h5file, data_type, label):
+    input_data_type = h5file[data_type].attrs.get(ATTRIBUTE_INPUT_DATA_TYPE)
+    input_group = h5file[input_data_type]
+    label_a, label_b = _split_ratio_label(input_group, label, data_type)
+
+    return create_provenance(h5file, [input_group[label_a], input_group[label_b]],
+                             {"input data type": input_data_type})
+
+
+def _is_ratio_up_to_date(h5file, data_type, label):
+    try:
+        provenance = _get_ratio_provenance(h5file, data_type, label)
+    except KeyError:
+        return False
+
+    return is_up_to_date(h5file[data_type][label], provenance)
+
+
+def _is_group_up_to_date(data_type_group, labels, provenance):
+    return all(label in data_type_group and is_up_to_date(data_type_group[label], provenance) for label in labels)
+
+
+def _compute_ratio(data_a, data_b):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        data = data_a / data_b
+    data[np.isnan(data)] = 0
+
+    return data
+
+
 def _get_data(h5file, data_type):
     data_type_group = h5file[data_type]
 
     element_data = {}
     for label in data_type_group:
-        element_data[label] = data_type_group[label][...]
+        element_data[label] = read_dataset(data_type_group[label])
 
     return element_data
 
@@ -550,23 +1708,157 @@ def _read_data_from_image_file(file_name):
 
 
 def _read_data_from_tsv_file(file_path):
-    text = open(file_path, "rb").read()
-    lines = text.split(b'\r')
-    number_columns = len(lines[0].strip().split(b'\t'))
-    number_rows = len(lines) - 1
-    data = np.loadtxt(open(file_path, "r"))
-    print(number_columns, number_rows)
-    print(data.shape)
-    print(data.size)
-    data.shape = (number_rows, number_columns)
-    return data
+    return _read_data_from_text_file(file_path, delimiter="\t")
+
+
+def _read_data_from_text_file(file_path, delimiter=";"):
+    """
+    Read a map exported as text, like the Bruker export with one row of values separated by semicolons per line.
+
+    The file is read and parsed in one pass, the counts are returned as uint16 or uint32 and other values as float64.
+    Malformed rows at the end of the file, like a truncated last row, are ignored with a warning.
+
+    :raises ValueError: with the line and column of the malformed data
+
+    """
+    with open(file_path, "rb") as input_file:
+        text = input_file.read()
+
+    return _parse_text_data(text, delimiter.encode("ascii"), file_path)
+
+
+def _parse_text_data(text, delimiter, file_path=None):
+    lines = text.splitlines()
+    while len(lines) > 0 and len(lines[-1].strip()) == 0:
+        lines.pop()
+    if len(lines) == 0:
+        raise ValueError("No data in %s" % file_path)
+
+    lines = [line.rstrip().rstrip(delimiter) for line in lines]
+    column_counts = [line.count(delimiter) + 1 for line in lines]
+    number_columns = column_counts[0]
+
+    number_rows = len(lines)
+    while number_rows > 1 and column_counts[number_rows - 1] != number_columns:
+        number_rows -= 1
+    for row in range(number_rows, len(lines)):
+        logging.warning("Malformed trailing row ignored, line %i of %s has %i columns instead of %i",
+                        row + 1, file_path, column_counts[row], number_columns)
+    for row in range(number_rows):
+        if column_counts[row] != number_columns:
+            raise ValueError("Line %i of %s: expected %i columns, found %i" %
+                             (row + 1, file_path, number_columns, column_counts[row]))
+
+    lines = lines[:number_rows]
+    text = b"\n".join(lines)
+    buffer = np.frombuffer(text, dtype=np.uint8)
+
+    data = _parse_integers(buffer, number_rows*number_columns)
+    if data is None:
+        data = _parse_floats(text, lines, delimiter, file_path)
+
+    if data.size != number_rows*number_columns:
+        row, column = _find_missing_value(lines, delimiter)
+        raise ValueError("Line %i, column %i of %s: missing value" % (row + 1, column + 1, file_path))
 
+    return data.reshape((number_rows, number_columns))
+
+
+def _parse_integers(buffer, number_values):
+    """
+    Parse the unsigned integers of the text buffer directly from the digits.
+
+    The first and last digit of each value are found with the edges of the digit mask and the values are accumulated
+    one digit position at a time over all the values.
+    Return None if the buffer contains other characters than the digits and one separator between each value.
+
+    """
+    digits = buffer - np.uint8(ord("0"))
+    is_digit = np.zeros(len(digits) + 2, dtype=bool)
+    is_digit[1:-1] = digits < 10
+
+    edges = np.flatnonzero(is_digit[1:] != is_digit[:-1])
+    starts = edges[::2]
+    ends = edges[1::2]
+
+    number_separators = len(buffer) - np.count_nonzero(is_digit)
+    if len(starts) != number_values or number_separators != number_values - 1:
+        return None
+
+    lengths = ends - starts
+    maximum_length = int(np.max(lengths))
+    if maximum_length > 9:
+        dtype = np.uint64
+    else:
+        dtype = np.uint32
+
+    data = digits[ends - 1].astype(dtype)
+    scale = dtype(1)
+    for position in range(1, maximum_length):
+        scale *= dtype(10)
+        indexes = np.flatnonzero(lengths > position)
+        data[indexes] += digits[ends[indexes] - 1 - position]*scale
+
+    if np.max(data) <= np.iinfo(np.uint16).max:
+        data = data.astype(np.uint16)
 
-def _read_data_from_text_file(file_path):
-    data = np.loadtxt(open(file_path, "r"), delimiter=";")
     return data
 
 
+def _parse_floats(text, lines, delimiter, file_path):
+    try:
+        return np.array(text.replace(delimiter, b" ").split(), dtype=np.float64)
+    except ValueError:
+        for row, line in enumerate(lines):
+            for column, value in enumerate(line.split(delimiter)):
+                try:
+                    float(value)
+                except ValueError:
+                    if len(value.strip()) > 0:
+                        raise ValueError("Line %i, column %i of %s: invalid value %r" %
+                                         (row + 1, column + 1, file_path, value.decode("ascii", "replace")))
+        raise
+
+
+def _find_missing_value(lines, delimiter):
+    for row, line in enumerate(lines):
+        for column, value in enumerate(line.split(delimiter)):
+            if len(value.strip()) == 0:
+                return row, column
+
+    return len(lines) - 1, 0
+
+
+def _get_label_from_file_path(file_path):
+    basename, _extension = os.path.splitext(os.path.basename(file_path))
+    return basename.split("_")[-1]
+
+
+def _read_data_files(file_paths, max_workers=None):
+    """
+    Read the files in a process pool and yield ``(file_path, data, parse_time, error)`` in the order of the files.
+    """
+    if max_workers == 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            yield (file_path,) + _read_data_timed(file_path)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for file_path, result in zip(file_paths, executor.map(_read_data_timed, file_paths)):
+                yield (file_path,) + result
+
+
+def _read_data_timed(file_path):
+    start_time = time.time()
+    try:
+        data = _read_data(file_path)
+        if data is None:
+            return None, time.time() - start_time, "Unknown extension"
+    except (ValueError, IOError) as message:
+        return None, time.time() - start_time, str(message)
+
+    return data, time.time() - start_time, None
+
+
 def _read_data(file_path):
     _basename, extension = os.path.splitext(file_path)
     if extension == ".tif":
@@ -577,39 +1869,3 @@ def _read_data(file_path):
         return _read_data_from_tsv_file(file_path)
 
     logging.error("Unknown extension %s for file_path %s", extension, file_path)
-
-
-def create_color_maps():
-    number_colors = 20
-
-    color_dict = {'red': ((0.0, 0.0, 0.0),
-                          (1.0, 0.0, 0.0)),
-                  'green': ((0.0, 0.0, 0.0),
-                            (1.0, 0.0, 0.0)),
-                  'blue': ((0.0, 0.0, 0.0),
-                           (1.0, 1.0, 1.0))}
-    plt.register_cmap(name='cmBlue', data=color_dict, lut=number_colors)
-
-    color_dict = {'red': ((0.0, 0.0, 0.0),
-                          (1.0, 0.0, 0.0)),
-                  'green': ((0.0, 0.0, 0.0),
-                            (1.0, 1.0, 1.0)),
-                  'blue': ((0.0, 0.0, 0.0),
-                           (1.0, 0.0, 0.0))}
-    plt.register_cmap(name='cmGreen', data=color_dict, lut=number_colors)
-
-    color_dict = {'red': ((0.0, 0.0, 0.0),
-                          (1.0, 1.0, 1.0)),
-                  'green': ((0.0, 0.0, 0.0),
-                            (1.0, 0.0, 0.0)),
-                  'blue': ((0.0, 0.0, 0.0),
-                           (1.0, 0.0, 0.0))}
-    plt.register_cmap(name='cmRed', data=color_dict, lut=number_colors)
-
-    color_dict = {'red': ((0.0, 0.0, 0.0),
-                          (1.0, 1.0, 1.0)),
-                  'green': ((0.0, 0.0, 0.0),
-                            (1.0, 0.0, 1.0)),
-                  'blue': ((0.0, 0.0, 0.0),
-                           (1.0, 1.0, 1.0))}
-    plt.register_cmap(name='cmPink', data=color_dict, lut=number_colors)
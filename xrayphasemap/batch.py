@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.batch
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Run a recipe on many samples, each sample is an independent job of a process pool.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import os.path
+import logging
+import time
+import json
+import glob
+import collections
+import multiprocessing
+import concurrent.futures
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.recipe import get_recipe_hash, get_ingest, get_export, compute_derived_data, create_phase_maps
+
+# Globals and constants variables.
+STAGE_INGEST = "ingest"
+STAGE_DERIVED = "derived"
+STAGE_CLASSIFICATION = "classification"
+STAGE_EXPORT = "export"
+
+STAGES = (STAGE_INGEST, STAGE_DERIVED, STAGE_CLASSIFICATION, STAGE_EXPORT)
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+STATUS_FILE_NAME = "status.json"
+SUMMARY_FILE_NAME = "run_summary.json"
+
+PROJECT_EXTENSIONS = (".hdf5", ".h5")
+
+Sample = collections.namedtuple("Sample", ["name", "input_path"])
+
+
+def find_samples(inputs):
+    """
+    Samples of a list of project files, export directories or glob patterns, sorted by name without duplicate.
+
+    The name of a sample is the name of its project file without extension or of its export directory.
+    """
+    samples = collections.OrderedDict()
+    for input_path in inputs:
+        input_paths = sorted(glob.glob(input_path)) if glob.has_magic(input_path) else [input_path]
+
+        for path in input_paths:
+            path = os.path.normpath(path)
+            if os.path.isdir(path):
+                name = os.path.basename(path)
+            elif os.path.splitext(path)[1].lower() in PROJECT_EXTENSIONS:
+                name = os.path.splitext(os.path.basename(path))[0]
+            else:
+                logging.warning("Input %s is not a project file or a directory", path)
+                continue
+
+            if name in samples and samples[name].input_path != path:
+                raise ValueError("Two samples named %s: %s and %s" % (name, samples[name].input_path, path))
+            samples[name] = Sample(name, path)
+
+    return [samples[name] for name in sorted(samples)]
+
+
+class BatchRunner(object):
+    def __init__(self, recipe, output_path, max_workers=None, resume=False, threads=1):
+        """
+        Run the stages of a recipe, :py:const:`STAGES`, on each sample.
+
+        The results of a sample are in the directory ``output_path/name``: the project file of an export directory,
+        the figures and the status of the sample with the time of each stage done. With ``resume``, the samples
+        done with the same recipe are skipped and a failed sample starts again at its failed stage.
+        The project file of a sample given as a project file is modified in place.
+
+        :param recipe: recipe dict, see :py:mod:`xrayphasemap.recipe`
+        :param output_path: directory of the results and of the run summary
+        :param max_workers: number of samples processed at once, each in its own process, in this process if 1
+        :param resume: skip the samples and stages already done
+        :param threads: number of threads of each sample to import the files and classify the phases
+
+        """
+        self.recipe = recipe
+        self.output_path = output_path
+        self.max_workers = max_workers
+        self.resume = resume
+        self.threads = threads
+
+    def run(self, samples):
+        """
+        Process all the samples and write the run summary in the output directory.
+
+        :return: the summary dict, with the report of each sample in ``samples``
+        """
+        start_time = time.time()
+        if not os.path.isdir(self.output_path):
+            os.makedirs(self.output_path)
+
+        arguments = [(self.recipe, sample, self.output_path, self.resume, self.threads) for sample in samples]
+
+        if self.max_workers == 1 or len(samples) <= 1:
+            reports = [_run_sample_arguments(argument) for argument in arguments]
+        else:
+            context = multiprocessing.get_context("spawn")
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                                        initializer=_initialize_worker) as executor:
+                reports = list(executor.map(_run_sample_arguments, arguments))
+
+        summary = create_summary(reports, time.time() - start_time)
+
+        summary_file_path = os.path.join(self.output_path, SUMMARY_FILE_NAME)
+        with open(summary_file_path, 'w') as summary_file:
+            json.dump(summary, summary_file, indent=2)
+
+        return summary
+
+
+def create_summary(reports, total_time):
+    """
+    Summary of a run: the number of samples of each status, the total time of each stage and the sample reports.
+    """
+    stage_times = collections.OrderedDict((stage, 0.0) for stage in STAGES)
+    status_counts = collections.OrderedDict((status, 0) for status in (STATUS_DONE, STATUS_FAILED, STATUS_SKIPPED))
+
+    for report in reports:
+        status_counts[report["status"]] += 1
+        if report["status"] != STATUS_SKIPPED:
+            for stage, stage_time in report["stages"].items():
+                stage_times[stage] += stage_time
+
+    summary = collections.OrderedDict()
+    summary["number samples"] = len(reports)
+    summary["status"] = status_counts
+    summary["total time"] = total_time
+    summary["stage times"] = stage_times
+    summary["samples"] = reports
+
+    return summary
+
+
+def run_sample(recipe, sample, output_path, resume=False, threads=1):
+    """
+    Run the stages of the recipe on one sample, an error stops the sample and is given in its report.
+
+    :return: report dict with the keys ``sample``, ``input_path``, ``project_filepath``, ``status``, ``stages``,
+             the time of each stage run, ``failed_stage`` and ``error``
+    """
+    from xrayphasemap.analysis import PhaseAnalysis
+
+    sample_path = os.path.join(output_path, sample.name)
+    if not os.path.isdir(sample_path):
+        os.makedirs(sample_path)
+
+    if os.path.isdir(sample.input_path):
+        project_filepath = os.path.join(sample_path, sample.name + PROJECT_EXTENSIONS[0])
+    else:
+        project_filepath = sample.input_path
+
+    recipe_hash = get_recipe_hash(recipe)
+    status = _read_status(sample_path)
+    if not resume or status.get("recipe") != recipe_hash:
+        status = {"recipe": recipe_hash, "status": None, "stages": {}}
+
+    report = collections.OrderedDict()
+    report["sample"] = sample.name
+    report["input_path"] = sample.input_path
+    report["project_filepath"] = project_filepath
+    report["status"] = STATUS_DONE
+    report["stages"] = collections.OrderedDict()
+    report["failed_stage"] = None
+    report["error"] = None
+
+    if status["status"] == STATUS_DONE:
+        report["status"] = STATUS_SKIPPED
+        report["stages"].update(status["stages"])
+        return report
+
+    phase_analysis = PhaseAnalysis(project_filepath, max_workers=threads)
+    phase_maps = None
+
+    # One session for all the stages, the classification of the phase maps is reused by the export.
+    try:
+        for stage in STAGES:
+            if stage in status["stages"]:
+                continue
+
+            start_time = time.time()
+            try:
+                if not phase_analysis.is_open:
+                    phase_analysis.open()
+
+                if stage == STAGE_INGEST:
+                    _run_ingest(recipe, sample, phase_analysis, threads)
+                elif stage == STAGE_DERIVED:
+                    compute_derived_data(recipe, phase_analysis)
+                elif stage == STAGE_CLASSIFICATION:
+                    phase_maps = _run_classification(recipe, phase_analysis, sample_path, threads)
+                elif stage == STAGE_EXPORT:
+                    if phase_maps is None:
+                        phase_maps = create_phase_maps(recipe, phase_analysis, threads)
+                    _run_export(recipe, phase_analysis, phase_maps, sample_path)
+            except Exception as message:
+                logging.error("%s at stage %s of sample %s", message, stage, sample.name)
+                report["status"] = STATUS_FAILED
+                report["failed_stage"] = stage
+                report["error"] = "%s: %s" % (type(message).__name__, message)
+                report["stages"][stage] = time.time() - start_time
+                break
+
+            stage_time = time.time() - start_time
+            report["stages"][stage] = stage_time
+            status["stages"][stage] = stage_time
+            _write_status(sample_path, status)
+    finally:
+        phase_analysis.close()
+
+    status["status"] = report["status"]
+    _write_status(sample_path, status)
+
+    return report
+
+
+def _run_ingest(recipe, sample, phase_analysis, threads):
+    if not os.path.isdir(sample.input_path):
+        return
+
+    ingest = get_ingest(recipe)
+    reports = phase_analysis.import_directory(sample.input_path, ingest["data_type"], ingest["pattern"],
+                                              max_workers=threads)
+
+    if len(phase_analysis.get_labels(ingest["data_type"])) == 0:
+        errors = [report["error"] for report in reports if report["error"] is not None]
+        raise ValueError("No map imported from %s %s" % (sample.input_path, "; ".join(errors)))
+
+
+def _run_classification(recipe, phase_analysis, sample_path, threads):
+    phase_maps = create_phase_maps(recipe, phase_analysis, threads)
+
+    for phase_map in phase_maps:
+        phase_map.get_classification()
+        phase_map.save_phases_fraction(sample_path)
+
+    return phase_maps
+
+
+def _run_export(recipe, phase_analysis, phase_maps, sample_path):
+    from xrayphasemap.export import DATA_KINDS, KIND_HISTOGRAM, KIND_MAP, KIND_MAP_RAW, KIND_PHASE_MAP, \
+        KIND_NO_PHASE_MAP, KIND_OVERLAP_MAP, KIND_PHASES_FRACTION, KIND_PHASES_STATISTICS, PHASE_MAP_KINDS
+    from xrayphasemap.plotting import plt
+
+    export = get_export(recipe)
+    kinds = export["kinds"]
+    for kind in kinds:
+        if kind not in DATA_KINDS + PHASE_MAP_KINDS:
+            raise ValueError("Unknown kind of figure %s" % kind)
+
+    data_types = export["data_types"]
+    if data_types is None:
+        data_types = phase_analysis.get_data_types()
+
+    figures_path = sample_path
+    for data_type in data_types:
+        for label in phase_analysis.get_labels(data_type):
+            if KIND_HISTOGRAM in kinds:
+                phase_analysis.save_histogram_one(data_type, label, figures_path, export["num_bins"])
+            if KIND_MAP in kinds:
+                phase_analysis.save_map_one(data_type, label, figures_path, export["color_map"])
+            if KIND_MAP_RAW in kinds:
+                phase_analysis.save_map_one(data_type, label, figures_path, export["color_map"], raw=True)
+
+    for phase_map in phase_maps:
+        if KIND_PHASE_MAP in kinds:
+            phase_map.save_map(figures_path)
+        if KIND_NO_PHASE_MAP in kinds:
+            phase_map.save_no_phase_map(figures_path)
+        if KIND_OVERLAP_MAP in kinds:
+            phase_map.save_overlap_map(figures_path)
+        if KIND_PHASES_FRACTION in kinds:
+            phase_map.save_phases_fraction(figures_path)
+        if KIND_PHASES_STATISTICS in kinds:
+            phase_map.save_phases_statistics(figures_path)
+
+    plt.close("all")
+
+
+def _read_status(sample_path):
+    file_path = os.path.join(sample_path, STATUS_FILE_NAME)
+    if not os.path.isfile(file_path):
+        return {}
+
+    try:
+        with open(file_path, 'r') as status_file:
+            return json.load(status_file)
+    except ValueError:
+        logging.warning("Invalid status file %s", file_path)
+        return {}
+
+
+def _write_status(sample_path, status):
+    file_path = os.path.join(sample_path, STATUS_FILE_NAME)
+    temporary_file_path = file_path + ".tmp"
+    with open(temporary_file_path, 'w') as status_file:
+        json.dump(status, status_file, indent=2)
+    os.replace(temporary_file_path, file_path)
+
+
+def _initialize_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _run_sample_arguments(arguments):
+    return run_sample(*arguments)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.cache
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+In-memory cache of the datasets read from the project file.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import collections
+import logging
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules
+
+# Globals and constants variables.
+DEFAULT_MAXIMUM_SIZE = 256*1024*1024
+
+
+class DatasetCache(object):
+    def __init__(self, maximum_size=DEFAULT_MAXIMUM_SIZE):
+        """
+        Least recently used cache of datasets keyed by ``(data_type, label)`` with a budget in bytes.
+
+        The cached arrays are read-only, as they are shared between all the callers.
+
+        :param maximum_size: maximum number of bytes kept in memory, 0 disables the cache
+
+        """
+        self.maximum_size = maximum_size
+
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._datasets = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._datasets)
+
+    def __contains__(self, key):
+        return key in self._datasets
+
+    def get(self, key):
+        """
+        Return the cached data or None if the key is not in the cache.
+        """
+        try:
+            data = self._datasets.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._datasets[key] = data
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        self._remove(key)
+
+        if data.nbytes > self.maximum_size:
+            logging.debug("Dataset %s too large for the cache: %i bytes", key, data.nbytes)
+            return
+
+        while self.size + data.nbytes > self.maximum_size:
+            _key, old_data = self._datasets.popitem(last=False)
+            self.size -= old_data.nbytes
+
+        data.flags.writeable = False
+        self._datasets[key] = data
+        self.size += data.nbytes
+
+    def invalidate(self, data_type, label=None):
+        """
+        Remove one dataset, or all the datasets of a data type if label is None, from the cache.
+        """
+        if label is not None:
+            self._remove((data_type, label))
+        else:
+            for key in list(self._datasets):
+                if key[0] == data_type:
+                    self._remove(key)
+
+    def clear(self):
+        self._datasets.clear()
+        self.size = 0
+
+    def _remove(self, key):
+        data = self._datasets.pop(key, None)
+        if data is not None:
+            self.size -= data.nbytes
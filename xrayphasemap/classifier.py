@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.classifier
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Classify all the phases at once over a stack of channels.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import os
+import collections
+import concurrent.futures
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+
+# Globals and constants variables.
+DEFAULT_BLOCK_SIZE = 4*1024*1024
+
+
+class PhaseClassifier(object):
+    def __init__(self, phases):
+        """
+        Compile the conditions of the phases into the distinct comparisons of each channel.
+
+        The distinct channels, ``(data_type, label)``, of all the conditions are given by :py:attr:`channels`.
+
+        The distinct conditions, ``(channel index, minimum, maximum)``, are given by :py:attr:`conditions` and the
+        conditions of each phase by :py:attr:`phase_conditions`. A phase with the same conditions as a previous
+        phase is not evaluated, its mask is a copy of the mask of the phase :py:attr:`phase_sources`.
+
+        :param phases: list of :py:class:`~xrayphasemap.phase.Phase`
+
+        """
+        self.phases = list(phases)
+
+        self.channels = []
+        for phase in self.phases:
+            for channel in phase.conditions:
+                if channel not in self.channels:
+                    self.channels.append(channel)
+
+        self.conditions = []
+        self.phase_conditions = []
+        condition_indexes = {}
+        for phase in self.phases:
+            phase_condition_indexes = set()
+            for channel, (minimum, maximum) in phase.conditions.items():
+                if minimum is None and maximum is None:
+                    continue
+                condition = (self.channels.index(channel), minimum, maximum)
+                if condition not in condition_indexes:
+                    condition_indexes[condition] = len(self.conditions)
+                    self.conditions.append(condition)
+                phase_condition_indexes.add(condition_indexes[condition])
+            self.phase_conditions.append(tuple(sorted(phase_condition_indexes)))
+
+        self.phase_sources = []
+        source_indexes = {}
+        for phase_index, phase_condition_indexes in enumerate(self.phase_conditions):
+            source_indexes.setdefault(phase_condition_indexes, phase_index)
+            self.phase_sources.append(source_indexes[phase_condition_indexes])
+
+        self.channel_conditions = [[] for _channel in self.channels]
+        for condition_index, (channel_index, _minimum, _maximum) in enumerate(self.conditions):
+            self.channel_conditions[channel_index].append(condition_index)
+
+        self.condition_phases = [[] for _condition in self.conditions]
+        for phase_index in self.source_phases:
+            for condition_index in self.phase_conditions[phase_index]:
+                self.condition_phases[condition_index].append(phase_index)
+
+    @property
+    def source_phases(self):
+        """
+        Indexes of the phases evaluated, the first phase of each distinct set of conditions.
+        """
+        return [phase_index for phase_index, source_index in enumerate(self.phase_sources)
+                if phase_index == source_index]
+
+    def classify(self, cube, block_size=DEFAULT_BLOCK_SIZE, max_workers=1):
+        """
+        Evaluate all the phases and return their masks.
+
+        The rows are processed by blocks and the comparison of each distinct threshold of a channel is done once
+        for all the phases using it, the size of the temporary arrays is bounded by the block size.
+        The blocks write disjoint rows of the masks, they are evaluated in a thread pool if ``max_workers`` is not 1.
+
+        :param cube: data of each channel of :py:attr:`channels`, an array ``(channels, width, height)`` or a list of 2D arrays
+        :param block_size: maximum number of pixels of all the masks evaluated in one block
+        :param max_workers: number of threads evaluating the blocks
+        :return: boolean array ``(phases, width, height)``
+
+        """
+        if len(cube) != len(self.channels):
+            raise ValueError("Expected %i channels, got %i" % (len(self.channels), len(cube)))
+
+        if len(self.channels) == 0:
+            raise ValueError("No condition defined in the phases")
+
+        width, height = np.shape(cube[0])
+        masks = np.ones((len(self.phases), width, height), dtype=bool)
+
+        block_rows = max(1, block_size // max(1, len(self.phases)*height))
+        if max_workers != 1:
+            # At least one block for each thread.
+            number_threads = max_workers or os.cpu_count() or 1
+            block_rows = min(block_rows, -(-width // number_threads))
+
+        blocks = [(start, min(start + block_rows, width)) for start in range(0, width, block_rows)]
+
+        def classify_block(block):
+            start, stop = block
+            self.classify_block(cube, masks[:, start:stop], start, stop)
+
+        if max_workers == 1 or len(blocks) <= 1:
+            for block in blocks:
+                classify_block(block)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(classify_block, blocks))
+
+        return masks
+
+    def classify_block(self, cube, masks, start, stop):
+        """
+        Evaluate the phases for the rows ``start:stop`` of the cube into masks initialized to True.
+
+        Each distinct comparison of a channel is computed once. A condition with a minimum and a maximum used by
+        many phases is computed once and combined with each phase, the phases with the same conditions are copied.
+        """
+        for channel_index, condition_indexes in enumerate(self.channel_conditions):
+            if len(condition_indexes) == 0:
+                continue
+
+            data = cube[channel_index][start:stop]
+
+            condition_bounds = []
+            for condition_index in condition_indexes:
+                _channel_index, minimum, maximum = self.conditions[condition_index]
+                bounds = [(_get_threshold(threshold, data.dtype), is_minimum)
+                          for threshold, is_minimum in ((minimum, True), (maximum, False)) if threshold is not None]
+                condition_bounds.append(bounds)
+
+            bound_counts = collections.Counter(bound for bounds in condition_bounds for bound in bounds)
+
+            comparisons = {}
+            buffers = [np.empty(data.shape, dtype=bool) for _index in range(3)]
+            for condition_index, bounds in zip(condition_indexes, condition_bounds):
+                phase_indexes = self.condition_phases[condition_index]
+
+                condition_masks = []
+                for bound_index, bound in enumerate(bounds):
+                    if bound_counts[bound] > 1:
+                        if bound not in comparisons:
+                            comparisons[bound] = _compare(data, bound)
+                        condition_masks.append(comparisons[bound])
+                    else:
+                        condition_masks.append(_compare(data, bound, buffers[bound_index]))
+
+                if len(condition_masks) == 2 and len(phase_indexes) > 1:
+                    condition_masks = [np.logical_and(condition_masks[0], condition_masks[1], out=buffers[2])]
+
+                for phase_index in phase_indexes:
+                    for condition_mask in condition_masks:
+                        masks[phase_index] &= condition_mask
+
+        for phase_index, source_index in enumerate(self.phase_sources):
+            if phase_index != source_index:
+                masks[phase_index] = masks[source_index]
+
+
+def _get_threshold(threshold, dtype):
+    """
+    Threshold of a condition compared with data of the type, all the evaluations of a condition use this rule.
+
+    The threshold is rounded to the precision of floating point data, like a Python float compared with an array,
+    so a threshold like ``np.float64(0.1)`` selects the same pixels as ``0.1`` on float32 data. An array of
+    thresholds gives an array, a scalar threshold a scalar.
+
+    """
+    if np.ndim(threshold) == 0:
+        threshold = np.float64(threshold)
+    else:
+        threshold = np.asarray(threshold, dtype=np.float64)
+    if np.issubdtype(dtype, np.floating):
+        threshold = threshold.astype(dtype)
+
+    return threshold
+
+
+def _compare(data, bound, out=None):
+    threshold, is_minimum = bound
+    if is_minimum:
+        return np.greater_equal(data, threshold, out=out)
+    else:
+        return np.less_equal(data, threshold, out=out)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.cli
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Command line interface ``xrayphasemap``.
+
+Usage::
+
+    xrayphasemap run recipe.json "D:/campaign/*.hdf5" "D:/campaign/exports/*" --output results --jobs 8 --resume
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import sys
+import argparse
+import logging
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules
+from xrayphasemap import __version__
+from xrayphasemap.recipe import load_recipe, compile_phase_maps
+from xrayphasemap.batch import BatchRunner, find_samples, STAGES, STATUS_FAILED, SUMMARY_FILE_NAME
+
+# Globals and constants variables.
+
+
+def main(argv=None):
+    parser = create_parser()
+    arguments = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING if not arguments.verbose else logging.INFO)
+
+    if arguments.command == "run":
+        return run(arguments)
+    elif arguments.command == "plan":
+        return plan(arguments)
+
+    parser.print_help()
+    return 2
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="xrayphasemap", description="Create phase maps from x-ray elemental maps.")
+    parser.add_argument("--version", action="version", version="%(prog)s " + __version__)
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the progress messages")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="run a recipe on many samples")
+    run_parser.add_argument("recipe", help="recipe file")
+    run_parser.add_argument("inputs", nargs="+", help="project files, export directories or glob patterns")
+    run_parser.add_argument("-o", "--output", default="results", help="directory of the results")
+    run_parser.add_argument("-j", "--jobs", type=int, default=None,
+                            help="number of samples processed at once, the number of processors by default")
+    run_parser.add_argument("-t", "--threads", type=int, default=1, help="number of threads of each sample")
+    run_parser.add_argument("--resume", action="store_true", help="skip the samples and stages already done")
+
+    plan_parser = subparsers.add_parser("plan", help="print the evaluation plan of the phase maps of a recipe")
+    plan_parser.add_argument("recipe", help="recipe file")
+    plan_parser.add_argument("-s", "--size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"), default=None,
+                             help="size of the maps for the estimated cost")
+
+    return parser
+
+
+def plan(arguments):
+    recipe = load_recipe(arguments.recipe)
+    number_pixels = None
+    if arguments.size is not None:
+        number_pixels = arguments.size[0]*arguments.size[1]
+
+    for evaluation_plan in compile_phase_maps(recipe):
+        print(evaluation_plan.format(number_pixels))
+        print()
+
+    return 0
+
+
+def run(arguments):
+    recipe = load_recipe(arguments.recipe)
+    samples = find_samples(arguments.inputs)
+    if len(samples) == 0:
+        logging.error("No sample found in %s", " ".join(arguments.inputs))
+        return 1
+
+    runner = BatchRunner(recipe, arguments.output, arguments.jobs, arguments.resume, arguments.threads)
+    summary = runner.run(samples)
+
+    print_summary(summary)
+    print("Summary saved in %s/%s" % (arguments.output, SUMMARY_FILE_NAME))
+
+    return 1 if summary["status"][STATUS_FAILED] > 0 else 0
+
+
+def print_summary(summary):
+    print("%-32s %-8s" % ("Sample", "Status") + "".join(" %14s" % stage for stage in STAGES))
+    for report in summary["samples"]:
+        times = "".join(" %14s" % _format_time(report["stages"].get(stage)) for stage in STAGES)
+        print("%-32s %-8s%s" % (report["sample"], report["status"], times))
+        if report["error"] is not None:
+            print("    %s at stage %s" % (report["error"], report["failed_stage"]))
+
+    status = ", ".join("%i %s" % (count, name) for name, count in summary["status"].items())
+    print("%i samples in %.1f s: %s" % (summary["number samples"], summary["total time"], status))
+
+
+def _format_time(stage_time):
+    if stage_time is None:
+        return "-"
+    return "%.2f s" % stage_time
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.export
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Export the figures of a project in parallel over a process pool.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import logging
+import time
+import collections
+import multiprocessing
+import concurrent.futures
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules
+
+# Globals and constants variables.
+KIND_HISTOGRAM = "histogram"
+KIND_MAP = "map"
+KIND_MAP_RAW = "map raw"
+
+KIND_PHASE_MAP = "phase map"
+KIND_NO_PHASE_MAP = "no phase map"
+KIND_OVERLAP_MAP = "overlap map"
+KIND_PHASES_FRACTION = "phases fraction"
+KIND_PHASES_STATISTICS = "phases statistics"
+
+DATA_KINDS = (KIND_HISTOGRAM, KIND_MAP, KIND_MAP_RAW)
+PHASE_MAP_KINDS = (KIND_PHASE_MAP, KIND_NO_PHASE_MAP, KIND_OVERLAP_MAP, KIND_PHASES_FRACTION, KIND_PHASES_STATISTICS)
+
+ExportJob = collections.namedtuple("ExportJob", ["data_type", "label", "kind"])
+
+_worker = None
+
+
+class FigureExporter(object):
+    def __init__(self, project_filepath, figures_path, max_workers=None, num_bins=50, color_map_name='YlOrRd'):
+        """
+        Scheduler of the figure jobs of a project, each job is a :py:class:`ExportJob` ``(data_type, label, kind)``.
+
+        The jobs are run in a pool of new processes using the Agg backend of matplotlib. Each worker opens the
+        project file read-only once, so the project file must not be opened for writing during the export.
+        For the jobs of a phase map, the data type is the name of the phase map and the label is a phase label or
+        None, the classification of a phase map is done once in each worker.
+
+        :param project_filepath: path of the HDF5 project file
+        :param figures_path: directory of the figures
+        :param max_workers: number of processes, the jobs are run in this process if 1
+        :param num_bins: number of bins of the histograms
+        :param color_map_name: color map of the histograms and maps
+
+        """
+        self.project_filepath = project_filepath
+        self.figures_path = figures_path
+        self.max_workers = max_workers
+        self.num_bins = num_bins
+        self.color_map_name = color_map_name
+
+        self.jobs = []
+        self._phase_maps = {}
+
+    def add_job(self, data_type, label, kind):
+        if kind not in DATA_KINDS + PHASE_MAP_KINDS:
+            raise ValueError("Unknown kind of figure %s" % kind)
+        if kind in PHASE_MAP_KINDS and data_type not in self._phase_maps:
+            raise ValueError("Unknown phase map %s, add it with add_phase_map" % data_type)
+
+        self.jobs.append(ExportJob(data_type, label, kind))
+
+    def add_data_jobs(self, phase_analysis, kinds=(KIND_HISTOGRAM, KIND_MAP), data_type=None):
+        """
+        Add a job of each kind for all the datasets of all the data types or of one data type.
+        """
+        if data_type is None:
+            data_types = phase_analysis.get_data_types()
+        else:
+            data_types = [data_type]
+
+        for data_type in data_types:
+            for label in phase_analysis.get_labels(data_type):
+                for kind in kinds:
+                    self.add_job(data_type, label, kind)
+
+    def add_phase_map(self, phase_map, kinds=PHASE_MAP_KINDS):
+        """
+        Add the jobs of a :py:class:`~xrayphasemap.map.PhaseMap`, the phases are copied when the jobs are added.
+        """
+        self._phase_maps[phase_map.phase_map_name] = (phase_map.is_dilation_erosion, dict(phase_map.phases))
+
+        for kind in kinds:
+            self.add_job(phase_map.phase_map_name, None, kind)
+
+    def run(self):
+        """
+        Run all the jobs and return a report for each job, in the order of the jobs.
+
+        Each report is a dict with the keys ``job``, ``file_path``, ``time`` and ``error``, the time is the
+        duration of the job in its worker and the error is None if the figure was saved.
+
+        """
+        arguments = (self.project_filepath, self.figures_path, self.num_bins, self.color_map_name, self._phase_maps)
+
+        if self.max_workers == 1 or len(self.jobs) <= 1:
+            reports = _run_jobs_in_process(arguments, self.jobs)
+        else:
+            context = multiprocessing.get_context("spawn")
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                                        initializer=_initialize_worker,
+                                                        initargs=arguments) as executor:
+                reports = list(executor.map(_run_job, self.jobs))
+
+        for report in reports:
+            if report["error"] is not None:
+                logging.error("%s for figure %s", report["error"], report["job"])
+
+        return reports
+
+
+class _Worker(object):
+    def __init__(self, project_filepath, figures_path, num_bins, color_map_name, phase_maps):
+        from xrayphasemap.analysis import PhaseAnalysis, MODE_READ_ONLY
+
+        self.phase_analysis = PhaseAnalysis(project_filepath, mode=MODE_READ_ONLY)
+        self.phase_analysis.open()
+
+        self.figures_path = figures_path
+        self.num_bins = num_bins
+        self.color_map_name = color_map_name
+        self.phase_map_specifications = phase_maps
+
+        self._phase_maps = {}
+
+    def close(self):
+        self.phase_analysis.close()
+
+    def run(self, job):
+        start_time = time.time()
+        report = {"job": job, "file_path": None, "time": None, "error": None}
+
+        try:
+            report["file_path"] = self._save_figure(job)
+        except Exception as message:
+            report["error"] = "%s: %s" % (type(message).__name__, message)
+
+        report["time"] = time.time() - start_time
+        return report
+
+    def _save_figure(self, job):
+        data_type, label, kind = job
+
+        if kind == KIND_HISTOGRAM:
+            return self.phase_analysis.save_histogram_one(data_type, label, self.figures_path, self.num_bins)
+        elif kind == KIND_MAP:
+            return self.phase_analysis.save_map_one(data_type, label, self.figures_path, self.color_map_name)
+        elif kind == KIND_MAP_RAW:
+            return self.phase_analysis.save_map_one(data_type, label, self.figures_path, self.color_map_name,
+                                                    raw=True)
+
+        phase_map = self._get_phase_map(data_type)
+        if kind == KIND_PHASE_MAP:
+            return phase_map.save_map(self.figures_path, label)
+        elif kind == KIND_NO_PHASE_MAP:
+            return phase_map.save_no_phase_map(self.figures_path)
+        elif kind == KIND_OVERLAP_MAP:
+            return phase_map.save_overlap_map(self.figures_path)
+        elif kind == KIND_PHASES_FRACTION:
+            return phase_map.save_phases_fraction(self.figures_path)
+        elif kind == KIND_PHASES_STATISTICS:
+            return phase_map.save_phases_statistics(self.figures_path)
+
+        raise ValueError("Unknown kind of figure %s" % kind)
+
+    def _get_phase_map(self, phase_map_name):
+        if phase_map_name not in self._phase_maps:
+            from xrayphasemap.map import PhaseMap
+
+            is_dilation_erosion, phases = self.phase_map_specifications[phase_map_name]
+            phase_map = PhaseMap(phase_map_name, self.phase_analysis, is_dilation_erosion)
+            phase_map.phases = dict(phases)
+            self._phase_maps[phase_map_name] = phase_map
+
+        return self._phase_maps[phase_map_name]
+
+
+def _initialize_worker(*arguments):
+    global _worker
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    _worker = _Worker(*arguments)
+
+
+def _run_job(job):
+    return _worker.run(job)
+
+
+def _run_jobs_in_process(arguments, jobs):
+    worker = _Worker(*arguments)
+    try:
+        return [worker.run(job) for job in jobs]
+    finally:
+        worker.close()
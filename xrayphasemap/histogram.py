@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.histogram
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Histograms of the datasets computed by blocks of rows and saved as attributes of the datasets.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+
+# Globals and constants variables.
+ATTRIBUTE_HISTOGRAM_COUNTS = "histogram counts"
+ATTRIBUTE_HISTOGRAM_BIN_EDGES = "histogram bin edges"
+ATTRIBUTE_MINIMUM = "minimum"
+ATTRIBUTE_MAXIMUM = "maximum"
+ATTRIBUTE_PERCENTILES = "percentiles"
+
+HISTOGRAM_ATTRIBUTES = (ATTRIBUTE_HISTOGRAM_COUNTS, ATTRIBUTE_HISTOGRAM_BIN_EDGES, ATTRIBUTE_MINIMUM,
+                        ATTRIBUTE_MAXIMUM, ATTRIBUTE_PERCENTILES)
+
+PERCENTILES = (1.0, 5.0, 25.0, 50.0, 75.0, 95.0, 99.0)
+
+DEFAULT_NUMBER_BINS = 50
+DEFAULT_BLOCK_SIZE = 16*1024*1024
+
+
+class Histogram(object):
+    def __init__(self, counts, bin_edges, minimum, maximum, percentiles):
+        """
+        Histogram and statistics of the finite values of a dataset.
+
+        The percentiles of :py:const:`PERCENTILES` are interpolated in the cumulative histogram, their precision is
+        the width of a bin.
+
+        :param counts: number of pixels in each bin
+        :param bin_edges: edges of the bins, one more than the counts
+        :param minimum: minimum value
+        :param maximum: maximum value
+        :param percentiles: value of each percentile of :py:const:`PERCENTILES`
+
+        """
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.percentiles = np.asarray(percentiles, dtype=np.float64)
+
+    @property
+    def number_bins(self):
+        return len(self.counts)
+
+    def get_density(self):
+        """
+        Probability density of each bin, as ``np.histogram(data, bin_edges, density=True)``.
+        """
+        total = np.sum(self.counts)
+        if total == 0:
+            return np.zeros(self.number_bins)
+
+        return self.counts / total / np.diff(self.bin_edges)
+
+    def get_percentile(self, percentile):
+        return float(np.interp(percentile, PERCENTILES, self.percentiles))
+
+    def is_compatible(self, number_bins, bin_edges=None):
+        """
+        Return True if the histogram has the fixed bin edges, or the number of bins between the minimum and maximum.
+        """
+        if bin_edges is not None:
+            return np.array_equal(self.bin_edges, np.asarray(bin_edges, dtype=np.float64))
+
+        return np.array_equal(self.bin_edges, get_bin_edges(self.minimum, self.maximum, number_bins))
+
+
+def get_bin_edges(minimum, maximum, number_bins):
+    """
+    Edges of the bins between the minimum and maximum, as :py:func:`numpy.histogram` with a number of bins.
+    """
+    if minimum == maximum:
+        minimum -= 0.5
+        maximum += 0.5
+
+    return np.linspace(minimum, maximum, number_bins + 1)
+
+
+def compute_histogram(read_rows, number_rows, number_bins=DEFAULT_NUMBER_BINS, bin_edges=None, block_rows=None):
+    """
+    Compute the histogram of a dataset read by blocks of rows.
+
+    With fixed bin edges, the minimum, maximum and counts are computed in one pass over the blocks. Otherwise the
+    bin edges depend on the minimum and maximum, a second pass is done only if the dataset is larger than one block.
+
+    :param read_rows: function returning the data of the rows ``start:stop``
+    :param number_rows: number of rows of the dataset
+    :param number_bins: number of bins between the minimum and maximum if the bin edges are None
+    :param bin_edges: fixed bin edges
+    :param block_rows: number of rows read at once, all the rows if None
+    :return: :py:class:`Histogram`
+
+    """
+    if block_rows is None:
+        block_rows = number_rows
+    block_rows = max(1, block_rows)
+
+    blocks = [(start, min(start + block_rows, number_rows)) for start in range(0, number_rows, block_rows)]
+
+    minimum = np.inf
+    maximum = -np.inf
+    counts = None
+    data = None
+    for start, stop in blocks:
+        data = _get_finite_values(read_rows(start, stop))
+        if data.size > 0:
+            minimum = min(minimum, float(np.min(data)))
+            maximum = max(maximum, float(np.max(data)))
+
+        if bin_edges is not None:
+            block_counts, _edges = np.histogram(data, bin_edges)
+            counts = block_counts if counts is None else counts + block_counts
+
+    if not np.isfinite(minimum):
+        minimum = maximum = 0.0
+
+    if bin_edges is None:
+        bin_edges = get_bin_edges(minimum, maximum, number_bins)
+
+        if len(blocks) == 1:
+            counts, _edges = np.histogram(data, bin_edges)
+        else:
+            counts = np.zeros(number_bins, dtype=np.int64)
+            for start, stop in blocks:
+                block_counts, _edges = np.histogram(_get_finite_values(read_rows(start, stop)), bin_edges)
+                counts += block_counts
+
+    if counts is None:
+        counts = np.zeros(len(bin_edges) - 1, dtype=np.int64)
+
+    percentiles = _compute_percentiles(counts, bin_edges, minimum, maximum)
+
+    return Histogram(counts, bin_edges, minimum, maximum, percentiles)
+
+
+def read_histogram(dataset):
+    """
+    Return the :py:class:`Histogram` saved in the attributes of the dataset or None.
+    """
+    attributes = dataset.attrs
+    if not all(name in attributes for name in HISTOGRAM_ATTRIBUTES):
+        return None
+
+    return Histogram(attributes[ATTRIBUTE_HISTOGRAM_COUNTS], attributes[ATTRIBUTE_HISTOGRAM_BIN_EDGES],
+                     attributes[ATTRIBUTE_MINIMUM], attributes[ATTRIBUTE_MAXIMUM], attributes[ATTRIBUTE_PERCENTILES])
+
+
+def write_histogram(dataset, histogram):
+    dataset.attrs[ATTRIBUTE_HISTOGRAM_COUNTS] = histogram.counts
+    dataset.attrs[ATTRIBUTE_HISTOGRAM_BIN_EDGES] = histogram.bin_edges
+    dataset.attrs[ATTRIBUTE_MINIMUM] = histogram.minimum
+    dataset.attrs[ATTRIBUTE_MAXIMUM] = histogram.maximum
+    dataset.attrs[ATTRIBUTE_PERCENTILES] = histogram.percentiles
+
+
+def remove_histogram(dataset):
+    """
+    Remove the histogram of a dataset, when its data is modified.
+    """
+    for name in HISTOGRAM_ATTRIBUTES:
+        if name in dataset.attrs:
+            del dataset.attrs[name]
+
+
+def _get_finite_values(data):
+    data = np.asarray(data)
+    if np.issubdtype(data.dtype, np.floating):
+        is_finite = np.isfinite(data)
+        if not np.all(is_finite):
+            return data[is_finite]
+
+    return data.ravel()
+
+
+def _compute_percentiles(counts, bin_edges, minimum, maximum):
+    total = np.sum(counts)
+    if total == 0:
+        return np.zeros(len(PERCENTILES))
+
+    cumulative = np.concatenate(([0.0], np.cumsum(counts, dtype=np.float64)))*100.0/total
+    percentiles = np.interp(PERCENTILES, cumulative, bin_edges)
+
+    return np.clip(percentiles, minimum, maximum)
@@ -29,29 +29,145 @@ Map used in the phase analysis module.
 import logging
 import os.path
 import csv
+import hashlib
 
 # Third party modules.
 import numpy as np
 from PIL import Image
 from scipy.ndimage import gaussian_filter
-import matplotlib
-import matplotlib.pyplot as plt
 
 # Local modules.
 
 # Project modules
+from xrayphasemap.plotting import plt, matplotlib
+from xrayphasemap.statistics import compute_statistics
+from xrayphasemap.morphology import get_morphology_pipeline
+from xrayphasemap.pyramid import get_level_factors, select_factor, DEFAULT_PREVIEW_SIZE
 
 # Globals and constants variables.
 
 
+class PhaseClassification(object):
+    def __init__(self, phase_labels, compound_indexes):
+        """
+        Classification of each pixel by the combination of phases found in the pixel.
+
+        :py:attr:`labels` is an integer raster giving for each pixel the index of its combination in
+        :py:attr:`combinations`, a combination is the tuple of the indexes of the phases in :py:attr:`phase_labels`.
+        :py:attr:`overlaps` is the number of phases found in each pixel.
+        All the images and fractions of :py:class:`PhaseMap` are derived from these rasters.
+
+        :param phase_labels: label of each phase in the same order as the compound indexes
+        :param compound_indexes: boolean mask of each phase
+
+        """
+        self.phase_labels = list(phase_labels)
+
+        self.labels, self.combinations = _label_combinations(compound_indexes)
+
+        number_phases = np.array([len(combination) for combination in self.combinations], dtype=np.uint16)
+        self.overlaps = number_phases[self.labels]
+
+        self.combination_counts = np.bincount(self.labels.ravel(), minlength=len(self.combinations))
+
+    @property
+    def number_pixels(self):
+        return self.labels.size
+
+    def get_phase_counts(self):
+        phase_counts = np.zeros(len(self.phase_labels), dtype=np.int64)
+        for combination, count in zip(self.combinations, self.combination_counts):
+            for phase_index in combination:
+                phase_counts[phase_index] += count
+
+        return phase_counts
+
+    def get_phase_fractions(self):
+        phase_counts = self.get_phase_counts()
+
+        phase_fractions = {}
+        for phase_label, number_pixels in zip(self.phase_labels, phase_counts):
+            phase_fractions[phase_label] = number_pixels/self.number_pixels
+
+        return phase_fractions
+
+    def get_statistics(self, cube, channels, pixel_size=None):
+        """
+        Number of pixels, fraction, area and mean and standard deviation of each channel of each phase.
+
+        :param cube: data of each channel, a list of 2D arrays
+        :param channels: ``(data_type, label)`` of each channel
+        :param pixel_size: size of a pixel in micrometer
+        :return: :py:class:`~xrayphasemap.statistics.PhaseStatistics`
+
+        """
+        return compute_statistics(self.labels, self.combinations, self.phase_labels, cube, channels, pixel_size)
+
+    def get_rgb_data(self, colors):
+        """
+        Sum the color of all the phases in each pixel using a palette lookup.
+
+        :param colors: rgb color of each phase, None to skip the phase
+
+        """
+        palette = np.zeros((len(self.combinations), 3), dtype=np.float32)
+        for combination_index, combination in enumerate(self.combinations):
+            for phase_index in combination:
+                if colors[phase_index] is not None:
+                    palette[combination_index] += np.asarray(colors[phase_index], dtype=np.float32)
+
+        return palette[self.labels]
+
+    def get_phase_data(self, start=0, stop=None):
+        """
+        Mask of each phase as float32 for the rows ``start:stop``, an array ``(rows, columns, phases)``.
+
+        A level of the pyramid of these masks is the fraction of the pixels of each phase, see
+        :py:meth:`get_rgb_level`.
+        """
+        palette = np.zeros((len(self.combinations), len(self.phase_labels)), dtype=np.float32)
+        for combination_index, combination in enumerate(self.combinations):
+            palette[combination_index, list(combination)] = 1.0
+
+        return palette[self.labels[start:stop]]
+
+    def get_rgb_level(self, phase_data, colors):
+        """
+        Sum the color of all the phases weighted by their fraction in each pixel of a level of
+        :py:meth:`get_phase_data`, the same as the mean of the blocks of pixels of :py:meth:`get_rgb_data`.
+
+        :param colors: rgb color of each phase, None to skip the phase
+
+        """
+        color_matrix = np.zeros((len(self.phase_labels), 3), dtype=np.float32)
+        for phase_index, color in enumerate(colors):
+            if color is not None:
+                color_matrix[phase_index] = color
+
+        return np.dot(phase_data, color_matrix)
+
+    def get_overlap_data(self, minimum_overlap=1):
+        """
+        Number of phases in each pixel as a rgb data, pixels with less phases than the minimum are set to zero.
+        """
+        palette = np.array([len(combination) for combination in self.combinations], dtype=np.float32)
+        palette[palette < minimum_overlap] = 0
+
+        return np.repeat(palette[self.labels][..., np.newaxis], 3, axis=2)
+
+
 class PhaseMap(object):
-    def __init__(self, phase_map_name, phase_analysis, is_dilation_erosion=False):
+    def __init__(self, phase_map_name, phase_analysis, is_dilation_erosion=False, max_workers=None):
         self.phase_map_name = phase_map_name
         self.phase_analysis = phase_analysis
         self.is_dilation_erosion = is_dilation_erosion
+        self.max_workers = max_workers
 
         self.phases = {}
 
+        self._classification = None
+        self._classification_key = None
+
     def add_phase(self, phase, color_name, label=None):
         if label is None:
             label = phase.name
@@ -60,8 +176,13 @@ class PhaseMap(object):
     def add_phases(self, label, phases, color_name, union=True):
         self.phases[label] = (phases, color_name, union)
 
-    def display_map(self, label=None, use_gaussian_filter=False, legend=None, display_now=True):
-        image = self.get_image(label)
+    def display_map(self, label=None, use_gaussian_filter=False, legend=None, display_now=True,
+                    preview_size=DEFAULT_PREVIEW_SIZE):
+        """
+        Display the phase map from the level of the pyramid of the classification matching the preview size.
+        """
+        image_data, _factor = self.get_rgb_preview(label, preview_size)
+        image = Image.fromarray(np.uint8(image_data*255.0))
 
         plt.figure()
         if label is not None:
@@ -74,7 +195,7 @@ class PhaseMap(object):
                 patches, labels = self.get_legend()
             else:
                 patches, labels = legend
-            plt.figlegend(patches, labels, 'upper right')
+            plt.figlegend(patches, labels, loc='upper right')
 
         if display_now:
             self.show()
@@ -90,7 +211,7 @@ class PhaseMap(object):
         patches = [matplotlib.patches.Patch(color="black"),
                    matplotlib.patches.Patch(edgecolor='black', facecolor='white')]
         labels = ["No phase", "Phases"]
-        plt.figlegend(patches, labels, 'upper right')
+        plt.figlegend(patches, labels, loc='upper right')
 
         if display_now:
             self.show()
@@ -105,7 +226,7 @@ class PhaseMap(object):
 
         patches = [matplotlib.patches.Patch(edgecolor='black', facecolor='white')]
         labels = ["Overlap phases"]
-        plt.figlegend(patches, labels, 'upper right')
+        plt.figlegend(patches, labels, loc='upper right')
 
         if display_now:
             self.show()
@@ -127,7 +248,7 @@ class PhaseMap(object):
                 patches, labels = self.get_legend()
             else:
                 patches, labels = legend
-            plt.figlegend(patches, labels, 'upper right')
+            plt.figlegend(patches, labels, loc='upper right')
 
         if label is None:
             label = "allphases"
@@ -135,6 +256,8 @@ class PhaseMap(object):
         plt.savefig(file_path)
         plt.close()
 
+        return file_path
+
     def save_no_phase_map(self, figures_path):
         image = self.get_no_phase_image()
 
@@ -146,12 +269,14 @@ class PhaseMap(object):
         patches = [matplotlib.patches.Patch(color="black"),
                    matplotlib.patches.Patch(edgecolor='black', facecolor='white')]
         labels = ["No phase", "Phases"]
-        plt.figlegend(patches, labels, 'upper right')
+        plt.figlegend(patches, labels, loc='upper right')
 
         file_path = os.path.join(figures_path, self.phase_map_name + "_nophase" + ".png")
         plt.savefig(file_path)
         plt.close()
 
+        return file_path
+
     def save_overlap_map(self, figures_path):
         image = self.get_overlap_phase_image()
 
@@ -162,12 +287,14 @@ class PhaseMap(object):
 
         patches = [matplotlib.patches.Patch(edgecolor='black', facecolor='white')]
         labels = ["Overlap phases"]
-        plt.figlegend(patches, labels, 'upper right')
+        plt.figlegend(patches, labels, loc='upper right')
 
         file_path = os.path.join(figures_path, self.phase_map_name + "_overlap" + ".png")
         plt.savefig(file_path)
         plt.close()
 
+        return file_path
+
     def save_phases_fraction(self, figures_path):
         phase_fractions = self.get_phases_fraction()
 
@@ -184,21 +311,160 @@ class PhaseMap(object):
                 row.append(phase_fractions[phase_name])
                 writer.writerow(row)
 
-    def get_image(self, label=None, use_gaussian_filter=False):
-        width, height = self.phase_analysis.get_width_height()
-        image_data = np.zeros((width, height, 3), dtype=np.float32)
+        return file_path
 
-        if label is None:
-            for label in self.phases:
-                phases, color_name, union = self.phases[label]
-                color = self._get_rgb(color_name)
-                data = self.phase_analysis.get_phase_data(phases, color, self.is_dilation_erosion, union)
-                image_data += data
+    def save_phases_statistics(self, figures_path, data_types=None):
+        """
+        Save the table of the statistics of each phase and channel, it extends the table of the phases fraction.
+        """
+        statistics = self.get_phases_statistics(data_types)
+
+        file_path = os.path.join(figures_path, self.phase_map_name + "_phases_statistics" + ".csv")
+        return statistics.save_csv(file_path)
+
+    def get_phases_statistics(self, data_types=None):
+        """
+        Statistics of each phase for all the labels of the data types.
+
+        By default, the data types are those of the conditions of the phases, but only the labels of the conditions
+        are used for a virtual data type like the element ratios, each of its labels is a map computed when read.
+
+        :param data_types: list of data types of the channels, the data types of the conditions of the phases if None
+        :return: :py:class:`~xrayphasemap.statistics.PhaseStatistics`
+
+        """
+        is_default = data_types is None
+        condition_channels = self._get_channels()
+        if is_default:
+            data_types = []
+            for data_type, _label in condition_channels:
+                if data_type not in data_types:
+                    data_types.append(data_type)
+
+        channels = []
+        for data_type in data_types:
+            if is_default and self.phase_analysis.is_virtual(data_type):
+                labels = [label for channel_data_type, label in condition_channels if channel_data_type == data_type]
+            else:
+                labels = self.phase_analysis.get_labels(data_type)
+            channels.extend((data_type, label) for label in labels)
+        cube = [self.phase_analysis.get_data(data_type, label) for data_type, label in channels]
+
+        classification = self.get_classification()
+        return classification.get_statistics(cube, channels, self.phase_analysis.get_pixel_size())
+
+    def get_classification(self):
+        """
+        Classify all the phases once, the result is reused until the phases, thresholds or data change.
+
+        :return: the :py:class:`PhaseClassification` of the current phases
+
+        """
+        key = self._get_classification_key()
+        if self._classification is None or key != self._classification_key:
+            phase_labels = list(self.phases)
+            phase_groups = []
+            for label in phase_labels:
+                phases, _color_name, union = self.phases[label]
+                phase_groups.append((phases, union))
+
+            if len(phase_groups) > 0:
+                compound_indexes = self.phase_analysis.compute_compound_indexes(phase_groups, self.is_dilation_erosion,
+                                                                                max_workers=self.max_workers)
+            else:
+                width, height = self.phase_analysis.get_width_height()
+                compound_indexes = [np.zeros((width, height), dtype=bool)]
+
+            self._classification = PhaseClassification(phase_labels, compound_indexes)
+            self._classification_key = key
+
+        return self._classification
+
+    def get_evaluation_plan(self):
+        """
+        Return the :py:class:`~xrayphasemap.plan.EvaluationPlan` of the classification of the phases.
+        """
+        from xrayphasemap.plan import EvaluationPlan
+
+        phase_groups = [(label, phases, union) for label, (phases, _color_name, union) in self.phases.items()]
+        return EvaluationPlan(phase_groups, self.is_dilation_erosion, self.phase_map_name)
+
+    def invalidate(self):
+        self._classification = None
+        self._classification_key = None
+
+    def _get_classification_key(self):
+        phases_key = []
+        for label in self.phases:
+            phases, color_name, union = self.phases[label]
+            try:
+                phases[0]
+            except TypeError:
+                phases = [phases]
+            conditions_key = tuple((phase.name, tuple(sorted(phase.conditions.items()))) for phase in phases)
+            phases_key.append((label, union, conditions_key))
+
+        modification_count = getattr(self.phase_analysis, "modification_count", None)
+        return self.is_dilation_erosion, tuple(phases_key), modification_count
+
+    def get_rgb_preview(self, label=None, size=DEFAULT_PREVIEW_SIZE):
+        """
+        Rgb data of the phase map at the level of the pyramid of the classification matching the preview size.
+
+        The pyramid is saved in the project file once for all the colors, see
+        :py:meth:`~xrayphasemap.analysis.PhaseAnalysis.get_classification_level`.
+
+        :return: ``(data, factor)``, where factor is the size of the block of pixels of the classification
+                 averaged in each pixel of the preview
+
+        """
+        classification = self.get_classification()
+        colors = self._get_colors(label)
+
+        shape = classification.labels.shape
+        factor = select_factor(shape, get_level_factors(shape), size) if size is not None else 1
+        if factor == 1 or len(self.phases) == 0:
+            return classification.get_rgb_data(colors), 1
+
+        phase_data = self.phase_analysis.get_classification_level(self.phase_map_name, classification,
+                                                                  self._get_pyramid_key(), self._get_channels(),
+                                                                  factor)
+        return classification.get_rgb_level(phase_data, colors), factor
+
+    def _get_channels(self):
+        """
+        Channels ``(data_type, label)`` of the conditions of all the phases.
+        """
+        channels = []
+        for phases, _color_name, _union in self.phases.values():
+            try:
+                phases[0]
+            except TypeError:
+                phases = [phases]
+            for phase in phases:
+                for channel in phase.conditions:
+                    if channel not in channels:
+                        channels.append(channel)
+
+        return channels
+
+    def _get_pyramid_key(self):
+        """
+        Digest of the phases, conditions and morphology of the classification saved with its pyramid.
+        """
+        _is_dilation_erosion, phases_key, _modification_count = self._get_classification_key()
+
+        morphology_pipeline = get_morphology_pipeline(self.is_dilation_erosion)
+        if morphology_pipeline is None:
+            morphology_key = None
         else:
-                phases, color_name, union = self.phases[label]
-                color = self._get_rgb(color_name)
-                data = self.phase_analysis.get_phase_data(phases, color, self.is_dilation_erosion, union)
-                image_data += data
+            morphology_key = (morphology_pipeline.operations, morphology_pipeline.structure.tolist())
+
+        text = repr((phases_key, morphology_key))
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get_image(self, label=None, use_gaussian_filter=False):
+        image_data = self.get_classification().get_rgb_data(self._get_colors(label))
 
         image = Image.fromarray(np.uint8(image_data*255.0))
         if use_gaussian_filter:
@@ -208,52 +474,29 @@ class PhaseMap(object):
         return image
 
     def get_no_phase_image(self):
-        color = (1, 1, 1)
-        width, height = self.phase_analysis.get_width_height()
-        image_data = np.zeros((width, height, 3), dtype=np.float32)
-        for label in self.phases:
-            phases, _color_name, union = self.phases[label]
-            data = self.phase_analysis.get_phase_data(phases, color, self.is_dilation_erosion, union)
-            image_data += data
+        classification = self.get_classification()
+        image_data = classification.get_overlap_data()
 
         image = Image.fromarray(np.uint8(image_data*255.0))
 
         return image
 
     def get_overlap_phase_image(self):
-        color = (1, 1, 1)
-        width, height = self.phase_analysis.get_width_height()
-        image_data = np.zeros((width, height, 3), dtype=np.float32)
-        for label in self.phases:
-            phases, _color_name, union = self.phases[label]
-            data = self.phase_analysis.get_phase_data(phases, color, self.is_dilation_erosion, union)
-            image_data += data
+        classification = self.get_classification()
+        image_data = classification.get_overlap_data(minimum_overlap=2)
 
         logging.debug(image_data.shape)
 
         logging.debug(np.min(image_data))
         logging.debug(np.max(image_data))
 
-        mask = image_data > 1
-        logging.debug(np.min(mask))
-        logging.debug(np.max(mask))
-
-        image_data[~mask] = 0
-
-        logging.debug(np.min(image_data))
-        logging.debug(np.max(image_data))
-
         image = Image.fromarray(np.uint8(image_data*255.0))
 
         return image
 
     def get_phases_fraction(self):
-        phase_fractions = {}
-        for label in self.phases:
-            phases, _color_name, union = self.phases[label]
-            phase_fraction = self.phase_analysis.get_phase_fraction(phases, self.is_dilation_erosion, union)
-
-            phase_fractions[label] = phase_fraction
+        classification = self.get_classification()
+        phase_fractions = classification.get_phase_fractions()
 
         return phase_fractions
 
@@ -272,6 +515,20 @@ class PhaseMap(object):
 
         return patches, labels
 
+    def _get_colors(self, label=None):
+        """
+        Rgb color of each phase of the classification, only the phase of the label if it is not None.
+        """
+        colors = []
+        for phase_label in self.get_classification().phase_labels:
+            if label is None or phase_label == label:
+                _phases, color_name, _union = self.phases[phase_label]
+                colors.append(self._get_rgb(color_name))
+            else:
+                colors.append(None)
+
+        return colors
+
     def _get_rgb(self, name):
         rgb = matplotlib.colors.hex2color(matplotlib.colors.cnames[name])
         return rgb
@@ -292,7 +549,7 @@ class PhaseMap(object):
             patches, labels = self.get_legend()
         else:
             patches, labels = legend
-        plt.figlegend(patches, labels, 'upper right')
+        plt.figlegend(patches, labels, loc='upper right')
         plt.savefig(file_path)
 
         if save_only:
@@ -308,7 +565,7 @@ class PhaseMap(object):
 
         patches = [matplotlib.patches.Patch(color="black"), matplotlib.patches.Patch(edgecolor='black', facecolor='white')]
         labels = ["No phase", "Phases"]
-        plt.figlegend(patches, labels, 'upper right')
+        plt.figlegend(patches, labels, loc='upper right')
         plt.savefig(file_path)
 
     def create_overlap_phase_image(self, file_path):
@@ -321,10 +578,46 @@ class PhaseMap(object):
 
         patches = [matplotlib.patches.Patch(edgecolor='black', facecolor='white')]
         labels = ["Overlap phases"]
-        plt.figlegend(patches, labels, 'upper right')
+        plt.figlegend(patches, labels, loc='upper right')
         plt.savefig(file_path)
 
 
+def _label_combinations(compound_indexes):
+    """
+    Label each pixel by the combination of masks it belongs to.
+
+    The masks are added one at a time: each label is split in two, with and without the mask, and the labels are
+    renumbered with a lookup table of the used labels. It is linear in the number of pixels and masks.
+
+    :param compound_indexes: list of boolean masks with the same shape
+    :return: integer raster of labels and the tuple of mask indexes of each label
+
+    """
+    labels = np.zeros(compound_indexes[0].shape, dtype=np.int32)
+    combinations = [()]
+
+    for mask_index, compound_index in enumerate(compound_indexes):
+        codes = labels*2
+        codes += compound_index
+
+        counts = np.bincount(codes.ravel(), minlength=2*len(combinations))
+        used_codes = np.flatnonzero(counts)
+
+        lookup = np.zeros(len(counts), dtype=np.int32)
+        lookup[used_codes] = np.arange(len(used_codes), dtype=np.int32)
+        labels = lookup[codes]
+
+        new_combinations = []
+        for code in used_codes:
+            combination = combinations[code // 2]
+            if code % 2:
+                combination = combination + (mask_index,)
+            new_combinations.append(combination)
+        combinations = new_combinations
+
+    return labels, combinations
+
+
 def save_phase_only(phase_map, phase, graphic_path, color):
     """
     Save an png image of one phase.
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.morphology
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Morphological cleanup of the compound indexes.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+
+# Third party modules.
+import numpy as np
+from scipy import ndimage
+
+# Local modules.
+
+# Project modules
+
+# Globals and constants variables.
+OPERATION_CLOSING = "closing"
+OPERATION_OPENING = "opening"
+
+OPERATION_DILATION = "dilation"
+OPERATION_EROSION = "erosion"
+
+DEFAULT_OPERATIONS = ((OPERATION_CLOSING, 1),
+                      (OPERATION_OPENING, 1),
+                      (OPERATION_CLOSING, 2),
+                      (OPERATION_OPENING, 2),
+                      (OPERATION_CLOSING, 1))
+
+
+class MorphologyPipeline(object):
+    def __init__(self, operations=DEFAULT_OPERATIONS, structure=None):
+        """
+        Sequence of binary closings and openings applied on a compound index.
+
+        The default pipeline is the dilation and erosion of :py:class:`~xrayphasemap.analysis.PhaseAnalysis`.
+        As :py:func:`scipy.ndimage.binary_closing` and :py:func:`scipy.ndimage.binary_opening`, the pixels outside
+        the image are false.
+
+        When the structure is a full rectangle, the consecutive dilations and erosions of the sequence are fused and
+        each one is done by separable box filters, which cost grows with the logarithm of the iterations.
+        The other structures use :py:mod:`scipy.ndimage` directly.
+
+        :param operations: list of ``(operation, iterations)``, where operation is :py:const:`OPERATION_CLOSING` or :py:const:`OPERATION_OPENING`
+        :param structure: 2D boolean structuring element, the 3x3 full square if None
+
+        """
+        if structure is None:
+            structure = ndimage.generate_binary_structure(2, 2)
+        structure = np.asarray(structure, dtype=bool)
+
+        if structure.ndim != 2 or structure.shape[0] % 2 == 0 or structure.shape[1] % 2 == 0:
+            raise ValueError("The structure must be a 2D array with odd sizes, got %s" % (structure.shape,))
+
+        for operation, iterations in operations:
+            if operation not in (OPERATION_CLOSING, OPERATION_OPENING):
+                raise ValueError("Unknown operation %s" % operation)
+            if iterations < 1:
+                raise ValueError("The number of iterations must be at least 1, got %i" % iterations)
+
+        self.operations = tuple((operation, int(iterations)) for operation, iterations in operations)
+        self.structure = structure
+
+    def __eq__(self, other):
+        if not isinstance(other, MorphologyPipeline):
+            return NotImplemented
+        return self.operations == other.operations and np.array_equal(self.structure, other.structure)
+
+    def __hash__(self):
+        return hash((self.operations, self.structure.shape, self.structure.tobytes()))
+
+    def __repr__(self):
+        return "MorphologyPipeline(%r, structure shape %s)" % (self.operations, self.structure.shape)
+
+    @property
+    def is_box(self):
+        return bool(np.all(self.structure))
+
+    @property
+    def halo(self):
+        """
+        Number of pixels around a tile changing the result of the pipeline inside the tile.
+        """
+        radius = max(self.structure.shape) // 2
+        return sum(2*iterations*radius for _operation, iterations in self.operations)
+
+    def get_steps(self):
+        """
+        Sequence of ``(operation, iterations)`` of the dilations and erosions, the consecutive steps are fused.
+        """
+        steps = []
+        for operation, iterations in self.operations:
+            if operation == OPERATION_CLOSING:
+                operation_steps = [(OPERATION_DILATION, iterations), (OPERATION_EROSION, iterations)]
+            else:
+                operation_steps = [(OPERATION_EROSION, iterations), (OPERATION_DILATION, iterations)]
+
+            for step, step_iterations in operation_steps:
+                if len(steps) > 0 and steps[-1][0] == step:
+                    steps[-1] = (step, steps[-1][1] + step_iterations)
+                else:
+                    steps.append((step, step_iterations))
+
+        return steps
+
+    def apply(self, compound_index):
+        """
+        Return the cleaned compound index.
+        """
+        compound_index = np.asarray(compound_index, dtype=bool)
+
+        if self.is_box:
+            return self._apply_box(compound_index)
+        else:
+            return self._apply_ndimage(compound_index)
+
+    def apply_reference(self, compound_index):
+        """
+        Return the cleaned compound index with the closings and openings of :py:mod:`scipy.ndimage`.
+        """
+        compound_index = np.asarray(compound_index, dtype=bool)
+
+        for operation, iterations in self.operations:
+            if operation == OPERATION_CLOSING:
+                compound_index = ndimage.binary_closing(compound_index, self.structure, iterations=iterations)
+            else:
+                compound_index = ndimage.binary_opening(compound_index, self.structure, iterations=iterations)
+
+        return compound_index
+
+    def _apply_ndimage(self, compound_index):
+        for step, iterations in self.get_steps():
+            if step == OPERATION_DILATION:
+                compound_index = ndimage.binary_dilation(compound_index, self.structure, iterations=iterations)
+            else:
+                compound_index = ndimage.binary_erosion(compound_index, self.structure, iterations=iterations)
+
+        return compound_index
+
+    def _apply_box(self, compound_index):
+        for step, iterations in self.get_steps():
+            # The n iterations of a square are one square of side n*(side - 1) + 1.
+            for axis, side in enumerate(self.structure.shape):
+                size = iterations*(side - 1) + 1
+                compound_index = _box_filter(compound_index, size, axis, step == OPERATION_DILATION)
+
+        return compound_index
+
+
+def _box_filter(data, size, axis, is_dilation):
+    """
+    Logical or, for a dilation, or logical and, for an erosion, of the pixels of a centered window along one axis.
+
+    The pixels outside the data are false. The window of size ``a + b`` is the window of size ``a`` combined with the
+    window of size ``b`` shifted by ``a``, so only the powers of two of the size are computed.
+    """
+    if is_dilation:
+        operator = np.logical_or
+    else:
+        operator = np.logical_and
+
+    radius = size // 2
+    pad_width = [(0, 0)]*data.ndim
+    pad_width[axis] = (radius, radius)
+    window = np.pad(data, pad_width, mode="constant", constant_values=False)
+    length = window.shape[axis]
+
+    result = None
+    result_size = 0
+    window_size = 1
+    remaining_size = size
+    while remaining_size > 0:
+        if remaining_size & 1:
+            if result is None:
+                result = window
+            else:
+                result = operator(_slice_axis(result, 0, length - result_size - window_size + 1, axis),
+                                  _slice_axis(window, result_size, length - window_size + 1, axis))
+            result_size += window_size
+
+        remaining_size >>= 1
+        if remaining_size > 0:
+            window = operator(_slice_axis(window, 0, length - 2*window_size + 1, axis),
+                              _slice_axis(window, window_size, length - window_size + 1, axis))
+            window_size *= 2
+
+    return np.ascontiguousarray(result)
+
+
+def _slice_axis(data, start, stop, axis):
+    selection = [slice(None)]*data.ndim
+    selection[axis] = slice(start, stop)
+    return data[tuple(selection)]
+
+
+DEFAULT_MORPHOLOGY_PIPELINE = MorphologyPipeline()
+
+
+def get_morphology_pipeline(is_dilation_erosion):
+    """
+    Pipeline of the dilation and erosion option, True for the default pipeline, False or None for no pipeline.
+    """
+    if isinstance(is_dilation_erosion, MorphologyPipeline):
+        return is_dilation_erosion
+    elif is_dilation_erosion:
+        return DEFAULT_MORPHOLOGY_PIPELINE
+    else:
+        return None
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.plan
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Evaluation plan of groups of phases: the channels read, the shared comparisons and conditions and the estimated cost.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import collections
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.classifier import PhaseClassifier
+from xrayphasemap.morphology import get_morphology_pipeline
+
+# Globals and constants variables.
+STEP_READS = "channel reads"
+STEP_COMPARISONS = "comparisons"
+STEP_COMBINATIONS = "mask combinations"
+STEP_MORPHOLOGY = "dilations and erosions"
+
+STEPS = (STEP_READS, STEP_COMPARISONS, STEP_COMBINATIONS, STEP_MORPHOLOGY)
+
+
+class EvaluationPlan(object):
+    def __init__(self, phase_groups, is_dilation_erosion=False, name=None):
+        """
+        Compile groups of phases as :py:meth:`~xrayphasemap.analysis.PhaseAnalysis.compute_compound_indexes`
+        evaluates them with a :py:class:`~xrayphasemap.classifier.PhaseClassifier`.
+
+        Each channel is read once, each distinct comparison and condition is computed once, the phases with the
+        same conditions are evaluated once and the groups with the same phases are combined and cleaned once.
+        The cost of each step is the number of operations on the whole image, it is compared with the evaluation
+        of each condition of each phase of each group separately.
+
+        :param phase_groups: list of ``(label, phases, union)``, where phases is a phase or a list of phases
+        :param is_dilation_erosion: True for the default dilation and erosion, or a :py:class:`~xrayphasemap.morphology.MorphologyPipeline`
+        :param name: name of the plan, the name of the phase map
+
+        """
+        from xrayphasemap.analysis import _get_phase_list
+
+        self.name = name
+        self.labels = [label for label, _phases, _union in phase_groups]
+        self.morphology_pipeline = get_morphology_pipeline(is_dilation_erosion)
+
+        self.phases = []
+        self.groups = []
+        phase_indexes_by_id = {}
+        for _label, phases, union in phase_groups:
+            phase_indexes = []
+            for phase in _get_phase_list(phases):
+                if id(phase) not in phase_indexes_by_id:
+                    phase_indexes_by_id[id(phase)] = len(self.phases)
+                    self.phases.append(phase)
+                phase_indexes.append(phase_indexes_by_id[id(phase)])
+            self.groups.append((phase_indexes, union))
+
+        self.classifier = PhaseClassifier(self.phases)
+
+        self.group_sources = []
+        source_indexes = {}
+        for group_index, (phase_indexes, union) in enumerate(self.groups):
+            key = (frozenset(self.classifier.phase_sources[index] for index in phase_indexes), bool(union))
+            self.group_sources.append(source_indexes.setdefault(key, group_index))
+
+    @property
+    def channels(self):
+        return self.classifier.channels
+
+    @property
+    def conditions(self):
+        return self.classifier.conditions
+
+    def get_comparisons(self):
+        """
+        Distinct comparisons ``(channel index, is minimum, threshold)`` of the conditions.
+        """
+        comparisons = []
+        for channel_index, minimum, maximum in self.conditions:
+            for threshold, is_minimum in ((minimum, True), (maximum, False)):
+                comparison = (channel_index, is_minimum, threshold)
+                if threshold is not None and comparison not in comparisons:
+                    comparisons.append(comparison)
+
+        return comparisons
+
+    def get_operations(self):
+        """
+        Number of operations on the whole image of each step, :py:const:`STEPS`.
+
+        :return: dict of ``(planned, separate)``, the operations of this plan and of the separate evaluation
+
+        """
+        classifier = self.classifier
+        source_phases = classifier.source_phases
+
+        number_bounds = 0
+        for phase_indexes, _union in self.groups:
+            for phase_index in phase_indexes:
+                for minimum, maximum in self.phases[phase_index].conditions.values():
+                    number_bounds += (minimum is not None) + (maximum is not None)
+        number_group_phases = sum(len(phase_indexes) for phase_indexes, _union in self.groups)
+
+        number_double_bounds = sum(1 for _channel, minimum, maximum in self.conditions
+                                   if minimum is not None and maximum is not None)
+        number_phase_combinations = sum(len(classifier.phase_conditions[phase_index])
+                                        for phase_index in source_phases)
+        source_groups = [group_index for group_index, source_index in enumerate(self.group_sources)
+                         if group_index == source_index]
+        number_source_group_phases = sum(len(set(self.groups[group_index][0])) for group_index in source_groups)
+        number_copies = len(self.phases) - len(source_phases) + len(self.groups) - len(source_groups)
+
+        iterations = 0
+        if self.morphology_pipeline is not None:
+            iterations = sum(step_iterations for _step, step_iterations in self.morphology_pipeline.get_steps())
+
+        operations = collections.OrderedDict()
+        operations[STEP_READS] = (len(self.channels), number_bounds)
+        operations[STEP_COMPARISONS] = (len(self.get_comparisons()), number_bounds)
+        operations[STEP_COMBINATIONS] = (number_double_bounds + number_phase_combinations +
+                                         number_source_group_phases + number_copies,
+                                         number_bounds + number_group_phases)
+        operations[STEP_MORPHOLOGY] = (iterations*len(source_groups), iterations*len(self.groups))
+
+        return operations
+
+    def get_cost(self, number_pixels):
+        """
+        Estimated number of pixel operations of this plan and of the separate evaluation.
+        """
+        operations = self.get_operations()
+        planned = sum(planned for planned, _separate in operations.values())*number_pixels
+        separate = sum(separate for _planned, separate in operations.values())*number_pixels
+
+        return planned, separate
+
+    def format(self, number_pixels=None):
+        """
+        Description of the plan as text, with the estimated cost if the number of pixels is given.
+        """
+        classifier = self.classifier
+        lines = []
+
+        if self.name is not None:
+            lines.append("Phase map %s" % self.name)
+
+        lines.append("Channels read: %i" % len(self.channels))
+        for data_type, label in self.channels:
+            lines.append("  %s %s" % (data_type, label))
+
+        lines.append("Conditions: %i" % len(self.conditions))
+        for condition_index, condition in enumerate(self.conditions):
+            number_phases = len(classifier.condition_phases[condition_index])
+            lines.append("  c%i: %s, %i phase%s" % (condition_index, self._format_condition(condition),
+                                                    number_phases, "s" if number_phases > 1 else ""))
+
+        lines.append("Phases: %i" % len(self.phases))
+        for phase_index, phase in enumerate(self.phases):
+            source_index = classifier.phase_sources[phase_index]
+            if source_index != phase_index:
+                description = "same as %s" % self.phases[source_index].name
+            elif len(classifier.phase_conditions[phase_index]) == 0:
+                description = "all pixels"
+            else:
+                description = " & ".join("c%i" % index for index in classifier.phase_conditions[phase_index])
+            lines.append("  %s: %s" % (phase.name, description))
+
+        lines.append("Groups: %i" % len(self.groups))
+        for group_index, (phase_indexes, union) in enumerate(self.groups):
+            source_index = self.group_sources[group_index]
+            if source_index != group_index:
+                description = "same as %s" % self.labels[source_index]
+            else:
+                operator = " | " if union else " & "
+                description = operator.join(self.phases[index].name for index in phase_indexes)
+            lines.append("  %s: %s" % (self.labels[group_index], description))
+
+        if self.morphology_pipeline is not None:
+            steps = ", ".join("%s %i" % (operation, iterations)
+                              for operation, iterations in self.morphology_pipeline.operations)
+            lines.append("Morphology: %s" % steps)
+
+        lines.append("Operations (planned / separate):")
+        for step, (planned, separate) in self.get_operations().items():
+            lines.append("  %s: %i / %i" % (step, planned, separate))
+
+        if number_pixels is not None:
+            planned, separate = self.get_cost(number_pixels)
+            lines.append("Estimated cost for %i pixels: %.3g pixel operations, %.3g if evaluated separately" %
+                         (number_pixels, planned, separate))
+
+        return "\n".join(lines)
+
+    def _format_condition(self, condition):
+        channel_index, minimum, maximum = condition
+        channel = "%s %s" % self.channels[channel_index]
+        if minimum is not None and maximum is not None:
+            return "%s <= %s <= %s" % (minimum, channel, maximum)
+        elif minimum is not None:
+            return "%s >= %s" % (channel, minimum)
+        else:
+            return "%s <= %s" % (channel, maximum)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.plotting
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Plotting layer loaded on first use, matplotlib is not imported by the analysis and classification.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import importlib
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.render import COLOR_MAPS_DATA, COLOR_MAP_NUMBER_COLORS
+
+# Globals and constants variables.
+
+
+class LazyModule(object):
+    def __init__(self, name):
+        """
+        Module imported when one of its attributes is used for the first time, the submodules are also imported
+        on first use, like ``matplotlib.patches``.
+
+        Importing :py:mod:`matplotlib.pyplot` also registers the color maps of :py:func:`create_color_maps`.
+        """
+        self._name = name
+
+    def __getattr__(self, attribute):
+        module = _import_module(self._name)
+
+        try:
+            return getattr(module, attribute)
+        except AttributeError:
+            try:
+                return _import_module("%s.%s" % (self._name, attribute))
+            except ImportError:
+                raise AttributeError("module '%s' has no attribute '%s'" % (self._name, attribute))
+
+
+plt = LazyModule("matplotlib.pyplot")
+matplotlib = LazyModule("matplotlib")
+
+
+def get_color_map(color_map_name):
+    """
+    Return a registered color map with the API of the installed matplotlib.
+    """
+    _import_module("matplotlib.pyplot")
+    import matplotlib
+
+    try:
+        return matplotlib.colormaps[color_map_name]
+    except AttributeError:
+        import matplotlib.cm
+        return matplotlib.cm.get_cmap(color_map_name)
+
+
+def create_color_maps():
+    """
+    Register the color maps of :py:const:`~xrayphasemap.render.COLOR_MAPS_DATA`, only once.
+    """
+    import matplotlib
+    from matplotlib.colors import LinearSegmentedColormap
+
+    for name, color_dict in COLOR_MAPS_DATA.items():
+        color_map = LinearSegmentedColormap(name, color_dict, COLOR_MAP_NUMBER_COLORS)
+
+        registry = getattr(matplotlib, "colormaps", None)
+        if registry is not None:
+            if name not in registry:
+                registry.register(color_map)
+        else:
+            import matplotlib.cm
+
+            try:
+                matplotlib.cm.get_cmap(name)
+            except ValueError:
+                matplotlib.cm.register_cmap(name=name, cmap=color_map)
+
+
+def _import_module(name):
+    is_loaded = name in _loaded_modules
+    module = importlib.import_module(name)
+
+    if not is_loaded:
+        _loaded_modules.add(name)
+        if name == "matplotlib.pyplot":
+            create_color_maps()
+
+    return module
+
+
+_loaded_modules = set()
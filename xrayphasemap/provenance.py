@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.provenance
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Revisions of the datasets and provenance of the derived datasets, to skip the computations already up to date.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import json
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules
+from xrayphasemap import __version__
+
+# Globals and constants variables.
+ATTRIBUTE_REVISION = "revision"
+ATTRIBUTE_REVISION_COUNTER = "revision counter"
+ATTRIBUTE_PROVENANCE = "provenance"
+
+
+def new_revision(h5file, dataset):
+    """
+    Give the dataset the next revision of the project file, each time its data is written.
+    """
+    revision = int(h5file.attrs.get(ATTRIBUTE_REVISION_COUNTER, 0)) + 1
+    h5file.attrs[ATTRIBUTE_REVISION_COUNTER] = revision
+    dataset.attrs[ATTRIBUTE_REVISION] = revision
+
+    return revision
+
+
+def get_revision(h5file, dataset):
+    """
+    Revision of the dataset, a new revision is given to the datasets written before the revisions were saved.
+    """
+    revision = dataset.attrs.get(ATTRIBUTE_REVISION)
+    if revision is None:
+        return new_revision(h5file, dataset)
+
+    return int(revision)
+
+
+def create_provenance(h5file, input_datasets, parameters):
+    """
+    Provenance of a derived dataset: the revision of each input dataset, the parameters and the library version.
+
+    :param h5file: project file of the datasets
+    :param input_datasets: list of the input datasets
+    :param parameters: dict of the parameters of the computation, the values must be saved as JSON
+    :return: provenance as a JSON string
+
+    """
+    inputs = dict((dataset.name, get_revision(h5file, dataset)) for dataset in input_datasets)
+    provenance = {"inputs": inputs, "parameters": parameters, "version": __version__}
+
+    return json.dumps(provenance, sort_keys=True)
+
+
+def is_up_to_date(dataset, provenance):
+    return dataset.attrs.get(ATTRIBUTE_PROVENANCE) == provenance
+
+
+def read_provenance(dataset):
+    """
+    Return the provenance of the dataset as a dict or None.
+    """
+    provenance = dataset.attrs.get(ATTRIBUTE_PROVENANCE)
+    if provenance is None:
+        return None
+
+    return json.loads(provenance)
+
+
+def write_provenance(dataset, provenance):
+    dataset.attrs[ATTRIBUTE_PROVENANCE] = provenance
+
+
+def remove_provenance(dataset):
+    if ATTRIBUTE_PROVENANCE in dataset.attrs:
+        del dataset.attrs[ATTRIBUTE_PROVENANCE]
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.pyramid
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Multi-resolution pyramid of the datasets saved in the project file, to display previews of large maps quickly.
+
+The level of factor ``f`` of a dataset is the mean of the finite values of each block of ``f x f`` pixels, it is
+saved in the group ``/pyramid/data_type/label`` with the key of the dataset it was computed from.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+
+# Globals and constants variables.
+GROUP_PYRAMID = "pyramid"
+
+ATTRIBUTE_SOURCE = "source"
+ATTRIBUTE_FACTOR = "factor"
+ATTRIBUTE_INPUTS = "inputs"
+
+GROUP_PHASE_MAP = "phase map"
+
+DEFAULT_PREVIEW_SIZE = 1024
+MINIMUM_LEVEL_SIZE = 256
+DEFAULT_BLOCK_SIZE = 16*1024*1024
+
+
+def get_level_factors(shape, minimum_size=MINIMUM_LEVEL_SIZE):
+    """
+    Factors 2, 4, 8... of the levels of a dataset, the last level is the first one not larger than the minimum size.
+    """
+    factors = []
+    factor = 2
+    while max(shape) > minimum_size*factor//2:
+        factors.append(factor)
+        factor *= 2
+
+    return factors
+
+
+def get_level_shape(shape, factor):
+    return tuple(-(-size // factor) for size in shape)
+
+
+def select_factor(shape, factors, size=DEFAULT_PREVIEW_SIZE):
+    """
+    Largest factor of the levels with at least ``size`` pixels along the largest side, 1 for the full resolution.
+    """
+    selected_factor = 1
+    for factor in factors:
+        if max(get_level_shape(shape, factor)) >= size:
+            selected_factor = max(selected_factor, factor)
+
+    return selected_factor
+
+
+def downsample(data):
+    """
+    Mean of the finite values of each block of 2x2 pixels as float32, the blocks without finite value are NaN.
+
+    The last row and column of a side with an odd number of pixels are the mean of the pixels available. The
+    axes after the first two, like the channels of a rgb image, are kept.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    rows, columns = data.shape[:2]
+    other_shape = data.shape[2:]
+    level_rows, level_columns = get_level_shape((rows, columns), 2)
+
+    if (rows, columns) != (2*level_rows, 2*level_columns):
+        padded_data = np.full((2*level_rows, 2*level_columns) + other_shape, np.nan, dtype=np.float32)
+        padded_data[:rows, :columns] = data
+        data = padded_data
+
+    blocks = data.reshape((level_rows, 2, level_columns, 2) + other_shape)
+    is_finite = np.isfinite(blocks)
+    if np.all(is_finite):
+        return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+    sums = np.where(is_finite, blocks, 0.0).sum(axis=(1, 3), dtype=np.float32)
+    counts = is_finite.sum(axis=(1, 3), dtype=np.float32)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums/counts
+
+
+def compute_levels(read_rows, shape, factors, write_rows, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Compute all the levels in one pass over the rows of the dataset.
+
+    The rows are read by blocks of a multiple of the largest factor, each block is reduced by 2 until the largest
+    factor, so the memory used is bounded by the block size.
+
+    :param read_rows: function returning the data of the rows ``start:stop``
+    :param shape: shape ``(rows, columns)`` of the dataset
+    :param factors: factors of the levels, 2, 4, 8...
+    :param write_rows: function called with the index of the level, the first row and the rows of the level
+    :param block_size: maximum number of pixels read at once
+
+    """
+    number_rows, number_columns = shape
+    if len(factors) == 0:
+        return
+
+    maximum_factor = factors[-1]
+    block_rows = maximum_factor*max(1, block_size // max(1, maximum_factor*number_columns))
+
+    for start in range(0, number_rows, block_rows):
+        data = read_rows(start, min(start + block_rows, number_rows))
+
+        for level_index, factor in enumerate(factors):
+            data = downsample(data)
+            write_rows(level_index, start // factor, data)
+
+
+def compute_preview(data, size=DEFAULT_PREVIEW_SIZE):
+    """
+    Level of the data selected for the size, computed in memory, and its factor.
+    """
+    shape = np.shape(data)[:2]
+    factor = select_factor(shape, get_level_factors(shape), size)
+
+    return compute_level(data, factor), factor
+
+
+def compute_level(data, factor):
+    """
+    Level of the data for the factor, computed in memory by reducing the data by 2 until the factor.
+    """
+    level_factor = 1
+    while level_factor < factor:
+        data = downsample(data)
+        level_factor *= 2
+
+    return data
+
+
+def get_pyramid_group(h5file, data_type, label):
+    """
+    Group of the levels of a dataset, None if the pyramid does not exist.
+    """
+    name = "/%s/%s/%s" % (GROUP_PYRAMID, data_type, label)
+    if name not in h5file:
+        return None
+
+    return h5file[name]
+
+
+def is_pyramid_up_to_date(pyramid_group, source):
+    return pyramid_group is not None and source is not None and pyramid_group.attrs.get(ATTRIBUTE_SOURCE) == source
+
+
+def get_factors(pyramid_group):
+    return sorted(int(pyramid_group[name].attrs[ATTRIBUTE_FACTOR]) for name in pyramid_group)
+
+
+def read_level(pyramid_group, factor):
+    return pyramid_group[str(factor)][...]
+
+
+def remove_pyramid(h5file, data_type, label):
+    pyramid_group = get_pyramid_group(h5file, data_type, label)
+    if pyramid_group is not None:
+        del h5file[pyramid_group.name]
+
+
+def remove_dependent_pyramids(h5file, dataset_name):
+    """
+    Remove the pyramids of the phase maps computed from the dataset, their inputs are saved with the pyramid.
+    """
+    name = "/%s/%s" % (GROUP_PYRAMID, GROUP_PHASE_MAP)
+    if name not in h5file:
+        return
+
+    phase_map_group = h5file[name]
+    for label in list(phase_map_group):
+        if dataset_name in list(phase_map_group[label].attrs.get(ATTRIBUTE_INPUTS, [])):
+            del phase_map_group[label]
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.recipe
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Recipe of the processing of a sample: ingest, derived data, phase maps and export.
+
+A recipe is a JSON file::
+
+    {
+        "ingest": {"data_type": "counts", "pattern": "*.txt"},
+        "derived": {"fratio": {"input_data_type": "counts", "filter_size": 3}},
+        "phase_maps": [{"name": "Phases", "dilation_erosion": true,
+                        "phases": [{"label": "Fe rich", "color": "red",
+                                    "phases": [{"name": "Fe rich",
+                                                "conditions": [{"data_type": "f-ratio", "label": "Fe",
+                                                                "minimum": 0.5, "maximum": null}]}]}]}],
+        "export": {"kinds": ["histogram", "map", "phase map", "phases fraction"]}
+    }
+
+or the same content in a TOML file, with the extension ``.toml``, where a missing maximum is no maximum. The group
+of phases is the union of its phases if ``union`` is true, the default, else their intersection. The dilation and
+erosion is true for the default pipeline or the operations of a
+:py:class:`~xrayphasemap.morphology.MorphologyPipeline`, ``{"operations": [["closing", 1], ["opening", 2]]}``, with an
+optional ``structure``.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import os.path
+import json
+import hashlib
+import numbers
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    tomllib = None
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.phase import Phase
+from xrayphasemap.morphology import MorphologyPipeline, DEFAULT_MORPHOLOGY_PIPELINE
+
+# Globals and constants variables.
+SECTION_INGEST = "ingest"
+SECTION_DERIVED = "derived"
+SECTION_PHASE_MAPS = "phase_maps"
+SECTION_EXPORT = "export"
+
+RECIPE_SECTIONS = (SECTION_INGEST, SECTION_DERIVED, SECTION_PHASE_MAPS, SECTION_EXPORT)
+
+DERIVED_FRATIO = "fratio"
+DERIVED_TOTAL_PEAK_INTENSITY = "total_peak_intensity"
+DERIVED_ELEMENT_RATIO = "element_ratio"
+
+DERIVED_DATA = (DERIVED_FRATIO, DERIVED_TOTAL_PEAK_INTENSITY, DERIVED_ELEMENT_RATIO)
+
+DEFAULT_INGEST = {"data_type": "counts", "pattern": "*.txt"}
+DEFAULT_EXPORT = {"kinds": [], "data_types": None, "num_bins": 50, "color_map": "YlOrRd"}
+
+TOML_EXTENSION = ".toml"
+
+
+def load_recipe(file_path):
+    """
+    Read and validate a recipe file, a TOML file if its extension is ``.toml``, else a JSON file.
+
+    :raises ValueError: if the recipe is not valid
+    """
+    if os.path.splitext(file_path)[1].lower() == TOML_EXTENSION:
+        if tomllib is None:  # pragma: no cover
+            raise ValueError("Reading the TOML recipe %s requires Python 3.11 or tomllib" % file_path)
+        with open(file_path, 'rb') as recipe_file:
+            recipe = tomllib.load(recipe_file)
+    else:
+        with open(file_path, 'r') as recipe_file:
+            recipe = json.load(recipe_file)
+
+    validate_recipe(recipe)
+
+    return recipe
+
+
+def validate_recipe(recipe):
+    """
+    Check the sections, the derived data and the phase map names of a recipe.
+
+    :raises ValueError: if the recipe is not valid
+    """
+    for section in recipe:
+        if section not in RECIPE_SECTIONS:
+            raise ValueError("Unknown recipe section %s" % section)
+
+    for name in recipe.get(SECTION_DERIVED, {}):
+        if name not in DERIVED_DATA:
+            raise ValueError("Unknown derived data %s" % name)
+
+    for phase_map_data in recipe.get(SECTION_PHASE_MAPS, []):
+        if "name" not in phase_map_data:
+            raise ValueError("Phase map without name")
+
+        get_morphology(phase_map_data.get("dilation_erosion", False))
+
+        for group_data in phase_map_data.get("phases", []):
+            if "color" not in group_data or len(group_data.get("phases", [])) == 0:
+                raise ValueError("Group of phases without color or phase in phase map %s" % phase_map_data["name"])
+
+            for phase_data in group_data["phases"]:
+                for condition in phase_data.get("conditions", []):
+                    if "data_type" not in condition or "label" not in condition:
+                        raise ValueError("Condition without data type or label in phase %s" % phase_data.get("name"))
+
+
+def save_recipe(recipe, file_path):
+    """
+    Write a recipe as a JSON file.
+    """
+    validate_recipe(recipe)
+
+    with open(file_path, 'w') as recipe_file:
+        json.dump(recipe, recipe_file, indent=2)
+
+
+def get_recipe_hash(recipe):
+    """
+    Hash of the content of a recipe, to know if a sample was processed with the same recipe.
+    """
+    text = json.dumps(recipe, sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def get_ingest(recipe):
+    ingest = dict(DEFAULT_INGEST)
+    ingest.update(recipe.get(SECTION_INGEST, {}))
+    return ingest
+
+
+def get_export(recipe):
+    export = dict(DEFAULT_EXPORT)
+    export.update(recipe.get(SECTION_EXPORT, {}))
+    return export
+
+
+def compute_derived_data(recipe, phase_analysis):
+    """
+    Compute the derived data of the recipe, in the order of :py:const:`DERIVED_DATA`.
+    """
+    derived = recipe.get(SECTION_DERIVED, {})
+
+    if DERIVED_FRATIO in derived:
+        phase_analysis.compute_fratio(**derived[DERIVED_FRATIO])
+    if DERIVED_TOTAL_PEAK_INTENSITY in derived:
+        phase_analysis.compute_total_peak_intensity(**derived[DERIVED_TOTAL_PEAK_INTENSITY])
+    if DERIVED_ELEMENT_RATIO in derived:
+        phase_analysis.compute_element_ratio(**derived[DERIVED_ELEMENT_RATIO])
+
+
+def create_phase_maps(recipe, phase_analysis, max_workers=None):
+    """
+    Create the :py:class:`~xrayphasemap.map.PhaseMap` of the recipe.
+    """
+    return [create_phase_map(phase_map_data, phase_analysis, max_workers)
+            for phase_map_data in recipe.get(SECTION_PHASE_MAPS, [])]
+
+
+def compile_phase_maps(recipe):
+    """
+    Compile the phase maps of the recipe into :py:class:`~xrayphasemap.plan.EvaluationPlan`.
+    """
+    return [phase_map.get_evaluation_plan() for phase_map in create_phase_maps(recipe, None)]
+
+
+def create_phase_map(phase_map_data, phase_analysis, max_workers=None):
+    from xrayphasemap.map import PhaseMap
+
+    is_dilation_erosion = get_morphology(phase_map_data.get("dilation_erosion", False))
+    phase_map = PhaseMap(phase_map_data["name"], phase_analysis, is_dilation_erosion, max_workers=max_workers)
+
+    for group_data in phase_map_data.get("phases", []):
+        phases = [create_phase(phase_data) for phase_data in group_data["phases"]]
+        label = group_data.get("label", phases[0].name)
+        phase_map.add_phases(label, phases, group_data["color"], group_data.get("union", True))
+
+    return phase_map
+
+
+def create_phase(phase_data):
+    phase = Phase(phase_data["name"])
+    for condition in phase_data.get("conditions", []):
+        phase.add_condition(condition["data_type"], condition["label"], condition.get("minimum", 0.0),
+                            condition.get("maximum"))
+
+    return phase
+
+
+def get_morphology(dilation_erosion):
+    """
+    Dilation and erosion option of a phase map, a bool or a :py:class:`~xrayphasemap.morphology.MorphologyPipeline`.
+    """
+    if isinstance(dilation_erosion, dict):
+        operations = [tuple(operation) for operation in dilation_erosion["operations"]]
+        pipeline = MorphologyPipeline(operations, dilation_erosion.get("structure"))
+        if pipeline == DEFAULT_MORPHOLOGY_PIPELINE:
+            return True
+        return pipeline
+
+    return bool(dilation_erosion)
+
+
+def phase_map_to_data(phase_map):
+    """
+    Phase map in the format of the recipe phase maps.
+    """
+    phase_map_data = {"name": phase_map.phase_map_name,
+                      "dilation_erosion": morphology_to_data(phase_map.is_dilation_erosion),
+                      "phases": []}
+
+    for label, (phases, color_name, union) in phase_map.phases.items():
+        try:
+            phases[0]
+        except TypeError:
+            phases = [phases]
+
+        group_data = {"label": label, "color": color_name, "union": bool(union),
+                      "phases": [phase_to_data(phase) for phase in phases]}
+        phase_map_data["phases"].append(group_data)
+
+    return phase_map_data
+
+
+def phase_to_data(phase):
+    conditions = []
+    for (data_type, label), (minimum, maximum) in phase.conditions.items():
+        conditions.append({"data_type": data_type, "label": label,
+                           "minimum": _to_number(minimum), "maximum": _to_number(maximum)})
+
+    return {"name": phase.name, "conditions": conditions}
+
+
+def morphology_to_data(is_dilation_erosion):
+    if not isinstance(is_dilation_erosion, MorphologyPipeline):
+        return bool(is_dilation_erosion)
+    elif is_dilation_erosion == DEFAULT_MORPHOLOGY_PIPELINE:
+        return True
+
+    return {"operations": [list(operation) for operation in is_dilation_erosion.operations],
+            "structure": is_dilation_erosion.structure.astype(int).tolist()}
+
+
+def _to_number(value):
+    if value is None:
+        return None
+    elif isinstance(value, numbers.Integral):
+        return int(value)
+
+    return float(value)
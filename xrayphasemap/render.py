@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.render
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Render the maps as color images with a lookup table, without creating a matplotlib figure.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import os.path
+
+# Third party modules.
+import numpy as np
+from PIL import Image
+
+# Local modules.
+
+# Project modules
+
+# Globals and constants variables.
+COLOR_MAP_NUMBER_COLORS = 20
+
+COLOR_MAPS_DATA = {'cmBlue': {'red': ((0.0, 0.0, 0.0),
+                                      (1.0, 0.0, 0.0)),
+                              'green': ((0.0, 0.0, 0.0),
+                                        (1.0, 0.0, 0.0)),
+                              'blue': ((0.0, 0.0, 0.0),
+                                       (1.0, 1.0, 1.0))},
+                   'cmGreen': {'red': ((0.0, 0.0, 0.0),
+                                       (1.0, 0.0, 0.0)),
+                               'green': ((0.0, 0.0, 0.0),
+                                         (1.0, 1.0, 1.0)),
+                               'blue': ((0.0, 0.0, 0.0),
+                                        (1.0, 0.0, 0.0))},
+                   'cmRed': {'red': ((0.0, 0.0, 0.0),
+                                     (1.0, 1.0, 1.0)),
+                             'green': ((0.0, 0.0, 0.0),
+                                       (1.0, 0.0, 0.0)),
+                             'blue': ((0.0, 0.0, 0.0),
+                                      (1.0, 0.0, 0.0))},
+                   'cmPink': {'red': ((0.0, 0.0, 0.0),
+                                      (1.0, 1.0, 1.0)),
+                              'green': ((0.0, 0.0, 0.0),
+                                        (1.0, 0.0, 1.0)),
+                              'blue': ((0.0, 0.0, 0.0),
+                                       (1.0, 1.0, 1.0))}}
+
+BAD_COLOR = (0, 0, 0, 0)
+
+# Fast zlib level, the maps are large and the images are saved often.
+PNG_COMPRESS_LEVEL = 1
+
+_lookup_tables = {}
+
+
+def get_lookup_table(color_map_name):
+    """
+    RGBA lookup table of a color map as unsigned bytes, one row for each color of the color map.
+
+    The color maps of :py:const:`COLOR_MAPS_DATA` are computed directly, the other names are the matplotlib color
+    maps, 256 colors for most of them. The tables are computed once.
+    """
+    if color_map_name not in _lookup_tables:
+        if color_map_name in COLOR_MAPS_DATA:
+            lookup_table = _create_lookup_table(COLOR_MAPS_DATA[color_map_name], COLOR_MAP_NUMBER_COLORS)
+        else:
+            import matplotlib
+
+            try:
+                color_map = matplotlib.colormaps[color_map_name]
+            except AttributeError:
+                import matplotlib.cm
+                color_map = matplotlib.cm.get_cmap(color_map_name)
+            lookup_table = color_map(np.arange(color_map.N), bytes=True)
+
+        lookup_table = np.ascontiguousarray(lookup_table, dtype=np.uint8)
+        lookup_table.flags.writeable = False
+        _lookup_tables[color_map_name] = lookup_table
+
+    return _lookup_tables[color_map_name]
+
+
+def render_map(data, color_map_name, vmin=None, vmax=None):
+    """
+    Color image of the data, the same pixels as :py:func:`matplotlib.pyplot.imsave`.
+
+    The data is normalized between vmin and vmax, the minimum and maximum of the data by default, and each pixel is
+    the color of the lookup table at the normalized value. The values outside the range have the first or last
+    color, the NaN are transparent.
+
+    :param data: 2D array
+    :param color_map_name: name of the color map, see :py:func:`get_lookup_table`
+    :return: RGBA array of unsigned bytes ``(width, height, 4)``
+
+    """
+    lookup_table = get_lookup_table(color_map_name)
+    indexes, is_bad = get_color_indexes(data, len(lookup_table), vmin, vmax)
+
+    # One 32 bits word for each RGBA color, a single gather instead of one for each channel.
+    rgba = lookup_table.view(np.uint32).ravel()[indexes].view(np.uint8).reshape(indexes.shape + (4,))
+
+    if np.any(is_bad):
+        rgba[is_bad] = BAD_COLOR
+
+    return rgba
+
+
+def get_color_indexes(data, number_colors, vmin=None, vmax=None):
+    """
+    Index in the lookup table of each pixel and the mask of the NaN pixels, see :py:func:`render_map`.
+    """
+    data = np.asarray(data)
+    # A copy normalized in place.
+    data = data.astype(np.result_type(data.dtype, np.float32))
+
+    if vmin is None:
+        vmin = np.nanmin(data)
+    if vmax is None:
+        vmax = np.nanmax(data)
+    vmin = data.dtype.type(vmin)
+    vmax = data.dtype.type(vmax)
+
+    is_bad = np.isnan(data)
+
+    if number_colors <= 256:
+        index_type = np.uint8
+    else:
+        index_type = np.intp
+
+    if vmin == vmax:
+        indexes = np.zeros(data.shape, dtype=index_type)
+    else:
+        # Same operations and precision as the matplotlib normalization and color map.
+        values = data
+        values -= vmin
+        values /= vmax - vmin
+        values *= number_colors
+        values[values == number_colors] = number_colors - 1
+        values[is_bad] = 0
+        np.clip(values, 0, number_colors - 1, out=values)
+        indexes = values.astype(index_type)
+
+    return indexes, is_bad
+
+
+def save_map_image(file_path, data, color_map_name, vmin=None, vmax=None):
+    """
+    Save the color image of the data, the format is given by the extension of the file path, like png or tif.
+
+    The image is saved with a palette, the lookup table, and one byte for each pixel if the color map has at most
+    256 opaque colors and the data has no NaN, otherwise as a RGBA image. The colors are the same.
+    """
+    lookup_table = get_lookup_table(color_map_name)
+    indexes, is_bad = get_color_indexes(data, len(lookup_table), vmin, vmax)
+
+    if indexes.dtype == np.uint8 and np.all(lookup_table[:, 3] == 255) and not np.any(is_bad):
+        height, width = indexes.shape
+        image = Image.frombytes("P", (width, height), np.ascontiguousarray(indexes).tobytes())
+        image.putpalette(lookup_table[:, :3].ravel().tolist())
+    else:
+        image = Image.fromarray(render_map(data, color_map_name, vmin, vmax))
+
+    if os.path.splitext(file_path)[1].lower() == ".png":
+        image.save(file_path, compress_level=PNG_COMPRESS_LEVEL)
+    else:
+        image.save(file_path)
+
+
+def _create_lookup_table(color_data, number_colors):
+    """
+    RGBA lookup table of a linear segmented color map, as :py:class:`matplotlib.colors.LinearSegmentedColormap`.
+    """
+    lookup_table = np.ones((number_colors, 4))
+
+    for channel, name in enumerate(['red', 'green', 'blue']):
+        segments = np.array(color_data[name], dtype=float)
+        x = segments[:, 0]*(number_colors - 1)
+        y0 = segments[:, 1]
+        y1 = segments[:, 2]
+
+        x_indexes = (number_colors - 1)*np.linspace(0, 1, number_colors)
+        indexes = np.searchsorted(x, x_indexes)[1:-1]
+        distance = (x_indexes[1:-1] - x[indexes - 1])/(x[indexes] - x[indexes - 1])
+        values = np.concatenate([[y1[0]], distance*(y0[indexes] - y1[indexes - 1]) + y1[indexes - 1], [y0[-1]]])
+
+        lookup_table[:, channel] = np.clip(values, 0.0, 1.0)
+
+    return (lookup_table*255).astype(np.uint8)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.scatter
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Scatter diagrams of pairs of datasets as 2D histograms accumulated by blocks of rows.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.histogram import get_bin_edges
+
+# Globals and constants variables.
+
+
+class ScatterHistogram(object):
+    def __init__(self, counts, x_edges, y_edges):
+        """
+        Number of pixels in each bin of the values of two datasets, the scatter diagram as a density image.
+
+        :param counts: array ``(number x bins, number y bins)`` of the number of pixels
+        :param x_edges: edges of the bins of the first dataset
+        :param y_edges: edges of the bins of the second dataset
+
+        """
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.x_edges = np.asarray(x_edges, dtype=np.float64)
+        self.y_edges = np.asarray(y_edges, dtype=np.float64)
+
+    @property
+    def extent(self):
+        return self.x_edges[0], self.x_edges[-1], self.y_edges[0], self.y_edges[-1]
+
+    def transpose(self):
+        """
+        Scatter histogram with the two datasets swapped.
+        """
+        return ScatterHistogram(self.counts.T, self.y_edges, self.x_edges)
+
+    def get_image(self, log_density=False):
+        """
+        Density image to display with ``origin='lower'`` and :py:attr:`extent`, the y values along the rows.
+
+        With the log density, the image is the decimal logarithm of the counts and the empty bins are NaN.
+        """
+        image = self.counts.T.astype(np.float64)
+
+        if log_density:
+            is_empty = image == 0
+            image[is_empty] = np.nan
+            np.log10(image, out=image, where=~is_empty)
+
+        return image
+
+
+def get_range(minimum, maximum):
+    """
+    Range ``(minimum, maximum)`` of the bins of a dataset, as :py:func:`~xrayphasemap.histogram.get_bin_edges`.
+    """
+    bin_edges = get_bin_edges(float(minimum), float(maximum), 1)
+    return bin_edges[0], bin_edges[-1]
+
+
+def compute_scatter_histograms(read_rows, number_rows, pairs, ranges, number_bins=50, block_rows=None):
+    """
+    Compute the scatter histograms of pairs of datasets read by blocks of rows in one pass.
+
+    The bin of each value is computed once for each block and each dataset, as :py:func:`numpy.histogram` for
+    bins of the same width, and the bins of each pair are counted with :py:func:`numpy.bincount`. The pixels with
+    a value outside the range or not finite are not counted, the maximum of the range is in the last bin.
+
+    :param read_rows: function returning the list of the data of each dataset for the rows ``start:stop``
+    :param number_rows: number of rows of the datasets
+    :param pairs: list of pairs of indexes of the datasets
+    :param ranges: range ``(minimum, maximum)`` of each dataset
+    :param number_bins: number of bins of each dataset
+    :param block_rows: number of rows read at once, all the rows if None
+    :return: list of :py:class:`ScatterHistogram`, in the order of the pairs
+
+    """
+    if block_rows is None:
+        block_rows = number_rows
+    block_rows = max(1, block_rows)
+
+    bin_edges = [np.linspace(minimum, maximum, number_bins + 1) for minimum, maximum in ranges]
+    used_indexes = sorted(set(index for pair in pairs for index in pair))
+
+    flat_counts = [np.zeros(number_bins*number_bins, dtype=np.int64) for _pair in pairs]
+    for start in range(0, number_rows, block_rows):
+        data = read_rows(start, min(start + block_rows, number_rows))
+
+        bin_indexes = {}
+        for index in used_indexes:
+            bin_indexes[index] = get_bin_indexes(data[index], bin_edges[index])
+
+        for pair_index, (index_x, index_y) in enumerate(pairs):
+            indexes_x, is_inside_x = bin_indexes[index_x]
+            indexes_y, is_inside_y = bin_indexes[index_y]
+            is_inside = is_inside_x & is_inside_y
+
+            flat_indexes = indexes_x[is_inside]*number_bins
+            flat_indexes += indexes_y[is_inside]
+            flat_counts[pair_index] += np.bincount(flat_indexes, minlength=number_bins*number_bins)
+
+    scatter_histograms = []
+    for (index_x, index_y), counts in zip(pairs, flat_counts):
+        scatter_histograms.append(ScatterHistogram(counts.reshape(number_bins, number_bins),
+                                                   bin_edges[index_x], bin_edges[index_y]))
+
+    return scatter_histograms
+
+
+def get_bin_indexes(values, bin_edges):
+    """
+    Bin of each value for bins of the same width and the mask of the values inside the bins.
+    """
+    values = np.ravel(values)
+    number_bins = len(bin_edges) - 1
+    minimum = bin_edges[0]
+    maximum = bin_edges[-1]
+
+    is_inside = (values >= minimum) & (values <= maximum)
+
+    indexes = np.zeros(values.shape, dtype=np.intp)
+    inside_values = values[is_inside]
+    inside_indexes = ((inside_values - minimum)*(number_bins/(maximum - minimum))).astype(np.intp)
+    np.clip(inside_indexes, 0, number_bins - 1, out=inside_indexes)
+
+    # Same corrections as numpy.histogram for the values close to an edge.
+    inside_indexes[inside_values < bin_edges[inside_indexes]] -= 1
+    is_increment = (inside_values >= bin_edges[inside_indexes + 1]) & (inside_indexes != number_bins - 1)
+    inside_indexes[is_increment] += 1
+
+    indexes[is_inside] = inside_indexes
+
+    return indexes, is_inside
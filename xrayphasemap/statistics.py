@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.statistics
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Statistics of the phases of a label raster: number of pixels, fraction, area and composition of each phase.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import csv
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+
+# Globals and constants variables.
+HEADER_ROW = ["Phase", "Pixel fraction", "Number pixels", "Area (um2)", "Data type", "Label", "Number values",
+              "Mean", "Standard deviation"]
+
+
+class PhaseStatistics(object):
+    def __init__(self, phase_labels, channels, counts, value_counts, means, variances, number_pixels,
+                 pixel_size=None):
+        """
+        Number of pixels and composition of each phase.
+
+        :param phase_labels: label of each phase
+        :param channels: ``(data_type, label)`` of each channel
+        :param counts: number of pixels of each phase
+        :param value_counts: array ``(phases, channels)`` of the number of finite values of each channel in each phase
+        :param means: array ``(phases, channels)`` of the mean of the finite values, NaN without value
+        :param variances: array ``(phases, channels)`` of the population variance of the finite values
+        :param number_pixels: number of pixels of the map
+        :param pixel_size: size of a pixel in micrometer, the areas are unknown if None
+
+        """
+        self.phase_labels = list(phase_labels)
+        self.channels = list(channels)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.value_counts = np.asarray(value_counts, dtype=np.int64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.variances = np.asarray(variances, dtype=np.float64)
+        self.number_pixels = number_pixels
+        self.pixel_size = pixel_size
+
+    @property
+    def fractions(self):
+        return self.counts/self.number_pixels
+
+    @property
+    def areas(self):
+        """
+        Area of each phase in square micrometer, None if the pixel size is unknown.
+        """
+        if self.pixel_size is None:
+            return None
+        return self.counts*self.pixel_size**2
+
+    @property
+    def standard_deviations(self):
+        return np.sqrt(self.variances)
+
+    def get_rows(self):
+        """
+        Rows of the table of :py:const:`HEADER_ROW`, one row for each phase and channel.
+        """
+        areas = self.areas
+        standard_deviations = self.standard_deviations
+
+        rows = []
+        for phase_index, phase_label in enumerate(self.phase_labels):
+            area = areas[phase_index] if areas is not None else None
+            phase_row = [phase_label, self.fractions[phase_index], self.counts[phase_index], area]
+
+            if len(self.channels) == 0:
+                rows.append(phase_row + [None, None, None, None, None])
+
+            for channel_index, (data_type, label) in enumerate(self.channels):
+                rows.append(phase_row + [data_type, label, self.value_counts[phase_index, channel_index],
+                                         self.means[phase_index, channel_index],
+                                         standard_deviations[phase_index, channel_index]])
+
+        return rows
+
+    def save_csv(self, file_path):
+        with open(file_path, 'w', newline='\n') as output_file:
+            writer = csv.writer(output_file)
+
+            writer.writerow(HEADER_ROW)
+            for row in self.get_rows():
+                writer.writerow(["" if value is None else value for value in row])
+
+        return file_path
+
+
+def compute_statistics(labels, combinations, phase_labels, cube, channels, pixel_size=None):
+    """
+    Compute the statistics of the phases of a label raster with :py:func:`numpy.bincount`.
+
+    The number of values, sum and sum of the squared deviations of each channel are accumulated for each
+    combination of phases in two passes over the channel, the statistics of a phase are the combined statistics
+    of the combinations with the phase. The cost is proportional to the number of channels times the number of
+    pixels. The values not finite are not included in the mean and standard deviation.
+
+    :param labels: integer raster of the index of the combination of each pixel
+    :param combinations: tuple of the indexes of the phases of each combination
+    :param phase_labels: label of each phase
+    :param cube: data of each channel, a list of arrays of the shape of the labels
+    :param channels: ``(data_type, label)`` of each channel
+    :param pixel_size: size of a pixel in micrometer
+    :return: :py:class:`PhaseStatistics`
+
+    """
+    # The labels are converted once, numpy.bincount would convert them for each call.
+    flat_labels = np.ravel(labels).astype(np.intp, copy=False)
+    number_combinations = len(combinations)
+
+    membership = np.zeros((len(phase_labels), number_combinations))
+    for combination_index, combination in enumerate(combinations):
+        membership[list(combination), combination_index] = 1.0
+
+    combination_counts = np.bincount(flat_labels, minlength=number_combinations)
+    counts = np.rint(membership @ combination_counts).astype(np.int64)
+
+    shape = (len(phase_labels), len(channels))
+    value_counts = np.zeros(shape, dtype=np.int64)
+    means = np.full(shape, np.nan)
+    variances = np.full(shape, np.nan)
+
+    for channel_index, data in enumerate(cube):
+        if np.shape(data) != np.shape(labels):
+            raise ValueError("Expected the shape %s for channel %s, got %s" %
+                             (np.shape(labels), channels[channel_index], np.shape(data)))
+        values = np.ravel(data).astype(np.float64)
+
+        is_finite = np.isfinite(values)
+        is_all_finite = bool(np.all(is_finite))
+        if is_all_finite:
+            combination_value_counts = combination_counts
+        else:
+            values[~is_finite] = 0.0
+            combination_value_counts = np.bincount(flat_labels, weights=is_finite, minlength=number_combinations)
+
+        combination_sums = np.bincount(flat_labels, weights=values, minlength=number_combinations)
+        combination_means = combination_sums/np.maximum(combination_value_counts, 1)
+
+        deviations = values - combination_means[flat_labels]
+        deviations *= deviations
+        if not is_all_finite:
+            deviations[~is_finite] = 0.0
+        combination_squares = np.bincount(flat_labels, weights=deviations, minlength=number_combinations)
+
+        phase_value_counts = membership @ combination_value_counts
+        phase_means = (membership @ combination_sums)/np.maximum(phase_value_counts, 1)
+        # Squared deviations of each combination around the mean of the phase, Chan et al. parallel variance.
+        offsets = (combination_means[np.newaxis, :] - phase_means[:, np.newaxis])**2
+        phase_squares = membership @ combination_squares + (membership*offsets) @ combination_value_counts
+
+        has_values = phase_value_counts > 0
+        value_counts[:, channel_index] = np.rint(phase_value_counts).astype(np.int64)
+        means[has_values, channel_index] = phase_means[has_values]
+        variances[has_values, channel_index] = phase_squares[has_values]/phase_value_counts[has_values]
+
+    return PhaseStatistics(phase_labels, channels, counts, value_counts, means, variances, flat_labels.size,
+                           pixel_size)
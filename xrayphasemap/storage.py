@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.storage
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Layout of the datasets saved in the project file.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import os
+import logging
+import tempfile
+
+# Third party modules.
+import h5py
+import numpy as np
+
+# Local modules.
+
+# Project modules
+
+# Globals and constants variables.
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_LZF = "lzf"
+
+DEFAULT_CHUNK_SIZE = 256
+
+
+class StoragePolicy(object):
+    def __init__(self, chunks=None, compression=None, compression_level=None, shuffle=False,
+                 is_integer_counts=False):
+        """
+        Options used to create all the datasets of a project file.
+
+        The default policy is the same as h5py defaults: contiguous float32 datasets without compression.
+
+        :param chunks: shape of the chunks, True for ``(DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_SIZE)``, None for contiguous datasets
+        :param compression: :py:const:`COMPRESSION_GZIP`, :py:const:`COMPRESSION_LZF` or None
+        :param compression_level: level of the gzip compression, 0 to 9
+        :param shuffle: apply the shuffle filter before the compression
+        :param is_integer_counts: save the count maps without fraction as unsigned integers
+
+        """
+        if compression not in (None, COMPRESSION_GZIP, COMPRESSION_LZF):
+            raise ValueError("Unknown compression %s" % compression)
+
+        if chunks is True:
+            chunks = (DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_SIZE)
+
+        self.chunks = chunks
+        self.compression = compression
+        self.compression_level = compression_level
+        self.shuffle = shuffle
+        self.is_integer_counts = is_integer_counts
+
+    @property
+    def is_chunked(self):
+        return self.chunks is not None or self.compression is not None or self.shuffle
+
+    def get_dataset_options(self, shape, chunks=None):
+        """
+        Keyword arguments of :py:meth:`h5py.Group.create_dataset` for a dataset of this shape.
+
+        :param shape: shape of the dataset
+        :param chunks: shape of the chunks if the policy does not define one, like the tile size
+
+        """
+        options = {}
+
+        if self.chunks is not None:
+            chunks = self.chunks
+        if chunks is not None:
+            # The axes after the chunks, like the phases of a level of a phase map, are not split.
+            chunks = tuple(chunks) + tuple(shape[len(chunks):])
+            options["chunks"] = tuple(max(1, min(chunk, size)) for chunk, size in zip(chunks, shape))
+        elif self.is_chunked:
+            options["chunks"] = True
+
+        if self.compression is not None:
+            options["compression"] = self.compression
+            if self.compression == COMPRESSION_GZIP and self.compression_level is not None:
+                options["compression_opts"] = self.compression_level
+        if self.shuffle:
+            options["shuffle"] = True
+
+        return options
+
+    def get_storage_dtype(self, data):
+        """
+        Type used to save the data, float32 or the smallest unsigned integer type holding the counts without loss.
+        """
+        if self.is_integer_counts and data.size > 0 and _is_integer_counts(data):
+            maximum = np.max(data)
+            if maximum <= np.iinfo(np.uint16).max:
+                return np.uint16
+            elif maximum <= np.iinfo(np.uint32).max:
+                return np.uint32
+
+        return np.float32
+
+
+def create_dataset(group, name, shape, dtype, storage_policy=None, chunks=None):
+    if storage_policy is None:
+        storage_policy = DEFAULT_STORAGE_POLICY
+
+    options = storage_policy.get_dataset_options(shape, chunks)
+    return group.create_dataset(name, shape, dtype=dtype, **options)
+
+
+def read_dataset(dataset, selection=Ellipsis):
+    """
+    Read the dataset, or a selection like a tile, the count maps saved as unsigned integers are read as float32.
+    """
+    data = dataset[selection]
+
+    if data.dtype.kind == 'u':
+        data = data.astype(np.float32)
+
+    return data
+
+
+def migrate_project_file(input_filepath, storage_policy, output_filepath=None):
+    """
+    Rewrite all the datasets of a project file with a new storage policy.
+
+    :param input_filepath: path of the project file to migrate
+    :param storage_policy: the new :py:class:`StoragePolicy`
+    :param output_filepath: path of the new project file, the input file is replaced if None
+
+    """
+    if output_filepath is None:
+        file_descriptor, temporary_filepath = tempfile.mkstemp(suffix=".hdf5",
+                                                               dir=os.path.dirname(os.path.abspath(input_filepath)))
+        os.close(file_descriptor)
+    else:
+        temporary_filepath = output_filepath
+
+    with h5py.File(input_filepath, 'r') as input_file, h5py.File(temporary_filepath, 'w') as output_file:
+        _copy_attributes(input_file, output_file)
+        input_file.visititems(lambda name, item: _migrate_item(name, item, output_file, storage_policy))
+
+    if output_filepath is None:
+        os.replace(temporary_filepath, input_filepath)
+
+
+def _migrate_item(name, item, output_file, storage_policy):
+    if isinstance(item, h5py.Group):
+        group = output_file.require_group(name)
+        _copy_attributes(item, group)
+    elif isinstance(item, h5py.Dataset):
+        data = item[...]
+        if data.dtype == np.float32:
+            dtype = storage_policy.get_storage_dtype(data)
+        else:
+            dtype = data.dtype
+
+        if data.ndim > 0:
+            dataset = create_dataset(output_file, name, data.shape, dtype, storage_policy, item.chunks)
+            dataset[...] = data
+        else:
+            dataset = output_file.create_dataset(name, data=data)
+        _copy_attributes(item, dataset)
+        logging.debug("Migrated %s as %s", name, dtype)
+
+
+def _copy_attributes(source, destination):
+    for key, value in source.attrs.items():
+        destination.attrs[key] = value
+
+
+def _is_integer_counts(data):
+    if data.dtype.kind == 'u':
+        return True
+    elif data.dtype.kind == 'i':
+        return np.min(data) >= 0
+    elif data.dtype.kind == 'f':
+        return bool(np.all(np.isfinite(data)) and np.min(data) >= 0 and np.all(np.mod(data, 1) == 0))
+
+    return False
+
+
+DEFAULT_STORAGE_POLICY = StoragePolicy()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.sweep
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Fraction of a phase as a function of the threshold of one condition and incremental evaluation of a phase when a
+threshold moves, from sorted indexes of the channels.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.classifier import PhaseClassifier, _get_threshold
+from xrayphasemap.phase import Phase
+
+# Globals and constants variables.
+
+
+class ChannelIndex(object):
+    def __init__(self, data, number_pixels=None):
+        """
+        Sorted distinct values of a channel and the cumulative number of pixels, the NaN are never counted.
+
+        The number of pixels between two thresholds is found by a binary search, :py:meth:`count_between` takes
+        arrays of thresholds and evaluates all of them at once.
+
+        :param data: values of the pixels
+        :param number_pixels: number of pixels of the map used for the fractions, the size of the data by default
+
+        """
+        values = np.ravel(data)
+        if number_pixels is None:
+            number_pixels = values.size
+        self.number_pixels = number_pixels
+
+        if np.issubdtype(values.dtype, np.floating):
+            values = values[~np.isnan(values)]
+
+        self.values, counts = np.unique(values, return_counts=True)
+        self.cumulative_counts = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+
+    @property
+    def number_values(self):
+        return int(self.cumulative_counts[-1])
+
+    def count_between(self, minimums=None, maximums=None):
+        """
+        Number of pixels with ``minimum <= value <= maximum``, the arrays of minimums and maximums are broadcast.
+
+        A bound is not used if it is None, the comparisons have the same precision as the classification.
+        """
+        if minimums is None:
+            lower_counts = 0
+        else:
+            indexes = np.searchsorted(self.values, _get_threshold(minimums, self.values.dtype), side='left')
+            lower_counts = self.cumulative_counts[indexes]
+
+        if maximums is None:
+            upper_counts = self.number_values
+        else:
+            indexes = np.searchsorted(self.values, _get_threshold(maximums, self.values.dtype), side='right')
+            upper_counts = self.cumulative_counts[indexes]
+
+        return np.maximum(np.asarray(upper_counts) - lower_counts, 0)
+
+    def get_fractions(self, minimums=None, maximums=None):
+        return self.count_between(minimums, maximums) / self.number_pixels
+
+
+class SortedChannel(object):
+    def __init__(self, data):
+        """
+        Pixels of a channel sorted by value, to find the pixels between two thresholds without reading all the pixels.
+
+        :param data: values of the pixels, the pixels are the indexes of the flattened data
+
+        """
+        values = np.ravel(data)
+        self.pixel_indexes = np.argsort(values)
+        self.sorted_values = values[self.pixel_indexes]
+
+        # The NaN are sorted at the end.
+        if np.issubdtype(values.dtype, np.floating):
+            self.number_values = int(np.searchsorted(np.isnan(self.sorted_values), True))
+        else:
+            self.number_values = values.size
+
+    def get_pixels(self, minimum=None, maximum=None):
+        """
+        Pixels with ``minimum <= value <= maximum``, a bound is not used if it is None, the NaN are never included.
+        """
+        values = self.sorted_values[:self.number_values]
+
+        start = 0
+        if minimum is not None:
+            start = np.searchsorted(values, _get_threshold(minimum, values.dtype), side='left')
+
+        stop = self.number_values
+        if maximum is not None:
+            stop = np.searchsorted(values, _get_threshold(maximum, values.dtype), side='right')
+
+        return self.pixel_indexes[start:max(start, stop)]
+
+    def get_nan_pixels(self):
+        return self.pixel_indexes[self.number_values:]
+
+
+class ThresholdSweep(object):
+    def __init__(self, phase_analysis):
+        """
+        Fraction of the pixels of a phase for many thresholds of one of its conditions.
+
+        The index of each channel is built once and reused until the data of the project changes. For a phase with
+        other conditions, they are evaluated once and the swept channel is indexed inside their mask, this index is
+        also reused for the same other conditions. The fractions are without the dilation and erosion.
+
+        :param phase_analysis: :py:class:`~xrayphasemap.analysis.PhaseAnalysis` of the project
+
+        """
+        self.phase_analysis = phase_analysis
+
+        self._channel_indexes = {}
+        self._modification_count = phase_analysis.modification_count
+
+    def get_channel_index(self, data_type, label):
+        """
+        Return the :py:class:`ChannelIndex` of all the pixels of a dataset.
+        """
+        return self._get_channel_index(data_type, label, None)
+
+    def get_fractions(self, phase, data_type, label, minimums=None, maximums=None):
+        """
+        Fraction of the pixels of the phase with the bounds of the condition ``(data_type, label)`` replaced.
+
+        The minimums and maximums are broadcast, for example an array of minimums gives the fraction as a function
+        of the minimum and a column of minimums with a row of maximums gives a grid. A bound set to None keeps the
+        bound of the condition of the phase, the condition is added if the phase does not have it.
+
+        :param phase: :py:class:`~xrayphasemap.phase.Phase`
+        :param data_type: data type of the swept condition
+        :param label: label of the swept condition
+        :param minimums: minimum values of the swept condition
+        :param maximums: maximum values of the swept condition
+        :return: array of the fraction for each pair of minimum and maximum
+
+        """
+        channel = (data_type, label)
+        minimum, maximum = phase.conditions.get(channel, (None, None))
+        if minimums is None:
+            minimums = minimum
+        if maximums is None:
+            maximums = maximum
+
+        other_phase = Phase(phase.name)
+        for other_channel, (other_minimum, other_maximum) in phase.conditions.items():
+            if other_channel != channel:
+                other_phase.add_condition(other_channel[0], other_channel[1], other_minimum, other_maximum)
+
+        if len(other_phase.conditions) == 0:
+            other_phase = None
+        channel_index = self._get_channel_index(data_type, label, other_phase)
+
+        return channel_index.get_fractions(minimums, maximums)
+
+    def _get_channel_index(self, data_type, label, other_phase):
+        if self._modification_count != self.phase_analysis.modification_count:
+            self._channel_indexes = {}
+            self._modification_count = self.phase_analysis.modification_count
+
+        if other_phase is None:
+            key = (data_type, label, None)
+        else:
+            key = (data_type, label, frozenset(other_phase.conditions.items()))
+
+        if key not in self._channel_indexes:
+            data = self.phase_analysis.get_data(data_type, label)
+
+            if other_phase is None:
+                channel_index = ChannelIndex(data)
+            else:
+                classifier = PhaseClassifier([other_phase])
+                cube = [self.phase_analysis.get_data(*other_channel) for other_channel in classifier.channels]
+                mask = classifier.classify(cube, max_workers=self.phase_analysis.max_workers)[0]
+                channel_index = ChannelIndex(data[mask], number_pixels=data.size)
+
+                # Only the index of the last other conditions is kept for each channel.
+                for other_key in list(self._channel_indexes):
+                    if other_key[:2] == key[:2] and other_key[2] is not None:
+                        del self._channel_indexes[other_key]
+
+            self._channel_indexes[key] = channel_index
+
+        return self._channel_indexes[key]
+
+
+class PhaseEvaluator(object):
+    def __init__(self, phase_analysis, phase):
+        """
+        Mask of a phase updated incrementally when a bound of one of its conditions moves.
+
+        The mask of each condition and the number of conditions passed by each pixel are kept. When a bound moves,
+        only the pixels with a value between the old and new bounds are evaluated again, they are found with a
+        :py:class:`SortedChannel` built on the first change of the channel. :py:meth:`set_condition` returns the
+        pixels where the phase mask changed, to patch an image with :py:meth:`patch_image`.
+        Everything is evaluated again if the data of the project changes. The mask is without the dilation and erosion.
+
+        :param phase_analysis: :py:class:`~xrayphasemap.analysis.PhaseAnalysis` of the project
+        :param phase: :py:class:`~xrayphasemap.phase.Phase`, its conditions are copied
+
+        """
+        self.phase_analysis = phase_analysis
+        self.name = phase.name
+        self.conditions = dict(phase.conditions)
+
+        self._sorted_channels = {}
+        self._evaluate()
+
+    @property
+    def number_pixels(self):
+        return int(np.count_nonzero(self.mask))
+
+    @property
+    def fraction(self):
+        return self.number_pixels / self.mask.size
+
+    def get_phase(self):
+        """
+        Return a :py:class:`~xrayphasemap.phase.Phase` with the current conditions.
+        """
+        phase = Phase(self.name)
+        for (data_type, label), (minimum, maximum) in self.conditions.items():
+            phase.add_condition(data_type, label, minimum, maximum)
+
+        return phase
+
+    def get_mask(self):
+        """
+        Boolean mask ``(width, height)`` of the phase.
+        """
+        return self.mask.reshape(self.shape)
+
+    def set_condition(self, data_type, label, minimum=0.0, maximum=None):
+        """
+        Move the bounds of a condition, the condition is added if the phase does not have it.
+
+        :return: indexes of the flattened mask of the pixels where the phase mask changed, see
+            :py:func:`numpy.unravel_index` for the rows and columns
+
+        """
+        channel = (data_type, label)
+
+        if self._modification_count != self.phase_analysis.modification_count:
+            old_mask = self.mask
+            self.conditions[channel] = (minimum, maximum)
+            self._sorted_channels = {}
+            self._evaluate()
+            return np.flatnonzero(old_mask != self.mask)
+
+        if channel not in self.conditions:
+            # A condition without bounds is passed by all the pixels.
+            self.conditions[channel] = (None, None)
+            self.condition_masks[channel] = np.ones(self.mask.size, dtype=bool)
+            self.pass_counts += 1
+
+        old_minimum, old_maximum = self.conditions[channel]
+        candidates = self._get_candidates(channel, (old_minimum, old_maximum), (minimum, maximum))
+        self.conditions[channel] = (minimum, maximum)
+
+        data = self._get_data(channel)
+        is_passed = _evaluate_condition(data[candidates], minimum, maximum)
+
+        condition_mask = self.condition_masks[channel]
+        is_changed = is_passed != condition_mask[candidates]
+        changed_pixels = candidates[is_changed]
+        is_passed = is_passed[is_changed]
+
+        condition_mask[changed_pixels] = is_passed
+        self.pass_counts[changed_pixels[is_passed]] += 1
+        self.pass_counts[changed_pixels[~is_passed]] -= 1
+
+        is_phase = self.pass_counts[changed_pixels] == len(self.conditions)
+        is_phase_changed = is_phase != self.mask[changed_pixels]
+        self.mask[changed_pixels] = is_phase
+
+        return changed_pixels[is_phase_changed]
+
+    def patch_image(self, image, changed_pixels, color, background_color=(0, 0, 0)):
+        """
+        Set the color of the changed pixels of an image ``(width, height, channels)`` of the phase, in place.
+        """
+        pixels = image.reshape(-1, image.shape[-1])
+        is_phase = self.mask[changed_pixels]
+        pixels[changed_pixels[is_phase]] = color
+        pixels[changed_pixels[~is_phase]] = background_color
+
+    def get_image(self, color, background_color=(0, 0, 0), dtype=np.float32):
+        """
+        Image ``(width, height, 3)`` of the phase to patch with :py:meth:`patch_image`.
+        """
+        image = np.empty(self.shape + (len(color),), dtype=dtype)
+        image[...] = background_color
+        image[self.get_mask()] = color
+
+        return image
+
+    def _evaluate(self):
+        self._modification_count = self.phase_analysis.modification_count
+        self.shape = tuple(int(value) for value in self.phase_analysis.get_width_height())
+
+        self.condition_masks = {}
+        self.pass_counts = np.zeros(self.shape[0]*self.shape[1], dtype=np.uint16)
+        for channel, (minimum, maximum) in self.conditions.items():
+            condition_mask = _evaluate_condition(self._get_data(channel), minimum, maximum)
+            self.condition_masks[channel] = condition_mask
+            self.pass_counts += condition_mask
+
+        self.mask = self.pass_counts == len(self.conditions)
+
+    def _get_data(self, channel):
+        return np.ravel(self.phase_analysis.get_data(*channel))
+
+    def _get_candidates(self, channel, old_bounds, new_bounds):
+        """
+        Pixels which can pass or fail the condition when its bounds move, the pixels between the old and new bounds.
+        """
+        if channel not in self._sorted_channels:
+            self._sorted_channels[channel] = SortedChannel(self._get_data(channel))
+        sorted_channel = self._sorted_channels[channel]
+
+        parts = []
+        for old_bound, new_bound, is_minimum in ((old_bounds[0], new_bounds[0], True),
+                                                 (old_bounds[1], new_bounds[1], False)):
+            if old_bound == new_bound:
+                continue
+
+            if old_bound is None or new_bound is None:
+                bound = new_bound if old_bound is None else old_bound
+                if is_minimum:
+                    parts.append(sorted_channel.get_pixels(None, bound))
+                else:
+                    parts.append(sorted_channel.get_pixels(bound, None))
+            else:
+                parts.append(sorted_channel.get_pixels(min(old_bound, new_bound), max(old_bound, new_bound)))
+
+        # The NaN pass only a condition without bounds.
+        if (old_bounds == (None, None)) != (tuple(new_bounds) == (None, None)):
+            parts.append(sorted_channel.get_nan_pixels())
+
+        if len(parts) == 0:
+            return np.zeros(0, dtype=np.intp)
+        elif len(parts) == 1:
+            return parts[0]
+
+        return np.unique(np.concatenate(parts))
+
+
+def _evaluate_condition(values, minimum, maximum):
+    is_passed = np.ones(values.shape, dtype=bool)
+    if minimum is not None:
+        is_passed &= values >= _get_threshold(minimum, values.dtype)
+    if maximum is not None:
+        is_passed &= values <= _get_threshold(maximum, values.dtype)
+
+    return is_passed
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: xrayphasemap.synthetic
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Deterministic synthetic elemental maps of a sample with many phases, for the tests and the benchmarks.
+
+The phases are grains made by the largest of smooth random fields, the count map of each channel is the expected
+counts of the phase of each pixel with Poisson noise. The same parameters and seed always give the same maps.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import os.path
+
+# Third party modules.
+import h5py
+import numpy as np
+from scipy.ndimage import zoom
+from PIL import Image
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.phase import Phase
+from xrayphasemap.storage import StoragePolicy, create_dataset
+
+# Globals and constants variables.
+ELEMENTS = ["O", "Na", "Mg", "Al", "Si", "P", "S", "Cl", "K", "Ca", "Ti", "Cr", "Mn", "Fe", "Ni", "Cu", "Zn"]
+
+EXTENSION_TEXT = ".txt"
+EXTENSION_TIFF = ".tif"
+
+DEFAULT_DATA_TYPE = "counts"
+DEFAULT_SEED = 2017
+
+
+class SyntheticMaps(object):
+    def __init__(self, labels, phase_labels, compositions, phase_indexes, count_maps):
+        """
+        Synthetic count maps and the phase of each pixel used to create them.
+
+        :param labels: label of each channel, like an element symbol
+        :param phase_labels: label of each phase
+        :param compositions: array ``(phases, channels)`` of the expected counts of each channel in each phase
+        :param phase_indexes: integer raster of the index of the phase of each pixel
+        :param count_maps: list of the uint16 count map of each channel
+
+        """
+        self.labels = list(labels)
+        self.phase_labels = list(phase_labels)
+        self.compositions = np.asarray(compositions)
+        self.phase_indexes = phase_indexes
+        self.count_maps = list(count_maps)
+
+    @property
+    def shape(self):
+        return self.phase_indexes.shape
+
+    def get_phase_fractions(self):
+        counts = np.bincount(self.phase_indexes.ravel(), minlength=len(self.phase_labels))
+        return counts/self.phase_indexes.size
+
+    def get_expected_fratios(self):
+        """
+        Expected f-ratio of each channel in each phase, without noise.
+        """
+        return self.compositions/np.sum(self.compositions, axis=1, keepdims=True)
+
+    def get_phases(self, data_type="f-ratio"):
+        """
+        One :py:class:`~xrayphasemap.phase.Phase` for each phase, with a condition on its main channel.
+
+        The minimum of the condition is halfway between the expected f-ratio of the main channel in the phase and
+        the largest one in the other phases, so the phases can be classified from the f-ratio maps.
+
+        """
+        fratios = self.get_expected_fratios()
+
+        phases = []
+        for phase_index, phase_label in enumerate(self.phase_labels):
+            channel_index = int(np.argmax(self.compositions[phase_index]))
+            other_fratios = np.delete(fratios[:, channel_index], phase_index)
+            minimum = 0.5*(fratios[phase_index, channel_index] + np.max(other_fratios, initial=0.0))
+
+            phase = Phase(phase_label)
+            phase.add_condition(data_type, self.labels[channel_index], float(minimum))
+            phases.append(phase)
+
+        return phases
+
+    def save_files(self, directory_path, extension=EXTENSION_TEXT, basename="synthetic"):
+        """
+        Save each count map as a file named like the exports, ``basename_label.txt``, in the directory.
+
+        The text files have one row of values separated by semicolons per line, like the Bruker text export, and
+        the TIFF files are 16 bit images.
+
+        :return: list of the file paths
+
+        """
+        file_paths = []
+        for label, data in zip(self.labels, self.count_maps):
+            file_path = os.path.join(directory_path, "%s_%s%s" % (basename, label, extension))
+            if extension == EXTENSION_TEXT:
+                np.savetxt(file_path, data, fmt="%i", delimiter=";")
+            elif extension == EXTENSION_TIFF:
+                Image.fromarray(data).save(file_path)
+            else:
+                raise ValueError("Unknown extension %s" % extension)
+            file_paths.append(file_path)
+
+        return file_paths
+
+    def save_project(self, file_path, data_type=DEFAULT_DATA_TYPE, storage_policy=None):
+        """
+        Create a project file with the count maps, as imported by
+        :py:meth:`~xrayphasemap.analysis.PhaseAnalysis.import_directory`.
+        """
+        from xrayphasemap.analysis import IMAGE_WIDTH, IMAGE_HEIGHT
+
+        if storage_policy is None:
+            storage_policy = StoragePolicy()
+
+        with h5py.File(file_path, 'w') as h5file:
+            data_type_group = h5file.create_group(data_type)
+            for label, data in zip(self.labels, self.count_maps):
+                dtype = storage_policy.get_storage_dtype(data)
+                dataset = create_dataset(data_type_group, label, data.shape, dtype, storage_policy)
+                dataset[...] = data
+
+            h5file.attrs[IMAGE_WIDTH] = self.shape[0]
+            h5file.attrs[IMAGE_HEIGHT] = self.shape[1]
+
+        return file_path
+
+
+def create_synthetic_maps(shape=(256, 256), number_channels=6, number_phases=4, noise=1.0, mean_counts=20.0,
+                          grain_size=32, seed=DEFAULT_SEED):
+    """
+    Create the count maps of a synthetic sample.
+
+    Each phase has one main channel, the channel with the same index, with more counts than the other channels.
+
+    :param shape: shape ``(rows, columns)`` of the maps
+    :param number_channels: number of count maps
+    :param number_phases: number of phases, not more than the number of channels
+    :param noise: scale of the Poisson noise, 0 for the expected counts and 1 for counting statistics
+    :param mean_counts: mean counts of the channels other than the main channel of a phase
+    :param grain_size: typical size of the grains in pixels
+    :param seed: seed of the random numbers
+    :return: :py:class:`SyntheticMaps`
+
+    """
+    if number_phases < 1 or number_phases > number_channels:
+        raise ValueError("Expected between 1 and %i phases, got %i" % (number_channels, number_phases))
+
+    random_state = np.random.RandomState(seed)
+
+    labels = [_get_channel_label(index) for index in range(number_channels)]
+    phase_labels = ["Phase %i" % (index + 1) for index in range(number_phases)]
+
+    compositions = random_state.uniform(0.25, 1.0, (number_phases, number_channels))*mean_counts
+    compositions[np.arange(number_phases), np.arange(number_phases)] += 4.0*mean_counts
+
+    phase_indexes = _create_grains(shape, number_phases, grain_size, random_state)
+
+    count_maps = []
+    for channel_index in range(number_channels):
+        counts = compositions[phase_indexes, channel_index]
+        if noise > 0.0:
+            counts += noise*(random_state.poisson(counts) - counts)
+        count_maps.append(np.clip(np.rint(counts), 0, np.iinfo(np.uint16).max).astype(np.uint16))
+
+    return SyntheticMaps(labels, phase_labels, compositions, phase_indexes, count_maps)
+
+
+def _create_grains(shape, number_phases, grain_size, random_state):
+    """
+    Index of the largest of smooth random fields, one field per phase, interpolated from a coarse grid.
+    """
+    coarse_shape = tuple(max(2, -(-size // grain_size) + 1) for size in shape)
+    factors = [size/float(coarse_size) for size, coarse_size in zip(shape, coarse_shape)]
+
+    phase_indexes = np.zeros(shape, dtype=np.uint8)
+    maximum_field = np.full(shape, -np.inf, dtype=np.float32)
+    for phase_index in range(number_phases):
+        coarse_field = random_state.uniform(0.0, 1.0, coarse_shape).astype(np.float32)
+        field = zoom(coarse_field, factors, order=1, mode='nearest', grid_mode=True)[:shape[0], :shape[1]]
+
+        is_larger = field > maximum_field
+        phase_indexes[is_larger] = phase_index
+        np.maximum(maximum_field, field, out=maximum_field)
+
+    return phase_indexes
+
+
+def _get_channel_label(index):
+    if index < len(ELEMENTS):
+        return ELEMENTS[index]
+    return "E%02i" % index
@@ -28,14 +28,22 @@ Tests for the module :py:mod:`xrayphasemap.analysis`.
 # Standard library modules.
 import unittest
 import os.path
+import tempfile
+import shutil
 
 # Third party modules.
+import h5py
+import numpy as np
 
 # Local modules.
-import pyHendrixDemersTools.Files as Files
 
 # Project modules
-from xrayphasemap.analysis import PhaseAnalysis, _read_data_from_text_file
+from xrayphasemap.analysis import PhaseAnalysis, _read_data_from_text_file, MODE_READ_ONLY, DATA_TYPE_COMPOUND_INDEX
+from xrayphasemap.analysis import DATA_TYPE_ELEMENT_RATIO, DATA_TYPE_FRATIO, _get_ratio_provenance
+from xrayphasemap.analysis import _parse_text_data
+from xrayphasemap.phase import Phase
+from xrayphasemap.provenance import new_revision, is_up_to_date
+from xrayphasemap.synthetic import create_synthetic_maps
 
 
 # Globals and constants variables.
@@ -53,7 +61,8 @@ class Testanalysis(unittest.TestCase):
 
         unittest.TestCase.setUp(self)
 
-        self.test_data_path = Files.getCurrentModulePath(__file__, "../test_data")
+        self.test_data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "test_data")
+        self.temporary_path = tempfile.mkdtemp()
 
     def tearDown(self):
         """
@@ -62,6 +71,8 @@ class Testanalysis(unittest.TestCase):
 
         unittest.TestCase.tearDown(self)
 
+        shutil.rmtree(self.temporary_path)
+
     def testSkeleton(self):
         """
         First test to check if the testcase is working with the testing framework.
@@ -74,21 +85,503 @@ class Testanalysis(unittest.TestCase):
         Tests for method :py:meth:`test_data_path`.
         """
 
-        test_data_path = Files.getCurrentModulePath(__file__, "../test_data")
-
-        self.assertTrue(os.path.isdir(test_data_path))
+        self.assertTrue(os.path.isdir(self.test_data_path))
 
     def test__readDataFromTextFile(self):
         """
         Tests for method :py:meth:`_read_data_from_text_file`.
         """
 
-        phase_analysis = PhaseAnalysis("Dummy_file_path")
-        file_path = os.path.join(self.test_data_path, "bruker", "good_text_export.txt")
+        synthetic_maps = create_synthetic_maps((48, 64), number_channels=2, number_phases=2, grain_size=16)
+        file_path = synthetic_maps.save_files(self.temporary_path)[0]
         data = _read_data_from_text_file(file_path)
 
-        print(data.shape)
-#        self.fail("Test if the testcase is working.")
+        self.assertEqual((48, 64), data.shape)
+        np.testing.assert_array_equal(synthetic_maps.count_maps[0], data)
+
+    def test__readDataFromTextFile_bad_export(self):
+        """
+        Tests for method :py:meth:`_read_data_from_text_file` with a malformed row.
+        """
+
+        file_path = os.path.join(self.test_data_path, "bruker", "bad_text_export.txt")
+
+        with self.assertRaisesRegex(ValueError, "Line 13 .* expected 1024 columns, found 1645"):
+            _read_data_from_text_file(file_path)
+
+    def test__parse_text_data(self):
+        """
+        Tests for method :py:meth:`_parse_text_data`.
+        """
+
+        data = _parse_text_data(b"20;8;14\r\n0;123;65535\r\n", b";")
+        self.assertEqual(np.uint16, data.dtype)
+        self.assertTrue(np.array_equal([[20, 8, 14], [0, 123, 65535]], data))
+
+        data = _parse_text_data(b"20;8;14;\n0;123;65536;\n", b";")
+        self.assertEqual(np.uint32, data.dtype)
+        self.assertEqual(65536, data[1, 2])
+
+        data = _parse_text_data(b"0.5;-8;1e2\n0;1.25;3\n", b";")
+        self.assertEqual(np.float64, data.dtype)
+        self.assertTrue(np.array_equal([[0.5, -8, 100], [0, 1.25, 3]], data))
+
+        data = _parse_text_data(b"1\t2\n3\t4\n", b"\t")
+        self.assertTrue(np.array_equal([[1, 2], [3, 4]], data))
+
+        data = _parse_text_data(b"1;2;3\n4;5;6\n7;8", b";")
+        self.assertEqual((2, 3), data.shape)
+
+        with self.assertRaisesRegex(ValueError, "Line 2, column 2 .* missing value"):
+            _parse_text_data(b"1;2;3\n4;;6\n7;8;9\n", b";")
+
+        with self.assertRaisesRegex(ValueError, "Line 3, column 1 .* invalid value 'x'"):
+            _parse_text_data(b"1;2;3\n4;5;6\nx;8;9\n", b";")
+
+
+class TestPhaseAnalysisSession(unittest.TestCase):
+    """
+    TestCase class for the session of :py:class:`xrayphasemap.analysis.PhaseAnalysis`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.project_filepath = os.path.join(self.temporary_path, "project.hdf5")
+
+        self.labels = ["Fe", "O", "Si"]
+        random_state = np.random.RandomState(2017)
+        for label in self.labels:
+            file_path = os.path.join(self.temporary_path, "%s.txt" % label)
+            np.savetxt(file_path, random_state.randint(0, 20, (30, 40)), fmt="%i", delimiter=";")
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def _create_project(self):
+        phase_analysis = PhaseAnalysis(self.project_filepath)
+        with phase_analysis:
+            for label in self.labels:
+                file_path = os.path.join(self.temporary_path, "%s.txt" % label)
+                phase_analysis.read_element_data("counts", label, file_path)
+
+        return phase_analysis
+
+    def test_session(self):
+        """
+        Tests for method :py:meth:`open` and :py:meth:`close`.
+        """
+
+        phase_analysis = self._create_project()
+        self.assertFalse(phase_analysis.is_open)
+
+        with PhaseAnalysis(self.project_filepath, mode=MODE_READ_ONLY) as phase_analysis:
+            self.assertTrue(phase_analysis.is_open)
+            self.assertEqual((30, 40), phase_analysis.get_width_height())
+            self.assertEqual(["counts"], phase_analysis.get_data_types())
+            self.assertEqual(self.labels, phase_analysis.get_labels("counts"))
+            self.assertEqual((30, 40), phase_analysis.get_data("counts", "Fe").shape)
+
+        self.assertFalse(phase_analysis.is_open)
+        self.assertEqual((30, 40), phase_analysis.get_width_height())
+
+    def test_session_read_only(self):
+        """
+        Tests for the read-only mode of the session.
+        """
+
+        self._create_project()
+
+        with PhaseAnalysis(self.project_filepath, mode=MODE_READ_ONLY) as phase_analysis:
+            self.assertRaises(IOError, phase_analysis.compute_fratio, "counts")
+
+            modification_count = phase_analysis.modification_count
+            phase_analysis.open()
+            self.assertEqual(modification_count, phase_analysis.modification_count)
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            phase_analysis.compute_fratio("counts")
+            self.assertEqual(self.labels, phase_analysis.get_labels("f-ratio"))
+
+    def test_overwrite(self):
+        """
+        Tests for the project file truncated by the imports only when :py:attr:`overwrite` is set.
+        """
+
+        self._create_project()
+
+        phase_analysis = PhaseAnalysis(self.project_filepath)
+        phase_analysis.overwrite = True
+        self.assertTrue(phase_analysis.compute_total_peak_intensity("counts"))
+        phase_analysis.compute_fratio("counts")
+        self.assertEqual(self.labels, phase_analysis.get_labels("counts"))
+        self.assertEqual(self.labels, phase_analysis.get_labels("f-ratio"))
+
+        with phase_analysis:
+            self.assertEqual(self.labels, phase_analysis.get_labels("counts"))
+
+        phase_analysis.read_element_data("counts", "Fe", os.path.join(self.temporary_path, "Fe.txt"))
+        self.assertEqual(["counts"], phase_analysis.get_data_types())
+        self.assertEqual(["Fe"], phase_analysis.get_labels("counts"))
+
+    def test_get_data_cache(self):
+        """
+        Tests for the dataset cache used by method :py:meth:`get_data`.
+        """
+
+        self._create_project()
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            phase_analysis.compute_fratio("counts")
+            data = phase_analysis.get_data("f-ratio", "Fe")
+            self.assertIs(data, phase_analysis.get_data("f-ratio", "Fe"))
+            self.assertEqual(1, phase_analysis.cache.hits)
+            self.assertEqual(1, phase_analysis.cache.misses)
+
+            phase_analysis.compute_fratio("counts", filter_size=3)
+            self.assertIsNot(data, phase_analysis.get_data("f-ratio", "Fe"))
+            self.assertEqual(2, phase_analysis.cache.misses)
+
+    def test_compute_fratio(self):
+        """
+        Tests for method :py:meth:`compute_fratio`.
+        """
+
+        self._create_project()
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            element_data = phase_analysis.get_element_data("counts")
+            total_intensity = np.sum([element_data[label] for label in self.labels], axis=0)
+
+            for filter_size in [0, 3]:
+                phase_analysis.compute_fratio("counts", filter_size=filter_size)
+                fratios = [phase_analysis.get_data("f-ratio", label) for label in self.labels]
+
+                phase_analysis.compute_fratio("counts", filter_size=filter_size, block_rows=7, force=True)
+                for label, fratio in zip(self.labels, fratios):
+                    self.assertTrue(np.array_equal(fratio, phase_analysis.get_data("f-ratio", label)))
+
+            phase_analysis.compute_fratio("counts")
+            for label in self.labels:
+                expected_fratio = np.zeros_like(total_intensity)
+                is_intensity = total_intensity > 0
+                expected_fratio[is_intensity] = element_data[label][is_intensity] / total_intensity[is_intensity]
+                np.testing.assert_allclose(expected_fratio, phase_analysis.get_data("f-ratio", label), rtol=1.0e-6)
+
+    def test_provenance(self):
+        """
+        Tests for the provenance of the derived datasets, only the datasets not up to date are computed.
+        """
+
+        self._create_project()
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            self.assertEqual(self.labels, phase_analysis.compute_fratio("counts"))
+            self.assertEqual([], phase_analysis.compute_fratio("counts"))
+            self.assertEqual(self.labels, phase_analysis.compute_fratio("counts", filter_size=3))
+            self.assertEqual([], phase_analysis.compute_fratio("counts", filter_size=3))
+            self.assertEqual(self.labels, phase_analysis.compute_fratio("counts", filter_size=3, force=True))
+
+            self.assertTrue(phase_analysis.compute_total_peak_intensity("counts"))
+            self.assertFalse(phase_analysis.compute_total_peak_intensity("counts"))
+
+            phase_analysis.compute_element_ratio("counts", persist=True)
+            phase_analysis.get_data(DATA_TYPE_ELEMENT_RATIO, "Fe_O")
+            phase_analysis.get_data(DATA_TYPE_ELEMENT_RATIO, "Si_O")
+            phase_analysis.compute_element_ratio("counts", persist=True)
+            self.assertEqual(["Fe_O", "Si_O"], list(phase_analysis._h5file[DATA_TYPE_ELEMENT_RATIO]))
+
+            random_state = np.random.RandomState(2018)
+            phase_analysis._h5file["counts"]["Fe"][...] = random_state.randint(0, 20, (30, 40))
+            phase_analysis._dataset_modified("counts", "Fe", phase_analysis._h5file)
+
+            self.assertEqual(self.labels, phase_analysis.compute_fratio("counts", filter_size=3))
+            self.assertTrue(phase_analysis.compute_total_peak_intensity("counts"))
+            phase_analysis.compute_element_ratio("counts", persist=True)
+            self.assertEqual(["Si_O"], list(phase_analysis._h5file[DATA_TYPE_ELEMENT_RATIO]))
+
+            data_fe = phase_analysis.get_data("counts", "Fe")
+            total_intensity = np.sum([phase_analysis.get_data("counts", label) for label in self.labels], axis=0)
+            fratio_fe = phase_analysis.get_data("f-ratio", "Fe")
+            self.assertEqual(0.0, np.min(phase_analysis.get_data("micrograph", "Total peak intensity")))
+            expected_fratio = np.zeros(total_intensity.shape)
+            expected_fratio[total_intensity > 0] = data_fe[total_intensity > 0] / total_intensity[total_intensity > 0]
+            phase_analysis.compute_fratio("counts")
+            np.testing.assert_allclose(expected_fratio, phase_analysis.get_data("f-ratio", "Fe"), rtol=1.0e-6)
+            self.assertFalse(np.array_equal(fratio_fe, phase_analysis.get_data("f-ratio", "Fe")))
+
+    def test_compute_histograms(self):
+        """
+        Tests for method :py:meth:`compute_histograms`, the histograms are saved until the dataset is modified.
+        """
+
+        self._create_project()
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            histograms = phase_analysis.compute_histograms("counts", 10)
+            self.assertEqual([("counts", label) for label in self.labels], list(histograms))
+            for label in self.labels:
+                counts, _bin_edges = np.histogram(phase_analysis.get_data("counts", label), 10)
+                self.assertTrue(np.array_equal(counts, histograms[("counts", label)].counts))
+                self.assertIn("histogram counts", phase_analysis._h5file["counts"][label].attrs)
+
+            phase_analysis.compute_fratio("counts")
+            phase_analysis.compute_histograms("f-ratio")
+            self.assertIn("histogram counts", phase_analysis._h5file["f-ratio"]["Fe"].attrs)
+            phase_analysis.compute_fratio("counts", filter_size=3)
+            self.assertNotIn("histogram counts", phase_analysis._h5file["f-ratio"]["Fe"].attrs)
+
+        with PhaseAnalysis(self.project_filepath, mode=MODE_READ_ONLY) as phase_analysis:
+            histogram = phase_analysis.get_histogram("counts", "Fe", 10)
+            self.assertTrue(np.array_equal(histograms[("counts", "Fe")].counts, histogram.counts))
+            self.assertEqual(0, phase_analysis.cache.misses)
+
+    def test_compute_scatter_matrix(self):
+        """
+        Tests for method :py:meth:`compute_scatter_matrix` and :py:meth:`save_scatter_matrix`.
+        """
+
+        self._create_project()
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            scatter_histograms = phase_analysis.compute_scatter_matrix("counts", num_bins=10, block_size=100)
+            self.assertEqual([("Fe", "O"), ("Fe", "Si"), ("O", "Si")], list(scatter_histograms))
+
+            data_fe = phase_analysis.get_data("counts", "Fe")
+            data_si = phase_analysis.get_data("counts", "Si")
+            histogram_fe = phase_analysis.get_histogram("counts", "Fe")
+            histogram_si = phase_analysis.get_histogram("counts", "Si")
+            expected_counts, _x_edges, _y_edges = np.histogram2d(data_fe.ravel(), data_si.ravel(), 10,
+                                                                 [(histogram_fe.minimum, histogram_fe.maximum),
+                                                                  (histogram_si.minimum, histogram_si.maximum)])
+            self.assertTrue(np.array_equal(expected_counts, scatter_histograms[("Fe", "Si")].counts))
+
+            scatter_histogram = phase_analysis.compute_scatter_histogram("counts", "Fe", "Si", 10, ranges=(5, 10))
+            self.assertEqual((5.0, 10.0, 5.0, 10.0), scatter_histogram.extent)
+
+            file_path = phase_analysis.save_scatter_matrix(self.temporary_path, "counts", num_bins=10,
+                                                           save_pairs=True)
+            self.assertTrue(os.path.isfile(file_path))
+            self.assertTrue(os.path.isfile(os.path.join(self.temporary_path, "Scatter_counts_Fe-O.png")))
+
+    def test_import_directory(self):
+        """
+        Tests for method :py:meth:`import_directory`.
+        """
+
+        file_path = os.path.join(self.temporary_path, "small.txt")
+        np.savetxt(file_path, np.ones((10, 40)), fmt="%i", delimiter=";")
+
+        for max_workers in [1, 2]:
+            if os.path.isfile(self.project_filepath):
+                os.remove(self.project_filepath)
+
+            with PhaseAnalysis(self.project_filepath) as phase_analysis:
+                reports = phase_analysis.import_directory(self.temporary_path, "counts", max_workers=max_workers)
+
+                self.assertEqual(["Fe", "O", "Si", "small"], [report["label"] for report in reports])
+                self.assertEqual([None, None, None], [report["error"] for report in reports[:3]])
+                self.assertIn("Shape", reports[3]["error"])
+                self.assertEqual(self.labels, phase_analysis.get_labels("counts"))
+                self.assertEqual((30, 40), phase_analysis.get_width_height())
+
+        phase_analysis = PhaseAnalysis(self.project_filepath)
+        reports = phase_analysis.import_directory(self.temporary_path, "counts", pattern="Fe.txt")
+        self.assertIn("already", reports[0]["error"])
+
+    def test_compute_compound_indexes_tiled(self):
+        """
+        Tests for method :py:meth:`compute_compound_indexes_tiled`.
+        """
+
+        self._create_project()
+
+        phase_fe = Phase("Fe")
+        phase_fe.add_condition("counts", "Fe", 5, 15)
+        phase_o = Phase("O")
+        phase_o.add_condition("counts", "O", 10, 19)
+        phase_groups = [(phase_fe, True), ([phase_fe, phase_o], True)]
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            for is_dilation_erosion in [False, True]:
+                compound_indexes = phase_analysis.compute_compound_indexes(phase_groups, is_dilation_erosion)
+
+                for tile_size in [7, 16, 64]:
+                    number_pixels = phase_analysis.compute_compound_indexes_tiled(phase_groups, is_dilation_erosion,
+                                                                                  ["Fe", "Fe+O"], tile_size=tile_size)
+
+                    for label, compound_index, number_pixel in zip(["Fe", "Fe+O"], compound_indexes, number_pixels):
+                        data = phase_analysis.get_data(DATA_TYPE_COMPOUND_INDEX, label)
+                        self.assertTrue(np.array_equal(compound_index, data))
+                        self.assertEqual(np.sum(compound_index), number_pixel)
+
+                compound_indexes_threads = phase_analysis.compute_compound_indexes(phase_groups, is_dilation_erosion,
+                                                                                   max_workers=3)
+                for compound_index, compound_index_threads in zip(compound_indexes, compound_indexes_threads):
+                    self.assertTrue(np.array_equal(compound_index, compound_index_threads))
+
+    def test_compute_compound_indexes_shared(self):
+        """
+        Tests for method :py:meth:`compute_compound_indexes` with the same phases in many groups.
+        """
+
+        self._create_project()
+
+        phase_fe = Phase("Fe")
+        phase_fe.add_condition("counts", "Fe", 5, 15)
+        phase_fe_copy = Phase("Fe copy")
+        phase_fe_copy.add_condition("counts", "Fe", 5, 15)
+        phase_o = Phase("O")
+        phase_o.add_condition("counts", "O", 10, 19)
+        phase_groups = [(phase_fe, True), (phase_fe_copy, True), ([phase_fe, phase_o], True),
+                        ([phase_o, phase_fe_copy], True), ([phase_o, phase_fe], False)]
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            compound_indexes = phase_analysis.compute_compound_indexes(phase_groups, True, max_workers=2)
+
+            for phase_group, compound_index in zip(phase_groups, compound_indexes):
+                reference = phase_analysis.compute_compound_indexes([phase_group], True)[0]
+                self.assertTrue(np.array_equal(reference, compound_index))
+
+            self.assertIsNot(compound_indexes[0], compound_indexes[1])
+            compound_indexes[0][...] = False
+            self.assertTrue(np.any(compound_indexes[1]))
+
+    def test_compute_element_ratio_modified_inputs(self):
+        """
+        Tests for the element ratios computed again when their inputs are modified.
+        """
+
+        self._create_project()
+
+        def compute_expected_ratio(phase_analysis):
+            data_fe = phase_analysis.get_data(DATA_TYPE_FRATIO, "Fe")
+            data_o = phase_analysis.get_data(DATA_TYPE_FRATIO, "O")
+            with np.errstate(divide="ignore", invalid="ignore"):
+                expected_ratio = data_fe / data_o
+            expected_ratio[np.isnan(expected_ratio)] = 0
+            return expected_ratio
+
+        for persist in [False, True]:
+            with PhaseAnalysis(self.project_filepath) as phase_analysis:
+                phase_analysis.compute_fratio("counts", force=True)
+                phase_analysis.compute_element_ratio(DATA_TYPE_FRATIO, persist=persist)
+                old_ratio = np.array(phase_analysis.get_data(DATA_TYPE_ELEMENT_RATIO, "Fe_O"))
+
+                phase_analysis.compute_fratio("counts", filter_size=3)
+                self.assertEqual([], list(phase_analysis._h5file[DATA_TYPE_ELEMENT_RATIO]))
+                ratio = phase_analysis.get_data(DATA_TYPE_ELEMENT_RATIO, "Fe_O")
+                self.assertFalse(np.array_equal(old_ratio, ratio))
+                self.assertTrue(np.array_equal(compute_expected_ratio(phase_analysis), ratio))
+
+        # Input modified without removing the saved ratio, the ratio is not up to date with its provenance.
+        with h5py.File(self.project_filepath, 'a') as h5file:
+            dataset = h5file[DATA_TYPE_FRATIO]["Fe"]
+            dataset[...] = 0.5*dataset[...]
+            new_revision(h5file, dataset)
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            ratio = phase_analysis.get_data(DATA_TYPE_ELEMENT_RATIO, "Fe_O")
+            self.assertTrue(np.array_equal(compute_expected_ratio(phase_analysis), ratio))
+
+        with PhaseAnalysis(self.project_filepath, mode=MODE_READ_ONLY) as phase_analysis:
+            self.assertTrue(np.array_equal(ratio, phase_analysis.get_data(DATA_TYPE_ELEMENT_RATIO, "Fe_O")))
+            self.assertTrue(is_up_to_date(phase_analysis._h5file[DATA_TYPE_ELEMENT_RATIO]["Fe_O"],
+                                          _get_ratio_provenance(phase_analysis._h5file, DATA_TYPE_ELEMENT_RATIO,
+                                                                "Fe_O")))
+
+    def test_compute_compound_index_threshold_precision(self):
+        """
+        Tests for the same threshold rounding in :py:meth:`compute_phase_compound_index` and the classifier.
+        """
+
+        for label, value in [("Fe", 1), ("O", 9), ("Si", 0)]:
+            file_path = os.path.join(self.temporary_path, "%s.txt" % label)
+            np.savetxt(file_path, np.full((30, 40), value), fmt="%i", delimiter=";")
+
+        phase_analysis = self._create_project()
+        phase_analysis.compute_fratio("counts")
+        self.assertEqual(np.float32(0.1), phase_analysis.get_data("f-ratio", "Fe")[0, 0])
+
+        for minimum, maximum in [(0.0, 0.1), (np.float64(0.1), None), (None, np.float64(0.1))]:
+            phase = Phase("Fe")
+            phase.add_condition("f-ratio", "Fe", minimum, maximum)
+
+            compound_index = phase_analysis.compute_phase_compound_index(phase)
+            self.assertTrue(np.all(compound_index))
+            self.assertTrue(np.array_equal(phase_analysis.compute_phase_compound_indexes([phase])[0], compound_index))
+
+    def test_compute_compound_indexes_intersection(self):
+        """
+        Tests for method :py:meth:`compute_compound_indexes` with the intersection of the phases of a group.
+        """
+
+        self._create_project()
+
+        phase_fe = Phase("Fe")
+        phase_fe.add_condition("counts", "Fe", 5, 15)
+        phase_o = Phase("O")
+        phase_o.add_condition("counts", "O", 10, 19)
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            expected_index = phase_analysis.compute_phase_compound_index(phase_fe) & \
+                phase_analysis.compute_phase_compound_index(phase_o)
+            self.assertTrue(np.any(expected_index))
+
+            compound_indexes = phase_analysis.compute_compound_indexes([([phase_fe, phase_o], False),
+                                                                        ([phase_fe, phase_o], True)], False)
+            self.assertTrue(np.array_equal(expected_index, compound_indexes[0]))
+            self.assertTrue(np.all(compound_indexes[1][expected_index]))
+
+            phase_analysis.compute_compound_indexes_tiled([([phase_fe, phase_o], False)], False, ["Fe and O"],
+                                                          tile_size=16)
+            self.assertTrue(np.array_equal(expected_index, phase_analysis.get_data(DATA_TYPE_COMPOUND_INDEX,
+                                                                                   "Fe and O")))
+
+    def test_compute_element_ratio(self):
+        """
+        Tests for method :py:meth:`compute_element_ratio`.
+        """
+
+        self._create_project()
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            phase_analysis.compute_element_ratio("counts")
+
+            self.assertEqual([], list(phase_analysis._h5file[DATA_TYPE_ELEMENT_RATIO]))
+            labels = phase_analysis.get_labels(DATA_TYPE_ELEMENT_RATIO)
+            self.assertEqual(6, len(labels))
+            self.assertNotIn("Fe_Fe", labels)
+
+            data_fe = phase_analysis.get_data("counts", "Fe")
+            data_o = phase_analysis.get_data("counts", "O")
+            with np.errstate(divide="ignore", invalid="ignore"):
+                expected_ratio = data_fe / data_o
+            expected_ratio[np.isnan(expected_ratio)] = 0
+            self.assertTrue(np.array_equal(expected_ratio, phase_analysis.get_data(DATA_TYPE_ELEMENT_RATIO, "Fe_O")))
+            self.assertEqual([], list(phase_analysis._h5file[DATA_TYPE_ELEMENT_RATIO]))
+
+            phase_analysis.compute_element_ratio("counts", persist=True)
+            phase_analysis.get_data(DATA_TYPE_ELEMENT_RATIO, "Fe_O")
+            self.assertEqual(["Fe_O"], list(phase_analysis._h5file[DATA_TYPE_ELEMENT_RATIO]))
+            self.assertEqual(6, len(phase_analysis.get_labels(DATA_TYPE_ELEMENT_RATIO)))
+
+            phase = Phase("Fe rich")
+            phase.add_condition(DATA_TYPE_ELEMENT_RATIO, "Fe_Si", 1.0, None)
+            compound_index = phase_analysis.compute_compound_indexes([(phase, True)], False)[0]
+            phase_analysis.compute_compound_indexes_tiled([(phase, True)], False, ["Fe rich"], tile_size=16)
+            self.assertTrue(np.array_equal(compound_index, phase_analysis.get_data(DATA_TYPE_COMPOUND_INDEX, "Fe rich")))
 
 if __name__ == '__main__':  # pragma: no cover
     import nose
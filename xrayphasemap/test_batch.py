@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_batch
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.batch`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+import json
+from unittest import mock
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.batch import BatchRunner, find_samples, run_sample, Sample, STATUS_DONE, STATUS_FAILED, \
+    STATUS_SKIPPED, STAGE_INGEST, STAGE_EXPORT, SUMMARY_FILE_NAME
+from xrayphasemap.analysis import PhaseAnalysis
+from xrayphasemap.cli import main
+
+# Globals and constants variables.
+RECIPE = {"ingest": {"data_type": "counts", "pattern": "*.txt"},
+          "derived": {"fratio": {"input_data_type": "counts"}},
+          "phase_maps": [{"name": "Phases",
+                          "phases": [{"label": "Fe rich", "color": "red",
+                                      "phases": [{"name": "Fe rich",
+                                                  "conditions": [{"data_type": "f-ratio", "label": "Fe",
+                                                                  "minimum": 0.5, "maximum": None}]}]}]}],
+          "export": {"kinds": ["map raw", "phases fraction", "phases statistics"], "data_types": ["f-ratio"]}}
+
+
+class TestBatch(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.batch`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.temporary_path, "results")
+
+        random_state = np.random.RandomState(2017)
+        for sample_name in ["sample1", "sample2", "empty"]:
+            sample_path = os.path.join(self.temporary_path, "exports", sample_name)
+            os.makedirs(sample_path)
+            if sample_name != "empty":
+                for label in ["Fe", "O"]:
+                    file_path = os.path.join(sample_path, "%s_counts_%s.txt" % (sample_name, label))
+                    np.savetxt(file_path, random_state.randint(0, 20, (12, 10)), fmt="%i", delimiter=";")
+
+        self.recipe_file_path = os.path.join(self.temporary_path, "recipe.json")
+        with open(self.recipe_file_path, 'w') as recipe_file:
+            json.dump(RECIPE, recipe_file)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def test_find_samples(self):
+        """
+        Tests for function :py:func:`find_samples`.
+        """
+
+        samples = find_samples([os.path.join(self.temporary_path, "exports", "*"),
+                                os.path.join(self.temporary_path, "exports", "sample1"),
+                                self.recipe_file_path])
+        self.assertEqual(["empty", "sample1", "sample2"], [sample.name for sample in samples])
+        self.assertEqual(os.path.join(self.temporary_path, "exports", "empty"), samples[0].input_path)
+
+    def test_run_sample_classification_once(self):
+        """
+        Tests for function :py:func:`run_sample`, the export reuses the classification of the phase maps.
+        """
+
+        sample = find_samples([os.path.join(self.temporary_path, "exports", "sample1")])[0]
+
+        compute_compound_indexes = PhaseAnalysis.compute_compound_indexes
+        with mock.patch.object(PhaseAnalysis, "compute_compound_indexes", autospec=True,
+                               side_effect=compute_compound_indexes) as mock_compute:
+            report = run_sample(RECIPE, sample, self.output_path)
+
+        self.assertEqual(STATUS_DONE, report["status"])
+        self.assertEqual(1, mock_compute.call_count)
+
+    def test_run(self):
+        """
+        Tests for method :py:meth:`BatchRunner.run`, a failed sample does not stop the others and is resumed.
+        """
+
+        samples = find_samples([os.path.join(self.temporary_path, "exports", "*")])
+
+        for max_workers in [1, 2]:
+            shutil.rmtree(self.output_path, ignore_errors=True)
+            summary = BatchRunner(RECIPE, self.output_path, max_workers=max_workers).run(samples)
+
+            self.assertEqual(3, summary["number samples"])
+            self.assertEqual({STATUS_DONE: 2, STATUS_FAILED: 1, STATUS_SKIPPED: 0}, dict(summary["status"]))
+            reports = dict((report["sample"], report) for report in summary["samples"])
+            self.assertEqual(STAGE_INGEST, reports["empty"]["failed_stage"])
+            self.assertEqual(4, len(reports["sample1"]["stages"]))
+
+            sample_path = os.path.join(self.output_path, "sample1")
+            self.assertTrue(os.path.isfile(os.path.join(sample_path, "sample1.hdf5")))
+            self.assertTrue(os.path.isfile(os.path.join(sample_path, "map_f-ratio_Fe.png")))
+            self.assertTrue(os.path.isfile(os.path.join(sample_path, "Phases_phases_fraction.csv")))
+            self.assertTrue(os.path.isfile(os.path.join(sample_path, "Phases_phases_statistics.csv")))
+            self.assertFalse(os.path.isfile(os.path.join(sample_path, "map_counts_Fe.png")))
+
+            with open(os.path.join(self.output_path, SUMMARY_FILE_NAME), 'r') as summary_file:
+                self.assertEqual(3, json.load(summary_file)["number samples"])
+
+        file_path = os.path.join(self.temporary_path, "exports", "empty", "empty_counts_Fe.txt")
+        np.savetxt(file_path, np.ones((12, 10)), fmt="%i", delimiter=";")
+
+        summary = BatchRunner(RECIPE, self.output_path, max_workers=1, resume=True).run(samples)
+        self.assertEqual({STATUS_DONE: 1, STATUS_FAILED: 0, STATUS_SKIPPED: 2}, dict(summary["status"]))
+
+        recipe = dict(RECIPE, export={"kinds": ["histogram"], "data_types": ["counts"]})
+        summary = BatchRunner(recipe, self.output_path, max_workers=1, resume=True).run([Sample("sample1",
+                                                                                              samples[1].input_path)])
+        self.assertEqual(STATUS_DONE, summary["samples"][0]["status"])
+        self.assertIn(STAGE_EXPORT, summary["samples"][0]["stages"])
+        self.assertTrue(os.path.isfile(os.path.join(self.output_path, "sample1", "Histogram_counts_Fe.png")))
+
+    def test_main(self):
+        """
+        Tests for function :py:func:`xrayphasemap.cli.main`.
+        """
+
+        sample_path = os.path.join(self.temporary_path, "exports", "sample*")
+        self.assertEqual(0, main(["run", self.recipe_file_path, sample_path, "--output", self.output_path,
+                                  "--jobs", "1"]))
+        self.assertEqual(1, main(["run", self.recipe_file_path, os.path.join(self.temporary_path, "exports", "*"),
+                                  "--output", self.output_path, "--jobs", "1", "--resume"]))
+        self.assertEqual(0, main(["plan", self.recipe_file_path, "--size", "12", "10"]))
+        self.assertEqual(2, main([]))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
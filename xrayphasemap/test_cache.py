@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_cache
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.cache`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.cache import DatasetCache
+
+# Globals and constants variables.
+
+
+class TestDatasetCache(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.cache`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.data = np.zeros((10, 10), dtype=np.float32)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def test_get(self):
+        """
+        Tests for method :py:meth:`get`.
+        """
+
+        cache = DatasetCache(maximum_size=1000)
+
+        self.assertIsNone(cache.get(("f-ratio", "Fe")))
+        cache.put(("f-ratio", "Fe"), self.data)
+        self.assertIs(self.data, cache.get(("f-ratio", "Fe")))
+
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(400, cache.size)
+        self.assertFalse(self.data.flags.writeable)
+
+    def test_eviction(self):
+        """
+        Tests for the least recently used eviction.
+        """
+
+        cache = DatasetCache(maximum_size=1000)
+
+        cache.put(("f-ratio", "Fe"), self.data.copy())
+        cache.put(("f-ratio", "O"), self.data.copy())
+        cache.get(("f-ratio", "Fe"))
+        cache.put(("f-ratio", "Si"), self.data.copy())
+
+        self.assertIn(("f-ratio", "Fe"), cache)
+        self.assertNotIn(("f-ratio", "O"), cache)
+        self.assertIn(("f-ratio", "Si"), cache)
+        self.assertEqual(800, cache.size)
+
+        cache.put(("f-ratio", "large"), np.zeros((20, 20), dtype=np.float32))
+        self.assertNotIn(("f-ratio", "large"), cache)
+        self.assertEqual(2, len(cache))
+
+    def test_invalidate(self):
+        """
+        Tests for method :py:meth:`invalidate`.
+        """
+
+        cache = DatasetCache(maximum_size=2000)
+
+        cache.put(("f-ratio", "Fe"), self.data.copy())
+        cache.put(("f-ratio", "O"), self.data.copy())
+        cache.put(("counts", "Fe"), self.data.copy())
+
+        cache.invalidate("f-ratio", "Fe")
+        self.assertNotIn(("f-ratio", "Fe"), cache)
+        self.assertEqual(2, len(cache))
+
+        cache.invalidate("f-ratio")
+        self.assertNotIn(("f-ratio", "O"), cache)
+        self.assertIn(("counts", "Fe"), cache)
+        self.assertEqual(400, cache.size)
+
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.size)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_classifier
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.classifier`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.classifier import PhaseClassifier
+from xrayphasemap.phase import Phase
+
+# Globals and constants variables.
+
+
+class TestPhaseClassifier(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.classifier`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        random_state = np.random.RandomState(2017)
+        self.data = {}
+        for label in ["Fe", "O", "Si"]:
+            self.data[("f-ratio", label)] = np.round(random_state.rand(40, 30), 2).astype(np.float32)
+
+        self.phases = []
+        for index, (label, minimum, maximum) in enumerate([("Fe", 0.1, 0.5), ("O", 0.1, 0.5), ("Si", 0.3, None),
+                                                           ("Fe", 0.2, 0.8), ("Fe", None, 0.3)]):
+            phase = Phase("phase%i" % index)
+            phase.add_condition("f-ratio", label, minimum, maximum)
+            if index % 2:
+                phase.add_condition("f-ratio", "Si", 0.1, 0.7)
+            self.phases.append(phase)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def _compute_reference(self, phase):
+        compound_index = np.ones((40, 30), dtype=bool)
+        for key, (minimum, maximum) in phase.conditions.items():
+            if minimum is not None:
+                compound_index &= self.data[key] >= minimum
+            if maximum is not None:
+                compound_index &= self.data[key] <= maximum
+
+        return compound_index
+
+    def test_init(self):
+        """
+        Tests for the channels and conditions.
+        """
+
+        classifier = PhaseClassifier(self.phases)
+
+        self.assertEqual([("f-ratio", "Fe"), ("f-ratio", "O"), ("f-ratio", "Si")], classifier.channels)
+        self.assertEqual((2, 0.3, None), classifier.conditions[classifier.phase_conditions[2][0]])
+        self.assertEqual([[0, 4, 5], [1], [2, 3]], classifier.channel_conditions)
+
+    def test_classify(self):
+        """
+        Tests for method :py:meth:`classify`.
+        """
+
+        classifier = PhaseClassifier(self.phases)
+        cube = np.array([self.data[channel] for channel in classifier.channels])
+
+        for block_size in [1, 100, 10000]:
+            masks = classifier.classify(cube, block_size=block_size)
+
+            self.assertEqual((5, 40, 30), masks.shape)
+            for phase, mask in zip(self.phases, masks):
+                self.assertTrue(np.array_equal(self._compute_reference(phase), mask))
+
+        for max_workers in [2, None]:
+            masks = classifier.classify(cube, block_size=100, max_workers=max_workers)
+            for phase, mask in zip(self.phases, masks):
+                self.assertTrue(np.array_equal(self._compute_reference(phase), mask))
+
+        self.assertRaises(ValueError, classifier.classify, cube[:2])
+
+    def test_shared_conditions(self):
+        """
+        Tests for the phases and conditions evaluated once.
+        """
+
+        phase = Phase("copy")
+        phase.add_condition("f-ratio", "Si", 0.1, 0.7)
+        phase.add_condition("f-ratio", "O", 0.1, 0.5)
+        phase_all = Phase("all")
+        phases = self.phases + [phase, phase_all]
+
+        classifier = PhaseClassifier(phases)
+
+        self.assertEqual(6, len(classifier.conditions))
+        self.assertEqual((2, 0.1, 0.7), classifier.conditions[classifier.phase_conditions[1][1]])
+        self.assertEqual([0, 1, 2, 3, 4, 1, 6], classifier.phase_sources)
+        self.assertEqual([0, 1, 2, 3, 4, 6], classifier.source_phases)
+        self.assertEqual([1, 3], classifier.condition_phases[classifier.phase_conditions[1][1]])
+
+        cube = np.array([self.data[channel] for channel in classifier.channels])
+        masks = classifier.classify(cube, block_size=100)
+        for phase, mask in zip(phases, masks):
+            self.assertTrue(np.array_equal(self._compute_reference(phase), mask))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
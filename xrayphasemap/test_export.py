@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_export
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.export`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.analysis import PhaseAnalysis
+from xrayphasemap.map import PhaseMap
+from xrayphasemap.phase import Phase
+from xrayphasemap.export import FigureExporter, KIND_HISTOGRAM, KIND_MAP_RAW, KIND_PHASES_FRACTION
+
+# Globals and constants variables.
+
+
+class TestFigureExporter(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.export`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.project_filepath = os.path.join(self.temporary_path, "project.hdf5")
+
+        random_state = np.random.RandomState(2017)
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            for label in ["Fe", "O"]:
+                file_path = os.path.join(self.temporary_path, "%s.txt" % label)
+                np.savetxt(file_path, random_state.randint(0, 20, (30, 40)), fmt="%i", delimiter=";")
+                phase_analysis.read_element_data("counts", label, file_path)
+
+        self.phase_analysis = PhaseAnalysis(self.project_filepath)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def test_run(self):
+        """
+        Tests for method :py:meth:`run`.
+        """
+
+        phase = Phase("Fe")
+        phase.add_condition("counts", "Fe", 5, 15)
+        phase_map = PhaseMap("map", self.phase_analysis)
+        phase_map.add_phase(phase, "red")
+
+        for max_workers in [1, 2]:
+            exporter = FigureExporter(self.project_filepath, self.temporary_path, max_workers=max_workers)
+            exporter.add_data_jobs(self.phase_analysis, kinds=[KIND_HISTOGRAM, KIND_MAP_RAW])
+            exporter.add_phase_map(phase_map, kinds=[KIND_PHASES_FRACTION])
+            exporter.add_job("counts", "Si", KIND_MAP_RAW)
+
+            reports = exporter.run()
+
+            self.assertEqual(6, len(reports))
+            self.assertEqual(exporter.jobs, [report["job"] for report in reports])
+            for report in reports[:5]:
+                self.assertIsNone(report["error"])
+                self.assertTrue(os.path.isfile(report["file_path"]))
+                self.assertGreaterEqual(report["time"], 0.0)
+            self.assertEqual("map_counts_O.png", os.path.basename(reports[3]["file_path"]))
+            self.assertIsNotNone(reports[5]["error"])
+
+        self.assertRaises(ValueError, exporter.add_job, "counts", "Fe", "unknown")
+        self.assertRaises(ValueError, exporter.add_job, "unknown map", None, KIND_PHASES_FRACTION)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
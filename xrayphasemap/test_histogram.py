@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_histogram
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.histogram`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.histogram import compute_histogram, get_bin_edges, PERCENTILES
+
+# Globals and constants variables.
+
+
+class TestHistogram(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.histogram`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        random_state = np.random.RandomState(2017)
+        self.data = random_state.poisson(5.0, (40, 30)).astype(np.float32)
+        self.data[3, 4] = np.nan
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def _read_rows(self, start, stop):
+        return self.data[start:stop]
+
+    def test_compute_histogram(self):
+        """
+        Tests for function :py:func:`compute_histogram`.
+        """
+
+        finite_data = self.data[np.isfinite(self.data)]
+        expected_counts, expected_bin_edges = np.histogram(finite_data, 20)
+        expected_density, _bin_edges = np.histogram(finite_data, 20, density=True)
+
+        for block_rows in [None, 1, 7]:
+            histogram = compute_histogram(self._read_rows, 40, 20, block_rows=block_rows)
+
+            self.assertTrue(np.array_equal(expected_counts, histogram.counts))
+            np.testing.assert_allclose(expected_bin_edges, histogram.bin_edges)
+            np.testing.assert_allclose(expected_density, histogram.get_density())
+            self.assertEqual(np.min(finite_data), histogram.minimum)
+            self.assertEqual(np.max(finite_data), histogram.maximum)
+            self.assertEqual(len(PERCENTILES), len(histogram.percentiles))
+            self.assertTrue(np.all(np.diff(histogram.percentiles) >= 0))
+            self.assertTrue(histogram.is_compatible(20))
+            self.assertFalse(histogram.is_compatible(10))
+
+        bin_edges = np.linspace(0.0, 10.0, 6)
+        for block_rows in [None, 7]:
+            histogram = compute_histogram(self._read_rows, 40, bin_edges=bin_edges, block_rows=block_rows)
+            self.assertTrue(np.array_equal(np.histogram(finite_data, bin_edges)[0], histogram.counts))
+            self.assertTrue(histogram.is_compatible(20, bin_edges))
+
+    def test_get_bin_edges(self):
+        """
+        Tests for function :py:func:`get_bin_edges`.
+        """
+
+        np.testing.assert_allclose(np.histogram([2.0, 2.0], 4)[1], get_bin_edges(2.0, 2.0, 4))
+        np.testing.assert_allclose(np.histogram([1.0, 3.0], 4)[1], get_bin_edges(1.0, 3.0, 4))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
@@ -29,11 +29,14 @@ Tests for the module :py:mod:`xrayphasemap.map`.
 import unittest
 
 # Third party modules.
+import numpy as np
 
 # Local modules.
 
 # Project modules
 import xrayphasemap.map
+from xrayphasemap.map import PhaseClassification
+from xrayphasemap.pyramid import downsample
 
 # Globals and constants variables.
 
@@ -64,6 +67,96 @@ class Testmap(unittest.TestCase):
 
 #        self.fail("Test if the testcase is working.")
 
+
+class TestPhaseClassification(unittest.TestCase):
+    """
+    TestCase class for :py:class:`xrayphasemap.map.PhaseClassification`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        random_state = np.random.RandomState(2017)
+        self.compound_indexes = [random_state.rand(20, 30) > 0.6 for _index in range(4)]
+        self.classification = PhaseClassification(["A", "B", "C", "D"], self.compound_indexes)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def test_labels(self):
+        """
+        Tests for the label raster and combinations.
+        """
+
+        for phase_index, compound_index in enumerate(self.compound_indexes):
+            palette = np.array([phase_index in combination for combination in self.classification.combinations])
+            self.assertTrue(np.array_equal(compound_index, palette[self.classification.labels]))
+
+        overlaps = np.sum(self.compound_indexes, axis=0)
+        self.assertTrue(np.array_equal(overlaps, self.classification.overlaps))
+        self.assertEqual(len(set(self.classification.combinations)), len(self.classification.combinations))
+
+    def test_get_phase_fractions(self):
+        """
+        Tests for method :py:meth:`get_phase_fractions`.
+        """
+
+        phase_fractions = self.classification.get_phase_fractions()
+
+        for label, compound_index in zip(["A", "B", "C", "D"], self.compound_indexes):
+            self.assertAlmostEqual(np.sum(compound_index)/600.0, phase_fractions[label])
+
+    def test_get_rgb_data(self):
+        """
+        Tests for method :py:meth:`get_rgb_data`.
+        """
+
+        colors = [(1, 0, 0), (0, 1, 0), None, (0, 0, 1)]
+        rgb_data = self.classification.get_rgb_data(colors)
+
+        self.assertEqual((20, 30, 3), rgb_data.shape)
+        self.assertTrue(np.array_equal(self.compound_indexes[0], rgb_data[:, :, 0] == 1))
+        self.assertTrue(np.array_equal(self.compound_indexes[1], rgb_data[:, :, 1] == 1))
+        self.assertTrue(np.array_equal(self.compound_indexes[3], rgb_data[:, :, 2] == 1))
+
+    def test_get_phase_data(self):
+        """
+        Tests for methods :py:meth:`get_phase_data` and :py:meth:`get_rgb_level`.
+        """
+
+        colors = [(1, 0, 0), (0, 1, 0), None, (0, 0, 1)]
+        rgb_data = self.classification.get_rgb_data(colors)
+        phase_data = self.classification.get_phase_data()
+
+        self.assertEqual((20, 30, 4), phase_data.shape)
+        for phase_index, compound_index in enumerate(self.compound_indexes):
+            self.assertTrue(np.array_equal(compound_index, phase_data[:, :, phase_index] == 1))
+        self.assertTrue(np.array_equal(phase_data[5:9], self.classification.get_phase_data(5, 9)))
+
+        self.assertTrue(np.array_equal(rgb_data, self.classification.get_rgb_level(phase_data, colors)))
+        np.testing.assert_allclose(downsample(downsample(rgb_data)),
+                                   self.classification.get_rgb_level(downsample(downsample(phase_data)), colors),
+                                   rtol=1.0e-6)
+
+    def test_get_overlap_data(self):
+        """
+        Tests for method :py:meth:`get_overlap_data`.
+        """
+
+        overlap_data = self.classification.get_overlap_data(minimum_overlap=2)
+        overlaps = np.sum(self.compound_indexes, axis=0)
+        overlaps[overlaps < 2] = 0
+
+        self.assertTrue(np.array_equal(overlaps, overlap_data[:, :, 1]))
+
 if __name__ == '__main__':  # pragma: no cover
     import nose
     nose.runmodule()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_morphology
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.morphology`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+from scipy import ndimage
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.morphology import MorphologyPipeline, get_morphology_pipeline, DEFAULT_MORPHOLOGY_PIPELINE
+from xrayphasemap.morphology import OPERATION_CLOSING, OPERATION_OPENING, OPERATION_DILATION, OPERATION_EROSION
+
+# Globals and constants variables.
+
+
+class TestMorphologyPipeline(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.morphology`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        random_state = np.random.RandomState(2017)
+        self.compound_indexes = [random_state.rand(40, 30) < fraction for fraction in [0.1, 0.5, 0.9]]
+        self.compound_indexes.append(ndimage.gaussian_filter(random_state.rand(64, 50), 2.0) > 0.5)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def test_get_steps(self):
+        """
+        Tests for method :py:meth:`get_steps`.
+        """
+
+        steps = DEFAULT_MORPHOLOGY_PIPELINE.get_steps()
+        self.assertEqual([(OPERATION_DILATION, 1), (OPERATION_EROSION, 2), (OPERATION_DILATION, 3),
+                          (OPERATION_EROSION, 4), (OPERATION_DILATION, 3), (OPERATION_EROSION, 1)], steps)
+        self.assertEqual(14, DEFAULT_MORPHOLOGY_PIPELINE.halo)
+
+        pipeline = MorphologyPipeline([(OPERATION_OPENING, 2)], np.ones((5, 5), dtype=bool))
+        self.assertEqual([(OPERATION_EROSION, 2), (OPERATION_DILATION, 2)], pipeline.get_steps())
+        self.assertEqual(8, pipeline.halo)
+
+    def test_apply(self):
+        """
+        Tests for method :py:meth:`apply`, the result is the same as the closings and openings of scipy.
+        """
+
+        pipelines = [DEFAULT_MORPHOLOGY_PIPELINE,
+                     MorphologyPipeline([(OPERATION_OPENING, 3), (OPERATION_CLOSING, 2)]),
+                     MorphologyPipeline(structure=np.ones((3, 5), dtype=bool)),
+                     MorphologyPipeline([(OPERATION_CLOSING, 2)], ndimage.generate_binary_structure(2, 1))]
+
+        for pipeline in pipelines:
+            for compound_index in self.compound_indexes:
+                self.assertTrue(np.array_equal(pipeline.apply_reference(compound_index),
+                                               pipeline.apply(compound_index)))
+
+    def test_get_morphology_pipeline(self):
+        """
+        Tests for function :py:func:`get_morphology_pipeline`.
+        """
+
+        pipeline = MorphologyPipeline([(OPERATION_CLOSING, 3)])
+
+        self.assertIs(DEFAULT_MORPHOLOGY_PIPELINE, get_morphology_pipeline(True))
+        self.assertIsNone(get_morphology_pipeline(False))
+        self.assertIs(pipeline, get_morphology_pipeline(pipeline))
+        self.assertEqual(pipeline, MorphologyPipeline([(OPERATION_CLOSING, 3)]))
+        self.assertEqual(hash(pipeline), hash(MorphologyPipeline([(OPERATION_CLOSING, 3)])))
+        self.assertNotEqual(pipeline, DEFAULT_MORPHOLOGY_PIPELINE)
+
+        self.assertRaises(ValueError, MorphologyPipeline, [("dilation", 1)])
+        self.assertRaises(ValueError, MorphologyPipeline, [(OPERATION_CLOSING, 0)])
+        self.assertRaises(ValueError, MorphologyPipeline, structure=np.ones((2, 3), dtype=bool))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
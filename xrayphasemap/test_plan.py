@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_plan
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.plan`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+import unittest
+
+# Third party modules.
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.plan import EvaluationPlan, STEP_READS, STEP_COMPARISONS, STEP_COMBINATIONS, STEP_MORPHOLOGY
+from xrayphasemap.phase import Phase
+
+# Globals and constants variables.
+
+
+class TestEvaluationPlan(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.plan`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        phase_feo = Phase("FeO")
+        phase_feo.add_condition("f-ratio", "Fe", 0.5, None)
+        phase_feo.add_condition("f-ratio", "O", 0.2, 0.6)
+        phase_sio2 = Phase("SiO2")
+        phase_sio2.add_condition("f-ratio", "Si", 0.5, None)
+        phase_sio2.add_condition("f-ratio", "O", 0.2, 0.6)
+        phase_fe = Phase("Fe")
+        phase_fe.add_condition("f-ratio", "Fe", 0.5, None)
+        phase_fe_copy = Phase("Fe copy")
+        phase_fe_copy.add_condition("f-ratio", "Fe", 0.5, None)
+
+        self.phase_groups = [("Oxides", [phase_feo, phase_sio2], True), ("Iron", phase_fe, True),
+                             ("Iron copy", [phase_fe_copy], True)]
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def test_init(self):
+        """
+        Tests for the shared channels, conditions, phases and groups.
+        """
+
+        plan = EvaluationPlan(self.phase_groups, True, "Phases")
+
+        self.assertEqual([("f-ratio", "Fe"), ("f-ratio", "O"), ("f-ratio", "Si")], plan.channels)
+        self.assertEqual([(0, 0.5, None), (1, 0.2, 0.6), (2, 0.5, None)], plan.conditions)
+        self.assertEqual(4, len(plan.get_comparisons()))
+        self.assertEqual(["FeO", "SiO2", "Fe", "Fe copy"], [phase.name for phase in plan.phases])
+        self.assertEqual([0, 1, 2, 2], plan.classifier.phase_sources)
+        self.assertEqual([0, 1, 1], plan.group_sources)
+
+    def test_get_operations(self):
+        """
+        Tests for method :py:meth:`get_operations`.
+        """
+
+        plan = EvaluationPlan(self.phase_groups, True)
+        operations = plan.get_operations()
+
+        self.assertEqual((3, 8), operations[STEP_READS])
+        self.assertEqual((4, 8), operations[STEP_COMPARISONS])
+        self.assertEqual((1 + 5 + 3 + 2, 8 + 4), operations[STEP_COMBINATIONS])
+        self.assertEqual((28, 42), operations[STEP_MORPHOLOGY])
+
+        self.assertEqual(((3 + 4 + 11 + 28)*100, (8 + 8 + 12 + 42)*100), plan.get_cost(100))
+
+        plan = EvaluationPlan(self.phase_groups, False)
+        self.assertEqual((0, 0), plan.get_operations()[STEP_MORPHOLOGY])
+
+    def test_format(self):
+        """
+        Tests for method :py:meth:`format`.
+        """
+
+        text = EvaluationPlan(self.phase_groups, True, "Phases").format(1000)
+
+        self.assertIn("Phase map Phases", text)
+        self.assertIn("c1: 0.2 <= f-ratio O <= 0.6, 2 phases", text)
+        self.assertIn("Fe copy: same as Fe", text)
+        self.assertIn("Oxides: FeO | SiO2", text)
+        self.assertIn("Iron copy: same as Iron", text)
+        self.assertIn("Morphology: closing 1", text)
+        self.assertIn("Estimated cost for 1000 pixels", text)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
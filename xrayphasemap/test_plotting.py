@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_plotting
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.plotting`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+import os.path
+import sys
+import subprocess
+import tempfile
+import shutil
+import json
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.plotting import create_color_maps, get_color_map
+from xrayphasemap.render import get_lookup_table, COLOR_MAPS_DATA
+
+# Globals and constants variables.
+# Generous budget in seconds, importing matplotlib.pyplot alone is usually longer.
+IMPORT_TIME_BUDGET = 2.0
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start_time = time.time()
+import xrayphasemap.analysis
+phase_analysis = xrayphasemap.analysis.PhaseAnalysis(sys.argv[1])
+elapsed_time = time.time() - start_time
+print(json.dumps({"time": elapsed_time, "matplotlib": "matplotlib" in sys.modules,
+                  "pyplot": "matplotlib.pyplot" in sys.modules}))
+"""
+
+
+class TestPlotting(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.plotting`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path, ignore_errors=True)
+
+    def test_import_time(self):
+        """
+        Test importing :py:mod:`xrayphasemap.analysis` and creating a project do not import matplotlib.
+        """
+
+        package_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        project_filepath = os.path.join(self.temporary_path, "project.hdf5")
+
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT, project_filepath], cwd=package_path)
+        result = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+        self.assertFalse(result["matplotlib"])
+        self.assertFalse(result["pyplot"])
+        self.assertLess(result["time"], IMPORT_TIME_BUDGET)
+
+    def test_create_color_maps(self):
+        """
+        Tests for method :py:func:`create_color_maps`, the color maps are registered only once.
+        """
+
+        create_color_maps()
+        create_color_maps()
+
+        for name in COLOR_MAPS_DATA:
+            color_map = get_color_map(name)
+            self.assertEqual(name, color_map.name)
+
+            lookup_table = color_map(np.arange(color_map.N), bytes=True)
+            self.assertTrue(np.array_equal(get_lookup_table(name), lookup_table))
+
+        self.assertEqual("YlOrRd", get_color_map("YlOrRd").name)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_provenance
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.provenance`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import h5py
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap import __version__
+from xrayphasemap.provenance import new_revision, get_revision, create_provenance, is_up_to_date, \
+    read_provenance, write_provenance, remove_provenance
+
+# Globals and constants variables.
+
+
+class TestProvenance(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.provenance`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.h5file = h5py.File("provenance.hdf5", "w", driver="core", backing_store=False)
+        self.input_dataset = self.h5file.create_dataset("counts/Fe", data=np.ones((4, 5)))
+        self.output_dataset = self.h5file.create_dataset("f-ratio/Fe", data=np.ones((4, 5)))
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        self.h5file.close()
+
+    def test_provenance(self):
+        """
+        Tests for function :py:func:`create_provenance`, a derived dataset is up to date until its input is written.
+        """
+
+        self.assertEqual(1, get_revision(self.h5file, self.input_dataset))
+        self.assertEqual(1, get_revision(self.h5file, self.input_dataset))
+
+        provenance = create_provenance(self.h5file, [self.input_dataset], {"filter size": 3})
+
+        self.assertFalse(is_up_to_date(self.output_dataset, provenance))
+        write_provenance(self.output_dataset, provenance)
+        self.assertTrue(is_up_to_date(self.output_dataset, provenance))
+        self.assertEqual({"inputs": {"/counts/Fe": 1}, "parameters": {"filter size": 3}, "version": __version__},
+                         read_provenance(self.output_dataset))
+        self.assertFalse(is_up_to_date(self.output_dataset, create_provenance(self.h5file, [self.input_dataset],
+                                                                               {"filter size": 5})))
+
+        self.assertEqual(2, new_revision(self.h5file, self.input_dataset))
+        self.assertFalse(is_up_to_date(self.output_dataset,
+                                       create_provenance(self.h5file, [self.input_dataset], {"filter size": 3})))
+
+        remove_provenance(self.output_dataset)
+        self.assertIsNone(read_provenance(self.output_dataset))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
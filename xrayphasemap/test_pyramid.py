@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_pyramid
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.pyramid`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+from unittest import mock
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.analysis import PhaseAnalysis, MODE_READ_ONLY
+from xrayphasemap.map import PhaseMap
+from xrayphasemap.phase import Phase
+from xrayphasemap.pyramid import downsample, get_level_factors, select_factor, compute_levels, compute_preview, \
+    get_pyramid_group, get_factors, GROUP_PYRAMID, GROUP_PHASE_MAP, ATTRIBUTE_INPUTS
+
+# Globals and constants variables.
+
+
+class TestPyramid(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.pyramid`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.project_filepath = os.path.join(self.temporary_path, "project.hdf5")
+
+        random_state = np.random.RandomState(2017)
+        self.data = {}
+        for label in ["Fe", "O"]:
+            self.data[label] = random_state.randint(1, 20, (601, 520)).astype(np.float32)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def _create_project(self):
+        phase_analysis = PhaseAnalysis(self.project_filepath)
+        for label, data in self.data.items():
+            file_path = os.path.join(self.temporary_path, "%s.txt" % label)
+            np.savetxt(file_path, data, fmt="%i", delimiter=";")
+            phase_analysis.read_element_data("counts", label, file_path)
+
+        return phase_analysis
+
+    def test_downsample(self):
+        """
+        Tests for function :py:func:`downsample`.
+        """
+
+        data = np.arange(15, dtype=np.float64).reshape(3, 5)
+        data[0, 0] = np.nan
+
+        level = downsample(data)
+        self.assertEqual(np.float32, level.dtype)
+        self.assertEqual((2, 3), level.shape)
+        np.testing.assert_allclose([[(1 + 5 + 6)/3.0, 5.0, 6.5], [10.5, 12.5, 14.0]], level)
+
+        level = downsample(np.ones((4, 4), dtype=bool))
+        np.testing.assert_array_equal(np.ones((2, 2)), level)
+
+        level = downsample(np.full((2, 2), np.nan))
+        self.assertTrue(np.isnan(level[0, 0]))
+
+    def test_level_factors(self):
+        """
+        Tests for functions :py:func:`get_level_factors` and :py:func:`select_factor`.
+        """
+
+        self.assertEqual([], get_level_factors((256, 100)))
+        self.assertEqual([2], get_level_factors((257, 100)))
+        self.assertEqual([2, 4, 8, 16, 32, 64], get_level_factors((16384, 16384)))
+
+        factors = get_level_factors((16384, 16384))
+        self.assertEqual(16, select_factor((16384, 16384), factors, 1024))
+        self.assertEqual(8, select_factor((16384, 16384), factors, 1025))
+        self.assertEqual(64, select_factor((16384, 16384), factors, 100))
+        self.assertEqual(1, select_factor((600, 500), [2], 400))
+
+    def test_compute_levels(self):
+        """
+        Tests for function :py:func:`compute_levels`, the result does not depend on the block size.
+        """
+
+        data = self.data["Fe"]
+        factors = get_level_factors(data.shape, minimum_size=64)
+        self.assertEqual([2, 4, 8, 16], factors)
+
+        for block_size in [1, 10000, 10**7]:
+            levels = [np.zeros((-(-601 // factor), -(-520 // factor)), dtype=np.float32) for factor in factors]
+
+            def write_rows(level_index, start, rows):
+                levels[level_index][start:start + len(rows)] = rows
+
+            compute_levels(lambda start, stop: data[start:stop], data.shape, factors, write_rows, block_size)
+
+            level = data
+            for level_index, factor in enumerate(factors):
+                level = downsample(level)
+                np.testing.assert_allclose(level, levels[level_index], rtol=1.0e-6)
+
+        preview, factor = compute_preview(data, 300)
+        self.assertEqual(2, factor)
+        np.testing.assert_allclose(downsample(data), preview)
+
+    def test_get_preview(self):
+        """
+        Tests for method :py:meth:`xrayphasemap.analysis.PhaseAnalysis.get_preview`.
+        """
+
+        phase_analysis = self._create_project()
+
+        data, factor = phase_analysis.get_preview("counts", "Fe", 700)
+        self.assertEqual(1, factor)
+        self.assertTrue(np.array_equal(self.data["Fe"], data))
+
+        data, factor = phase_analysis.get_preview("counts", "Fe", 300)
+        self.assertEqual(2, factor)
+        np.testing.assert_allclose(downsample(self.data["Fe"]), data)
+
+        with PhaseAnalysis(self.project_filepath, mode=MODE_READ_ONLY) as read_only_analysis:
+            self.assertEqual(["counts"], read_only_analysis.get_data_types())
+            data, factor = read_only_analysis.get_preview("counts", "Fe", 300)
+            self.assertEqual(2, factor)
+
+            self.assertIsNone(get_pyramid_group(read_only_analysis._h5file, "counts", "O"))
+            data, factor = read_only_analysis.get_preview("counts", "O", 300)
+            np.testing.assert_allclose(downsample(self.data["O"]), data)
+
+        self.assertEqual(["counts"], phase_analysis.get_data_types())
+        self.assertEqual([("counts", "O")], phase_analysis.build_pyramids())
+        self.assertEqual([], phase_analysis.build_pyramids())
+        self.assertEqual([("counts", "Fe"), ("counts", "O")], phase_analysis.build_pyramids(force=True))
+
+        phase_analysis.compute_fratio("counts")
+        self.assertEqual([("f-ratio", "Fe"), ("f-ratio", "O")], phase_analysis.build_pyramids("f-ratio"))
+
+        with phase_analysis:
+            h5file = phase_analysis._h5file
+            self.assertEqual([2, 4], get_factors(get_pyramid_group(h5file, "counts", "Fe")))
+            self.assertIn(GROUP_PYRAMID, h5file)
+
+            h5file["counts"]["Fe"][...] = self.data["O"]
+            phase_analysis._dataset_modified("counts", "Fe", h5file)
+            self.assertIsNone(get_pyramid_group(h5file, "counts", "Fe"))
+
+            data, factor = phase_analysis.get_preview("counts", "Fe", 300)
+            np.testing.assert_allclose(downsample(self.data["O"]), data)
+            self.assertIsNotNone(get_pyramid_group(h5file, "counts", "Fe"))
+
+        file_path = phase_analysis.save_map_one("counts", "Fe", self.temporary_path, preview_size=300)
+        self.assertTrue(os.path.isfile(file_path))
+
+    def _create_phase_map(self, phase_analysis):
+        phase_map = PhaseMap("Phases", phase_analysis)
+        for label, color_name in [("Fe", "red"), ("O", "blue")]:
+            phase = Phase("%s rich" % label)
+            phase.add_condition("counts", label, 10.0)
+            phase_map.add_phase(phase, color_name)
+
+        return phase_map
+
+    def test_get_classification_level(self):
+        """
+        Tests for the pyramid of the classification saved by :py:meth:`xrayphasemap.map.PhaseMap.get_rgb_preview`.
+        """
+
+        self._create_project()
+
+        with PhaseAnalysis(self.project_filepath, mode=MODE_READ_ONLY) as phase_analysis:
+            phase_map = self._create_phase_map(phase_analysis)
+            rgb_data = phase_map.get_classification().get_rgb_data(phase_map._get_colors())
+
+            data, factor = phase_map.get_rgb_preview(size=300)
+            self.assertEqual(2, factor)
+            np.testing.assert_allclose(downsample(rgb_data), data, rtol=1.0e-6)
+            self.assertIsNone(get_pyramid_group(phase_analysis._h5file, GROUP_PHASE_MAP, "Phases"))
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            phase_map = self._create_phase_map(phase_analysis)
+
+            data, factor = phase_map.get_rgb_preview(size=700)
+            self.assertEqual(1, factor)
+            self.assertTrue(np.array_equal(rgb_data, data))
+
+            data, factor = phase_map.get_rgb_preview(size=300)
+            self.assertEqual(2, factor)
+            np.testing.assert_allclose(downsample(rgb_data), data, rtol=1.0e-6)
+
+            pyramid_group = get_pyramid_group(phase_analysis._h5file, GROUP_PHASE_MAP, "Phases")
+            self.assertEqual([2, 4], get_factors(pyramid_group))
+            self.assertEqual((301, 260, 2), pyramid_group["2"].shape)
+            self.assertEqual(["/counts/Fe", "/counts/O"], list(pyramid_group.attrs[ATTRIBUTE_INPUTS]))
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            phase_map = self._create_phase_map(phase_analysis)
+            with mock.patch("xrayphasemap.analysis._build_classification_pyramid") as build_pyramid:
+                data, factor = phase_map.get_rgb_preview(size=150)
+                self.assertEqual(4, factor)
+                self.assertEqual((151, 130, 3), data.shape)
+
+                data, factor = phase_map.get_rgb_preview("O rich", size=300)
+                self.assertEqual(0.0, np.max(data[:, :, 0]))
+                self.assertFalse(build_pyramid.called)
+
+            phase_map.phases["O rich"][0][0].add_condition("counts", "O", 15.0)
+            data, factor = phase_map.get_rgb_preview(size=300)
+            rgb_data = phase_map.get_classification().get_rgb_data(phase_map._get_colors())
+            np.testing.assert_allclose(downsample(rgb_data), data, rtol=1.0e-6)
+
+            h5file = phase_analysis._h5file
+            h5file["counts"]["Fe"][...] = self.data["O"]
+            phase_analysis._dataset_modified("counts", "Fe", h5file)
+            self.assertIsNone(get_pyramid_group(h5file, GROUP_PHASE_MAP, "Phases"))
+
+            data, factor = phase_map.get_rgb_preview(size=300)
+            rgb_data = phase_map.get_classification().get_rgb_data(phase_map._get_colors())
+            np.testing.assert_allclose(downsample(rgb_data), data, rtol=1.0e-6)
+            self.assertIsNotNone(get_pyramid_group(h5file, GROUP_PHASE_MAP, "Phases"))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
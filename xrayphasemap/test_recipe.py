@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_recipe
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.recipe`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.recipe import validate_recipe, get_recipe_hash, get_export, create_phase, create_phase_maps, \
+    load_recipe, save_recipe, compile_phase_maps, phase_map_to_data, create_phase_map, get_morphology
+from xrayphasemap.morphology import MorphologyPipeline, OPERATION_CLOSING
+
+# Globals and constants variables.
+RECIPE = {"derived": {"fratio": {"input_data_type": "counts"}},
+          "phase_maps": [{"name": "Phases", "dilation_erosion": True,
+                          "phases": [{"label": "Oxides", "color": "red", "union": False,
+                                      "phases": [{"name": "FeO",
+                                                  "conditions": [{"data_type": "f-ratio", "label": "Fe",
+                                                                  "minimum": 0.5},
+                                                                 {"data_type": "f-ratio", "label": "O",
+                                                                  "minimum": 0.2, "maximum": 0.6}]}]}]}],
+          "export": {"kinds": ["map"]}}
+
+TOML_RECIPE = """
+[[phase_maps]]
+name = "Phases"
+dilation_erosion = {operations = [["closing", 2]], structure = [[0, 1, 0], [1, 1, 1], [0, 1, 0]]}
+
+[[phase_maps.phases]]
+label = "Iron"
+color = "blue"
+
+[[phase_maps.phases.phases]]
+name = "Fe"
+conditions = [{data_type = "f-ratio", label = "Fe", minimum = 0.5}]
+
+[[phase_maps.phases.phases]]
+name = "Fe low"
+conditions = [{data_type = "f-ratio", label = "Fe", minimum = 0.1, maximum = 0.5}]
+"""
+
+
+class TestRecipe(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.recipe`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def test_validate_recipe(self):
+        """
+        Tests for function :py:func:`validate_recipe`.
+        """
+
+        validate_recipe(RECIPE)
+        self.assertRaises(ValueError, validate_recipe, {"phases": []})
+        self.assertRaises(ValueError, validate_recipe, {"derived": {"ratio": {}}})
+        self.assertRaises(ValueError, validate_recipe, {"phase_maps": [{"phases": []}]})
+
+    def test_get_recipe_hash(self):
+        """
+        Tests for function :py:func:`get_recipe_hash`.
+        """
+
+        recipe = dict(reversed(list(RECIPE.items())))
+        self.assertEqual(get_recipe_hash(RECIPE), get_recipe_hash(recipe))
+        self.assertNotEqual(get_recipe_hash(RECIPE), get_recipe_hash(dict(RECIPE, export={"kinds": []})))
+
+        export = get_export(RECIPE)
+        self.assertEqual(["map"], export["kinds"])
+        self.assertEqual(50, export["num_bins"])
+
+    def test_create_phase_maps(self):
+        """
+        Tests for function :py:func:`create_phase_maps`.
+        """
+
+        phase = create_phase(RECIPE["phase_maps"][0]["phases"][0]["phases"][0])
+        self.assertEqual("FeO", phase.name)
+        self.assertEqual((0.5, None), phase.conditions[("f-ratio", "Fe")])
+        self.assertEqual((0.2, 0.6), phase.conditions[("f-ratio", "O")])
+
+        phase_maps = create_phase_maps(RECIPE, None)
+        self.assertEqual(1, len(phase_maps))
+        self.assertEqual("Phases", phase_maps[0].phase_map_name)
+        self.assertTrue(phase_maps[0].is_dilation_erosion)
+        self.assertEqual(["Oxides"], list(phase_maps[0].phases))
+        phases, color_name, union = phase_maps[0].phases["Oxides"]
+        self.assertEqual(["FeO"], [phase.name for phase in phases])
+        self.assertEqual("red", color_name)
+        self.assertFalse(union)
+
+    def test_phase_map_to_data(self):
+        """
+        Tests for functions :py:func:`phase_map_to_data` and :py:func:`create_phase_map`.
+        """
+
+        phase_map_data = RECIPE["phase_maps"][0]
+        phase_map = create_phase_map(phase_map_data, None)
+        phase_map.add_phase(create_phase({"name": "Si", "conditions": [{"data_type": "counts", "label": "Si",
+                                                                         "minimum": np.int64(3), "maximum": None}]}),
+                            "blue")
+        phase_map.is_dilation_erosion = MorphologyPipeline([(OPERATION_CLOSING, 2)])
+
+        data = phase_map_to_data(phase_map)
+        self.assertEqual({"operations": [["closing", 2]], "structure": [[1, 1, 1], [1, 1, 1], [1, 1, 1]]},
+                         data["dilation_erosion"])
+        conditions = data["phases"][0]["phases"][0]["conditions"]
+        self.assertEqual(phase_map_data["phases"][0]["phases"][0]["conditions"][1], conditions[1])
+        self.assertEqual({"label": "Si", "color": "blue", "union": True,
+                          "phases": [{"name": "Si", "conditions": [{"data_type": "counts", "label": "Si",
+                                                                    "minimum": 3, "maximum": None}]}]},
+                         data["phases"][1])
+
+        file_path = os.path.join(self.temporary_path, "recipe.json")
+        save_recipe({"phase_maps": [data]}, file_path)
+        recipe = load_recipe(file_path)
+        self.assertEqual(data, recipe["phase_maps"][0])
+
+        phase_map_copy = create_phase_map(recipe["phase_maps"][0], None)
+        self.assertEqual(phase_map.is_dilation_erosion, phase_map_copy.is_dilation_erosion)
+        self.assertEqual(phase_map._get_classification_key(), phase_map_copy._get_classification_key())
+
+        self.assertTrue(get_morphology({"operations": [["closing", 1], ["opening", 1], ["closing", 2],
+                                                       ["opening", 2], ["closing", 1]]}))
+        self.assertRaises(ValueError, validate_recipe, {"phase_maps": [{"name": "Phases", "dilation_erosion":
+                                                                        {"operations": [["erosion", 1]]}}]})
+
+    def test_load_recipe_toml(self):
+        """
+        Tests for function :py:func:`load_recipe` with a TOML file.
+        """
+
+        file_path = os.path.join(self.temporary_path, "recipe.toml")
+        with open(file_path, 'w') as recipe_file:
+            recipe_file.write(TOML_RECIPE)
+
+        recipe = load_recipe(file_path)
+        phase_map = create_phase_maps(recipe, None)[0]
+
+        self.assertEqual([(OPERATION_CLOSING, 2)], list(phase_map.is_dilation_erosion.operations))
+        self.assertEqual(5, np.count_nonzero(phase_map.is_dilation_erosion.structure))
+        phases, color_name, union = phase_map.phases["Iron"]
+        self.assertEqual((0.5, None), phases[0].conditions[("f-ratio", "Fe")])
+        self.assertEqual((0.1, 0.5), phases[1].conditions[("f-ratio", "Fe")])
+
+        plans = compile_phase_maps(recipe)
+        self.assertEqual(1, len(plans))
+        self.assertEqual("Phases", plans[0].name)
+        self.assertEqual(3, len(plans[0].get_comparisons()))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_render
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.render`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+
+# Third party modules.
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.colors import LinearSegmentedColormap
+from PIL import Image
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.render import render_map, save_map_image, get_lookup_table
+from xrayphasemap.render import COLOR_MAPS_DATA, COLOR_MAP_NUMBER_COLORS
+
+# Globals and constants variables.
+
+
+class TestRender(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.render`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+
+        random_state = np.random.RandomState(2017)
+        self.data = (random_state.rand(40, 30)*100.0).astype(np.float32)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def test_get_lookup_table(self):
+        """
+        Tests for function :py:func:`get_lookup_table`.
+        """
+
+        for name, color_dict in COLOR_MAPS_DATA.items():
+            color_map = LinearSegmentedColormap(name, color_dict, COLOR_MAP_NUMBER_COLORS)
+            expected_lookup_table = color_map(np.arange(color_map.N), bytes=True)
+            self.assertTrue(np.array_equal(expected_lookup_table, get_lookup_table(name)))
+
+        self.assertEqual((256, 4), get_lookup_table('YlOrRd').shape)
+
+    def test_render_map(self):
+        """
+        Tests for function :py:func:`render_map`, the pixels are the same as :py:func:`matplotlib.pyplot.imsave`.
+        """
+
+        for color_map_name in ['YlOrRd', 'gray']:
+            for data in [self.data, self.data.astype(np.float64), np.ones((5, 4), dtype=np.float32)]:
+                file_path = os.path.join(self.temporary_path, "reference.png")
+                plt.imsave(file_path, data, cmap=color_map_name)
+                expected_rgba = np.array(Image.open(file_path))
+
+                self.assertTrue(np.array_equal(expected_rgba, render_map(data, color_map_name)))
+
+        data = self.data.copy()
+        data[2, 3] = np.nan
+        rgba = render_map(data, 'cmBlue')
+        self.assertEqual((40, 30, 4), rgba.shape)
+        self.assertEqual(0, rgba[2, 3, 3])
+        self.assertTrue(np.all(rgba[np.isfinite(data), 3] == 255))
+
+    def test_save_map_image(self):
+        """
+        Tests for function :py:func:`save_map_image`.
+        """
+
+        for extension in [".png", ".tif"]:
+            file_path = os.path.join(self.temporary_path, "map" + extension)
+            save_map_image(file_path, self.data, 'cmRed')
+
+            image = Image.open(file_path)
+            self.assertEqual("P", image.mode)
+            self.assertTrue(np.array_equal(render_map(self.data, 'cmRed'), np.array(image.convert("RGBA"))))
+
+        data = self.data.copy()
+        data[2, 3] = np.nan
+        file_path = os.path.join(self.temporary_path, "map_nan.png")
+        save_map_image(file_path, data, 'YlOrRd')
+        image = Image.open(file_path)
+        self.assertEqual("RGBA", image.mode)
+        self.assertTrue(np.array_equal(render_map(data, 'YlOrRd'), np.array(image)))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_scatter
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.scatter`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.scatter import compute_scatter_histograms, get_bin_indexes, get_range
+
+# Globals and constants variables.
+
+
+class TestScatter(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.scatter`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        random_state = np.random.RandomState(2017)
+        self.data = [random_state.uniform(0.0, 1.0, (40, 30)),
+                     random_state.poisson(5.0, (40, 30)).astype(np.float64),
+                     random_state.normal(0.5, 0.2, (40, 30))]
+        self.data[0][3, 4] = np.nan
+        self.data[2][5, 6] = np.inf
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+    def _read_rows(self, start, stop):
+        return [data[start:stop] for data in self.data]
+
+    def test_compute_scatter_histograms(self):
+        """
+        Tests for function :py:func:`compute_scatter_histograms`, the counts are the same as
+        :py:func:`numpy.histogram2d`.
+        """
+
+        ranges = [(0.0, 1.0), get_range(0.0, 12.0), (0.2, 0.8)]
+        pairs = [(0, 1), (0, 2), (1, 2)]
+
+        for block_rows in [None, 1, 7]:
+            scatter_histograms = compute_scatter_histograms(self._read_rows, 40, pairs, ranges, 20, block_rows)
+            self.assertEqual(3, len(scatter_histograms))
+
+            for (index_x, index_y), scatter_histogram in zip(pairs, scatter_histograms):
+                x = self.data[index_x].ravel()
+                y = self.data[index_y].ravel()
+                is_finite = np.isfinite(x) & np.isfinite(y)
+                expected_counts, x_edges, y_edges = np.histogram2d(x[is_finite], y[is_finite], 20,
+                                                                   [ranges[index_x], ranges[index_y]])
+
+                self.assertTrue(np.array_equal(expected_counts, scatter_histogram.counts))
+                self.assertTrue(np.array_equal(x_edges, scatter_histogram.x_edges))
+                self.assertTrue(np.array_equal(y_edges, scatter_histogram.y_edges))
+
+        scatter_histogram = scatter_histograms[0]
+        self.assertTrue(np.array_equal(scatter_histogram.counts.T, scatter_histogram.transpose().counts))
+        self.assertEqual((0.0, 1.0, 0.0, 12.0), scatter_histogram.extent)
+
+        image = scatter_histogram.get_image(log_density=True)
+        is_empty = scatter_histogram.counts.T == 0
+        self.assertTrue(np.all(np.isnan(image[is_empty])))
+        np.testing.assert_allclose(np.log10(scatter_histogram.counts.T[~is_empty]), image[~is_empty])
+
+    def test_get_bin_indexes(self):
+        """
+        Tests for function :py:func:`get_bin_indexes`, the values on the edges are as :py:func:`numpy.histogram`.
+        """
+
+        bin_edges = np.linspace(0.1, 0.7, 7)
+        values = np.concatenate([bin_edges, [0.0, 1.0, np.nan], np.nextafter(bin_edges, 0.0)])
+
+        indexes, is_inside = get_bin_indexes(values, bin_edges)
+
+        for index, value in enumerate(values):
+            counts, _bin_edges = np.histogram([value], bin_edges)
+            self.assertEqual(np.sum(counts) == 1, is_inside[index])
+            if is_inside[index]:
+                self.assertEqual(np.argmax(counts), indexes[index])
+
+        self.assertEqual((-0.5, 0.5), get_range(0.0, 0.0))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
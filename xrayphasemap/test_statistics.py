@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_statistics
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.statistics`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+import csv
+from unittest import mock
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.analysis import PhaseAnalysis, DATA_TYPE_ELEMENT_RATIO
+from xrayphasemap.map import PhaseMap, PhaseClassification
+from xrayphasemap.phase import Phase
+from xrayphasemap.statistics import compute_statistics, HEADER_ROW
+
+# Globals and constants variables.
+
+
+class TestStatistics(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.statistics`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.project_filepath = os.path.join(self.temporary_path, "project.hdf5")
+
+        random_state = np.random.RandomState(2017)
+        self.compound_indexes = [random_state.rand(30, 40) > 0.5 for _index in range(3)]
+        self.compound_indexes[2][:] = False
+        self.cube = [random_state.rand(30, 40)*100.0 + 1.0e6, random_state.randint(0, 20, (30, 40)).astype(np.float32)]
+        self.cube[1][0, :5] = np.nan
+        self.channels = [("counts", "Fe"), ("counts", "O")]
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def test_compute_statistics(self):
+        """
+        Tests for function :py:func:`compute_statistics`.
+        """
+
+        classification = PhaseClassification(["A", "B", "C"], self.compound_indexes)
+        statistics = classification.get_statistics(self.cube, self.channels, pixel_size=0.5)
+
+        self.assertEqual(1200, statistics.number_pixels)
+        for phase_index, compound_index in enumerate(self.compound_indexes):
+            self.assertEqual(np.count_nonzero(compound_index), statistics.counts[phase_index])
+            self.assertAlmostEqual(np.count_nonzero(compound_index)/1200.0, statistics.fractions[phase_index])
+            self.assertAlmostEqual(np.count_nonzero(compound_index)*0.25, statistics.areas[phase_index])
+
+            for channel_index, data in enumerate(self.cube):
+                values = data[compound_index]
+                values = values[np.isfinite(values)].astype(np.float64)
+                self.assertEqual(len(values), statistics.value_counts[phase_index, channel_index])
+                if len(values) == 0:
+                    self.assertTrue(np.isnan(statistics.means[phase_index, channel_index]))
+                    continue
+                self.assertAlmostEqual(np.mean(values), statistics.means[phase_index, channel_index], places=6)
+                self.assertAlmostEqual(np.std(values), statistics.standard_deviations[phase_index, channel_index],
+                                       places=6)
+
+        rows = statistics.get_rows()
+        self.assertEqual(6, len(rows))
+        self.assertEqual(["A", statistics.fractions[0], statistics.counts[0], statistics.areas[0], "counts", "O"],
+                         rows[1][:6])
+
+        statistics = compute_statistics(classification.labels, classification.combinations, ["A", "B", "C"], [], [])
+        self.assertIsNone(statistics.areas)
+        self.assertEqual(3, len(statistics.get_rows()))
+        self.assertRaises(ValueError, compute_statistics, classification.labels, classification.combinations,
+                          ["A", "B", "C"], [self.cube[0][:10]], self.channels[:1])
+
+    def test_save_phases_statistics(self):
+        """
+        Tests for method :py:meth:`xrayphasemap.map.PhaseMap.save_phases_statistics`.
+        """
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            for (data_type, label), data in zip(self.channels, self.cube):
+                file_path = os.path.join(self.temporary_path, "%s.txt" % label)
+                np.savetxt(file_path, data, delimiter=";")
+                phase_analysis.read_element_data(data_type, label, file_path)
+            phase_analysis.set_pixel_size(2.0)
+            self.assertEqual(2.0, phase_analysis.get_pixel_size())
+
+            phase = Phase("O rich")
+            phase.add_condition("counts", "O", 10.0)
+            phase_map = PhaseMap("Phases", phase_analysis)
+            phase_map.add_phase(phase, "red")
+
+            file_path = phase_map.save_phases_statistics(self.temporary_path)
+
+        self.assertEqual(os.path.join(self.temporary_path, "Phases_phases_statistics.csv"), file_path)
+        with open(file_path, 'r') as input_file:
+            rows = list(csv.reader(input_file))
+
+        self.assertEqual(HEADER_ROW, rows[0])
+        self.assertEqual(3, len(rows))
+        compound_index = self.cube[1] >= 10.0
+        self.assertEqual(["O rich", str(np.count_nonzero(compound_index)), "counts", "Fe"],
+                         [rows[1][0], rows[1][2], rows[1][4], rows[1][5]])
+        self.assertAlmostEqual(np.count_nonzero(compound_index)*4.0, float(rows[1][3]))
+        self.assertAlmostEqual(np.mean(self.cube[1][compound_index]), float(rows[2][7]), places=5)
+
+    def test_get_phases_statistics_element_ratio(self):
+        """
+        Tests for the channels read by method :py:meth:`xrayphasemap.map.PhaseMap.get_phases_statistics` with a
+        condition on an element ratio.
+        """
+
+        with PhaseAnalysis(self.project_filepath) as phase_analysis:
+            for label, data in zip(["Fe", "O", "Si"], self.cube + [self.cube[1]*2.0]):
+                file_path = os.path.join(self.temporary_path, "%s.txt" % label)
+                np.savetxt(file_path, data, delimiter=";")
+                phase_analysis.read_element_data("counts", label, file_path)
+            phase_analysis.compute_element_ratio("counts")
+            self.assertEqual(6, len(phase_analysis.get_labels(DATA_TYPE_ELEMENT_RATIO)))
+
+            phase = Phase("Fe rich")
+            phase.add_condition(DATA_TYPE_ELEMENT_RATIO, "Fe_O", 1.0e5)
+            phase.add_condition("counts", "O", 10.0)
+            phase_map = PhaseMap("Phases", phase_analysis)
+            phase_map.add_phase(phase, "red")
+
+            original_get_data = PhaseAnalysis.get_data
+            with mock.patch.object(PhaseAnalysis, "get_data", autospec=True,
+                                   side_effect=original_get_data) as get_data:
+                statistics = phase_map.get_phases_statistics()
+
+            read_channels = set(call_args[0][1:] for call_args in get_data.call_args_list)
+            self.assertEqual({(DATA_TYPE_ELEMENT_RATIO, "Fe_O"), ("counts", "Fe"), ("counts", "O"), ("counts", "Si")},
+                             read_channels)
+            self.assertEqual([(DATA_TYPE_ELEMENT_RATIO, "Fe_O"), ("counts", "Fe"), ("counts", "O"), ("counts", "Si")],
+                             statistics.channels)
+
+            statistics = phase_map.get_phases_statistics([DATA_TYPE_ELEMENT_RATIO])
+            self.assertEqual(6, len(statistics.channels))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
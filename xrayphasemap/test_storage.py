@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_storage
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.storage`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+
+# Third party modules.
+import h5py
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.storage import StoragePolicy, create_dataset, read_dataset, migrate_project_file, COMPRESSION_GZIP
+
+# Globals and constants variables.
+
+
+class TestStoragePolicy(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.storage`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+
+        random_state = np.random.RandomState(2017)
+        self.counts = random_state.poisson(20.0, (50, 40)).astype(np.float32)
+        self.fractions = random_state.rand(50, 40).astype(np.float32)
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def test_get_dataset_options(self):
+        """
+        Tests for method :py:meth:`get_dataset_options`.
+        """
+
+        self.assertEqual({}, StoragePolicy().get_dataset_options((50, 40)))
+        self.assertEqual({"chunks": (16, 16)}, StoragePolicy().get_dataset_options((50, 40), chunks=(16, 16)))
+
+        storage_policy = StoragePolicy(chunks=True, compression=COMPRESSION_GZIP, compression_level=4, shuffle=True)
+        options = storage_policy.get_dataset_options((50, 40))
+        self.assertEqual({"chunks": (50, 40), "compression": "gzip", "compression_opts": 4, "shuffle": True}, options)
+
+        self.assertRaises(ValueError, StoragePolicy, compression="bzip2")
+
+    def test_get_storage_dtype(self):
+        """
+        Tests for method :py:meth:`get_storage_dtype`.
+        """
+
+        self.assertEqual(np.float32, StoragePolicy().get_storage_dtype(self.counts))
+
+        storage_policy = StoragePolicy(is_integer_counts=True)
+        self.assertEqual(np.uint16, storage_policy.get_storage_dtype(self.counts))
+        self.assertEqual(np.uint32, storage_policy.get_storage_dtype(self.counts*10000))
+        self.assertEqual(np.float32, storage_policy.get_storage_dtype(self.fractions))
+        self.assertEqual(np.float32, storage_policy.get_storage_dtype(-self.counts))
+
+    def test_migrate_project_file(self):
+        """
+        Tests for method :py:meth:`migrate_project_file`.
+        """
+
+        file_path = os.path.join(self.temporary_path, "project.hdf5")
+        with h5py.File(file_path, 'w') as h5file:
+            h5file.attrs["width"] = 50
+            create_dataset(h5file, "counts/Fe", self.counts.shape, np.float32)[...] = self.counts
+            create_dataset(h5file, "f-ratio/Fe", self.fractions.shape, np.float32)[...] = self.fractions
+
+        storage_policy = StoragePolicy(chunks=(16, 16), compression=COMPRESSION_GZIP, shuffle=True,
+                                       is_integer_counts=True)
+        migrate_project_file(file_path, storage_policy)
+
+        with h5py.File(file_path, 'r') as h5file:
+            self.assertEqual(50, h5file.attrs["width"])
+            self.assertEqual(np.uint16, h5file["counts/Fe"].dtype)
+            self.assertEqual((16, 16), h5file["counts/Fe"].chunks)
+            self.assertEqual("gzip", h5file["f-ratio/Fe"].compression)
+
+            data = read_dataset(h5file["counts/Fe"])
+            self.assertEqual(np.float32, data.dtype)
+            self.assertTrue(np.array_equal(self.counts, data))
+            self.assertTrue(np.array_equal(self.fractions, read_dataset(h5file["f-ratio/Fe"])))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
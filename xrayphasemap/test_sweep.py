@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_sweep
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.sweep`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.analysis import PhaseAnalysis
+from xrayphasemap.phase import Phase
+from xrayphasemap.sweep import ChannelIndex, ThresholdSweep, SortedChannel, PhaseEvaluator
+
+# Globals and constants variables.
+
+
+class TestSweep(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.sweep`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+        self.project_filepath = os.path.join(self.temporary_path, "project.hdf5")
+
+        random_state = np.random.RandomState(2017)
+        self.phase_analysis = PhaseAnalysis(self.project_filepath)
+        with self.phase_analysis:
+            for label in ["Fe", "O"]:
+                file_path = os.path.join(self.temporary_path, "%s.txt" % label)
+                np.savetxt(file_path, random_state.randint(0, 20, (30, 40)), fmt="%i", delimiter=";")
+                self.phase_analysis.read_element_data("counts", label, file_path)
+            self.phase_analysis.compute_fratio("counts")
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def test_channel_index(self):
+        """
+        Tests for class :py:class:`ChannelIndex`.
+        """
+
+        data = np.array([[0.1, 0.2, np.nan], [0.2, 0.3, 0.7]], dtype=np.float32)
+        channel_index = ChannelIndex(data)
+
+        self.assertEqual(6, channel_index.number_pixels)
+        self.assertEqual(5, channel_index.number_values)
+        self.assertEqual(5, channel_index.count_between())
+
+        minimums = np.array([0.0, 0.1, 0.2, 0.25, 1.0])
+        for minimum, count in zip(minimums, channel_index.count_between(minimums)):
+            self.assertEqual(np.sum(data >= float(minimum)), count)
+            self.assertEqual(np.sum(data <= float(minimum)), channel_index.count_between(maximums=minimum))
+
+        counts = channel_index.count_between(minimums[:, np.newaxis], minimums[np.newaxis, :])
+        self.assertEqual((5, 5), counts.shape)
+        self.assertEqual(np.sum((data >= 0.2) & (data <= 0.25)), counts[2, 3])
+        self.assertEqual(0, counts[3, 2])
+        np.testing.assert_allclose(counts / 6.0, channel_index.get_fractions(minimums[:, np.newaxis],
+                                                                             minimums[np.newaxis, :]))
+
+    def test_get_fractions(self):
+        """
+        Tests for method :py:meth:`ThresholdSweep.get_fractions`, the fractions are the same as the compound indexes.
+        """
+
+        sweep = ThresholdSweep(self.phase_analysis)
+
+        phase = Phase("Fe rich")
+        phase.add_condition("f-ratio", "Fe", 0.5, 0.9)
+        thresholds = np.linspace(0.0, 1.0, 21)
+
+        fractions = sweep.get_fractions(phase, "f-ratio", "Fe", minimums=thresholds)
+        for threshold, fraction in zip(thresholds, fractions):
+            threshold_phase = Phase("Fe rich")
+            threshold_phase.add_condition("f-ratio", "Fe", float(threshold), 0.9)
+            expected_fraction = np.mean(self.phase_analysis.compute_phase_compound_index(threshold_phase))
+            self.assertAlmostEqual(expected_fraction, fraction)
+
+        phase.add_condition("counts", "O", 5, None)
+        fractions = sweep.get_fractions(phase, "f-ratio", "Fe", maximums=thresholds)
+        for threshold, fraction in zip(thresholds, fractions):
+            threshold_phase = Phase("Fe rich")
+            threshold_phase.add_condition("f-ratio", "Fe", 0.5, float(threshold))
+            threshold_phase.add_condition("counts", "O", 5, None)
+            expected_fraction = np.mean(self.phase_analysis.compute_phase_compound_index(threshold_phase))
+            self.assertAlmostEqual(expected_fraction, fraction)
+
+        fractions = sweep.get_fractions(phase, "counts", "O", minimums=[0, 5, 10])
+        self.assertEqual((3,), fractions.shape)
+        self.assertAlmostEqual(np.mean(self.phase_analysis.compute_phase_compound_index(phase)), fractions[1])
+
+        channel_index = sweep.get_channel_index("f-ratio", "Fe")
+        self.assertIs(channel_index, sweep.get_channel_index("f-ratio", "Fe"))
+        self.phase_analysis.compute_fratio("counts", force=True)
+        self.assertIsNot(channel_index, sweep.get_channel_index("f-ratio", "Fe"))
+
+    def test_sorted_channel(self):
+        """
+        Tests for class :py:class:`SortedChannel`.
+        """
+
+        data = np.array([[0.1, 0.2, np.nan], [0.2, 0.3, 0.7]], dtype=np.float32)
+        sorted_channel = SortedChannel(data)
+
+        self.assertEqual(5, sorted_channel.number_values)
+        self.assertEqual([2], list(sorted_channel.get_nan_pixels()))
+        self.assertEqual([0, 1, 3, 4, 5], sorted(sorted_channel.get_pixels()))
+        self.assertEqual([1, 3, 4], sorted(sorted_channel.get_pixels(0.2, 0.3)))
+        self.assertEqual([0, 1, 3], sorted(sorted_channel.get_pixels(None, 0.2)))
+        self.assertEqual([4, 5], sorted(sorted_channel.get_pixels(0.25, None)))
+        self.assertEqual([], list(sorted_channel.get_pixels(0.5, 0.4)))
+
+    def test_phase_evaluator(self):
+        """
+        Tests for class :py:class:`PhaseEvaluator`, the mask and changed pixels are the same as the compound indexes.
+        """
+
+        phase = Phase("Fe rich")
+        phase.add_condition("f-ratio", "Fe", 0.5, 0.9)
+        phase.add_condition("counts", "O", 5, None)
+
+        evaluator = PhaseEvaluator(self.phase_analysis, phase)
+        expected_mask = self.phase_analysis.compute_phase_compound_index(phase)
+        self.assertTrue(np.array_equal(expected_mask, evaluator.get_mask()))
+        image = evaluator.get_image((1.0, 0.0, 0.0))
+
+        changes = [("f-ratio", "Fe", 0.4, 0.9), ("f-ratio", "Fe", 0.6, 0.8), ("counts", "O", None, None),
+                   ("counts", "O", 2, 15), ("counts", "Fe", 3, None), ("f-ratio", "Fe", None, 0.7),
+                   ("f-ratio", "O", 0.1, 0.95), ("f-ratio", "Fe", 0.3, None)]
+        for data_type, label, minimum, maximum in changes:
+            changed_pixels = evaluator.set_condition(data_type, label, minimum, maximum)
+            evaluator.patch_image(image, changed_pixels, (1.0, 0.0, 0.0))
+
+            phase.add_condition(data_type, label, minimum, maximum)
+            old_mask = expected_mask
+            expected_mask = self.phase_analysis.compute_phase_compound_index(phase)
+
+            self.assertTrue(np.array_equal(expected_mask, evaluator.get_mask()))
+            self.assertEqual(sorted(np.flatnonzero(old_mask != expected_mask)), sorted(changed_pixels))
+            self.assertTrue(np.array_equal(evaluator.get_image((1.0, 0.0, 0.0)), image))
+            self.assertAlmostEqual(np.mean(expected_mask), evaluator.fraction)
+
+        self.assertEqual(phase.conditions, evaluator.get_phase().conditions)
+
+        old_mask = evaluator.get_mask().copy()
+        with self.phase_analysis:
+            dataset = self.phase_analysis._h5file["f-ratio"]["Fe"]
+            data = dataset[...]
+            data[:10] = np.nan
+            dataset[...] = data
+            self.phase_analysis._dataset_modified("f-ratio", "Fe", self.phase_analysis._h5file)
+
+        changed_pixels = evaluator.set_condition("f-ratio", "Fe", 0.2, None)
+        phase.add_condition("f-ratio", "Fe", 0.2, None)
+        expected_mask = self.phase_analysis.compute_phase_compound_index(phase)
+        self.assertTrue(np.array_equal(expected_mask, evaluator.get_mask()))
+        self.assertEqual(sorted(np.flatnonzero(old_mask != expected_mask)), sorted(changed_pixels))
+
+        changed_pixels = evaluator.set_condition("f-ratio", "Fe", None, None)
+        phase.add_condition("f-ratio", "Fe", None, None)
+        self.assertTrue(np.array_equal(self.phase_analysis.compute_phase_compound_index(phase), evaluator.get_mask()))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()
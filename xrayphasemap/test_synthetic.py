@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. py:currentmodule:: test_synthetic
+
+.. moduleauthor:: Hendrix Demers <hendrix.demers@mail.mcgill.ca>
+
+Tests for the module :py:mod:`xrayphasemap.synthetic`.
+"""
+
+###############################################################################
+# Copyright 2016 Hendrix Demers
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+###############################################################################
+# Standard library modules.
+# Standard library modules.
+import unittest
+import os.path
+import tempfile
+import shutil
+
+# Third party modules.
+import numpy as np
+
+# Local modules.
+
+# Project modules
+from xrayphasemap.analysis import PhaseAnalysis
+from xrayphasemap.synthetic import create_synthetic_maps, EXTENSION_TEXT, EXTENSION_TIFF
+
+# Globals and constants variables.
+
+
+class TestSynthetic(unittest.TestCase):
+    """
+    TestCase class for the module :py:mod:`xrayphasemap.synthetic`.
+    """
+
+    def setUp(self):
+        """
+        Setup method.
+        """
+
+        unittest.TestCase.setUp(self)
+
+        self.temporary_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Teardown method.
+        """
+
+        unittest.TestCase.tearDown(self)
+
+        shutil.rmtree(self.temporary_path)
+
+    def test_create_synthetic_maps(self):
+        """
+        Tests for method :py:func:`create_synthetic_maps`.
+        """
+
+        synthetic_maps = create_synthetic_maps((60, 50), number_channels=5, number_phases=3, grain_size=16)
+        self.assertEqual(["O", "Na", "Mg", "Al", "Si"], synthetic_maps.labels)
+        self.assertEqual(["Phase 1", "Phase 2", "Phase 3"], synthetic_maps.phase_labels)
+        self.assertEqual((60, 50), synthetic_maps.shape)
+        self.assertEqual(5, len(synthetic_maps.count_maps))
+        self.assertEqual(np.uint16, synthetic_maps.count_maps[0].dtype)
+        self.assertTrue(np.all(synthetic_maps.get_phase_fractions() > 0.0))
+
+        same_maps = create_synthetic_maps((60, 50), number_channels=5, number_phases=3, grain_size=16)
+        for data, same_data in zip(synthetic_maps.count_maps, same_maps.count_maps):
+            np.testing.assert_array_equal(data, same_data)
+
+        without_noise = create_synthetic_maps((60, 50), number_channels=5, number_phases=3, grain_size=16, noise=0.0)
+        np.testing.assert_array_equal(np.rint(without_noise.compositions[without_noise.phase_indexes, 2]),
+                                      without_noise.count_maps[2])
+
+        with self.assertRaises(ValueError):
+            create_synthetic_maps((60, 50), number_channels=2, number_phases=3)
+
+    def test_save_files(self):
+        """
+        Tests for method :py:meth:`SyntheticMaps.save_files` and the import of the files.
+        """
+
+        synthetic_maps = create_synthetic_maps((40, 30), number_channels=3, number_phases=2, grain_size=8)
+
+        for extension in (EXTENSION_TEXT, EXTENSION_TIFF):
+            directory_path = os.path.join(self.temporary_path, extension[1:])
+            os.makedirs(directory_path)
+            file_paths = synthetic_maps.save_files(directory_path, extension)
+            self.assertEqual("synthetic_O%s" % extension, os.path.basename(file_paths[0]))
+
+            phase_analysis = PhaseAnalysis(os.path.join(self.temporary_path, "project_%s.hdf5" % extension[1:]))
+            reports = phase_analysis.import_directory(directory_path, "counts", "*" + extension, max_workers=1)
+            self.assertEqual([None]*3, [report["error"] for report in reports])
+
+            for label, data in zip(synthetic_maps.labels, synthetic_maps.count_maps):
+                np.testing.assert_array_equal(data, phase_analysis.get_data("counts", label))
+
+    def test_get_phases(self):
+        """
+        Tests for method :py:meth:`SyntheticMaps.get_phases`.
+        """
+
+        synthetic_maps = create_synthetic_maps((80, 80), number_channels=4, number_phases=3, grain_size=16)
+        project_filepath = synthetic_maps.save_project(os.path.join(self.temporary_path, "project.hdf5"))
+
+        phase_analysis = PhaseAnalysis(project_filepath)
+        self.assertEqual((80, 80), phase_analysis.get_width_height())
+        phase_analysis.compute_fratio("counts")
+
+        phases = synthetic_maps.get_phases()
+        for phase_index, phase in enumerate(phases):
+            compound_index = phase_analysis.compute_compound_index([phase], False, True)
+            is_phase = synthetic_maps.phase_indexes == phase_index
+            self.assertGreater(np.mean(compound_index.astype(bool) == is_phase), 0.99)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import nose
+    nose.runmodule()